@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import tempfile
+
+
+def assistant_key(model, instructions):
+    """Returns the registry key for an assistant: model plus instructions hash."""
+    instructions_hash = hashlib.sha256(instructions.encode("utf-8")).hexdigest()
+    return f"{model}:{instructions_hash}"
+
+
+def is_not_found_error(error):
+    """True for API errors reporting a missing object (HTTP 404)."""
+    return getattr(error, "status_code", None) == 404
+
+
+class AssistantRegistry:
+    """
+    Remembers the id of the assistant created for each (model, instructions)
+    pair in a small JSON file, so later runs reuse it instead of creating a
+    new assistant per request.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self, entries):
+        """Writes the registry atomically so concurrent jobs never read half a file."""
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_or_create(self, openai_client, model, instructions, name, recreate=False):
+        """
+        Returns the registered assistant id for (model, instructions), creating
+        and registering one if there is none. The stored id is trusted without
+        a network call; pass recreate=True after an API call reports it as
+        deleted to replace it.
+        """
+        key = assistant_key(model, instructions)
+        if not recreate:
+            assistant_id = self._load().get(key)
+            if assistant_id:
+                return assistant_id
+
+        assistant = openai_client.beta.assistants.create(
+            name=name,
+            instructions=instructions,
+            model=model,
+        )
+        print(f"Assistant created: {assistant.id}")
+
+        # Reload before saving to keep entries other processes added meanwhile
+        entries = self._load()
+        entries[key] = assistant.id
+        self._save(entries)
+        return assistant.id
@@ -0,0 +1,384 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import openai
+
+import generate_json
+from assistant_registry import is_not_found_error
+from disk_cache import make_key
+from response_schema import response_format_for
+
+# Model calls in flight at once across the whole batch
+DEFAULT_CONCURRENCY = 8
+# Processes extracting document text while earlier jobs are being generated
+DEFAULT_EXTRACT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Retries for rate limits (429), server errors and dropped connections. The
+# delay doubles per attempt up to RETRY_MAX_DELAY, with jitter so parallel
+# jobs don't retry in lockstep; a Retry-After header from the API wins.
+MAX_RETRIES = 6
+RETRY_INITIAL_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+PROGRESS_FILE = "progress.jsonl"
+
+def default_output_dir(manifest_path):
+    """output/batches/<manifest name>/, next to the single-run outputs."""
+    name = os.path.splitext(os.path.basename(manifest_path))[0]
+    return os.path.join(generate_json.script_dir, "output", "batches", name)
+
+def _default_job_id(entry):
+    """A stable id for manifest lines without one, so resuming finds them again."""
+    stem = os.path.splitext(os.path.basename(entry["file"]))[0]
+    stem = re.sub(r"[^A-Za-z0-9_.-]", "_", stem).lstrip("._-")[:64] or "job"
+    digest = make_key(entry["file"], entry["type"], entry.get("params", {}))[:8]
+    return f"{stem}-{entry['type']}-{digest}"
+
+def load_manifest(manifest_path):
+    """
+    Reads a JSONL manifest, one job per line:
+        {"id": "week1-test", "file": "week1.pdf", "type": "test",
+         "params": {"num_american": 10, "num_open": 2, "additional_prompt": "..."}}
+    - id: optional; defaults to a stable id built from the file, type and params
+    - file: PDF or PPTX path, relative to the manifest's directory
+    - type: 'test' or 'summary'
+    - params: optional, the same settings as the generate_json.py flags
+    Raises ValueError on a malformed line or a duplicate id.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    seen_ids = set()
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{manifest_path}:{line_number}: invalid JSON ({e})")
+            if not isinstance(entry, dict) or "file" not in entry:
+                raise ValueError(f"{manifest_path}:{line_number}: a job needs a 'file'")
+            if entry.get("type") not in ("test", "summary"):
+                raise ValueError(f"{manifest_path}:{line_number}: 'type' must be 'test' or 'summary'")
+
+            job_id = entry.get("id") or _default_job_id(entry)
+            if not generate_json.JOB_ID_PATTERN.match(job_id):
+                raise ValueError(f"{manifest_path}:{line_number}: invalid job id {job_id!r}")
+            if job_id in seen_ids:
+                raise ValueError(f"{manifest_path}:{line_number}: duplicate job id {job_id!r}")
+            seen_ids.add(job_id)
+
+            jobs.append({
+                "id": job_id,
+                "file": os.path.join(base_dir, entry["file"]),
+                "type": entry["type"],
+                "params": entry.get("params", {}),
+            })
+    return jobs
+
+def read_progress(output_dir):
+    """
+    Returns {job_id: record} from the progress log; later records win. A line
+    cut short by a crash is ignored.
+    """
+    progress = {}
+    progress_file = os.path.join(output_dir, PROGRESS_FILE)
+    if not os.path.exists(progress_file):
+        return progress
+    with open(progress_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            progress[record["id"]] = record
+    return progress
+
+def append_progress(output_dir, record):
+    """Appends one record to the progress log and syncs it to disk."""
+    with open(os.path.join(output_dir, PROGRESS_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def result_file(output_dir, job_id):
+    return os.path.join(output_dir, f"{job_id}.json")
+
+def build_prompt(job):
+    """Returns (initial_prompt, response_structure) for a manifest job."""
+    params = job["params"]
+    prompt_params = {"additional_prompt": params.get("additional_prompt", "")}
+    if job["type"] == "test":
+        prompt_params["num_of_american"] = params.get("num_american", 8)
+        prompt_params["num_of_open"] = params.get("num_open", 3)
+    structure_file = "test_json_structure.json" if job["type"] == "test" else "summary_json_structure.json"
+    with open(generate_json.get_file_path(structure_file), "r", encoding="utf-8") as json_file:
+        response_structure = json.load(json_file)
+    return generate_json.get_prompt(job["type"], prompt_params), response_structure
+
+def extract_job_text(input_file, max_chars, use_cache, selection="salience"):
+    """Process-pool task: extracts (and caches) one job's source text."""
+    cache = generate_json.get_extraction_cache() if use_cache else None
+    return generate_json.extract_source_text(input_file, cache, max_chars=max_chars, selection=selection,
+                                             file_type=generate_json.file_type_for(input_file))
+
+def is_retryable_error(e):
+    """True for rate limits, transient server errors and dropped connections."""
+    if isinstance(e, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return getattr(e, "status_code", None) in RETRYABLE_STATUS_CODES
+
+def retry_delay(e, attempt):
+    """Seconds to wait before retry number `attempt` (0-based) after error `e`."""
+    response = getattr(e, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    delay = min(RETRY_INITIAL_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+async def with_retries(call, description):
+    """Awaits `call()`, retrying retryable errors with exponential backoff."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == MAX_RETRIES or not is_retryable_error(e):
+                raise
+            delay = retry_delay(e, attempt)
+            print(f"{description}: {e} - retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+async def run_assistant_async(client, assistant_id, content, timeout=generate_json.RUN_TIMEOUT_SECONDS,
+                              response_format=None):
+    """
+    Async counterpart of generate_json.run_assistant for an openai.AsyncOpenAI
+    client: runs `content` on a new thread, polls with the same backoff and
+    timeout, and returns the reply text. Each API call is retried on rate
+    limits and transient errors.
+    """
+    started = time.perf_counter()
+    threads = client.beta.threads
+
+    thread = await with_retries(lambda: threads.create(), "Create thread")
+    await with_retries(
+        lambda: threads.messages.create(thread_id=thread.id, role="user", content=content),
+        "Send message",
+    )
+    run = await with_retries(
+        lambda: threads.runs.create(
+            thread_id=thread.id, assistant_id=assistant_id, **generate_json._run_options(response_format)
+        ),
+        "Create run",
+    )
+
+    delay = generate_json.POLL_INITIAL_DELAY
+    while True:
+        run_status = await with_retries(
+            lambda: threads.runs.retrieve(thread_id=thread.id, run_id=run.id), "Check run"
+        )
+        if run_status.status in ("completed", "incomplete"):
+            break
+        if run_status.status in ("failed", "cancelled", "expired"):
+            raise RuntimeError(f"Run {run.id} ended with status {run_status.status}.")
+        if time.perf_counter() - started + delay > timeout:
+            try:
+                await threads.runs.cancel(thread_id=thread.id, run_id=run.id)
+            except Exception as e:
+                print(f"Could not cancel run {run.id}: {e}")
+            raise TimeoutError(f"Run {run.id} did not finish within {timeout} seconds.")
+        await asyncio.sleep(delay)
+        delay = min(delay * generate_json.POLL_BACKOFF_FACTOR, generate_json.POLL_MAX_DELAY)
+
+    messages = await with_retries(lambda: threads.messages.list(thread_id=thread.id), "Fetch reply")
+    for msg in messages.data:
+        if msg.role == "assistant":
+            for message_content in msg.content:
+                if message_content.type == "text":
+                    return message_content.text.value
+    raise RuntimeError("No response received.")
+
+async def _run_batch(jobs, output_dir, client, concurrency, extract_workers, max_chars, use_cache, selection):
+    """Runs every job, extracting in a process pool and generating under a semaphore."""
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    generation_cache = generate_json.get_generation_cache() if use_cache else None
+    assistant = {"id": None}
+    assistant_lock = asyncio.Lock()
+    counts = {"done": 0, "failed": 0}
+
+    async def get_assistant_id(recreate=False):
+        # The registry client is synchronous; one lookup serves the whole batch
+        async with assistant_lock:
+            if assistant["id"] is None or recreate:
+                assistant["id"] = await asyncio.to_thread(
+                    generate_json.get_assistant_id, generate_json.get_openai_client(), recreate
+                )
+            return assistant["id"]
+
+    async def generate(content, response_format):
+        assistant_id = await get_assistant_id()
+        try:
+            return await run_assistant_async(client, assistant_id, content, response_format=response_format)
+        except Exception as e:
+            if not is_not_found_error(e):
+                raise
+            print(f"Assistant {assistant_id} no longer exists; creating a new one.")
+            assistant_id = await get_assistant_id(recreate=True)
+            return await run_assistant_async(client, assistant_id, content, response_format=response_format)
+
+    async def run_job(job, extract_pool):
+        started = time.perf_counter()
+        try:
+            text_input = await loop.run_in_executor(
+                extract_pool, extract_job_text, job["file"], max_chars, use_cache, selection
+            )
+            initial_prompt, response_structure = build_prompt(job)
+
+            cache_key = generate_json.generation_cache_key(
+                job["type"], initial_prompt, response_structure, text_input
+            )
+            parsed_json = generation_cache.get(cache_key) if generation_cache is not None else None
+            if parsed_json is None:
+                content = generate_json.build_message_content(initial_prompt, response_structure, text_input)
+                response_format = response_format_for(job["type"], response_structure)
+                async with semaphore:
+                    response_text = await generate(content, response_format)
+                parsed_json = generate_json.parse_reply(job["type"], response_structure, response_text)
+                if generation_cache is not None:
+                    generation_cache.set(cache_key, parsed_json)
+
+            output_file = result_file(output_dir, job["id"])
+            generate_json.save_response_json(parsed_json, output_file)
+            record = {"id": job["id"], "status": "done", "output": output_file}
+            counts["done"] += 1
+        except Exception as e:
+            record = {"id": job["id"], "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            counts["failed"] += 1
+            print(f"Job {job['id']} failed: {record['error']}")
+        record["duration"] = round(time.perf_counter() - started, 3)
+        append_progress(output_dir, record)
+        print(f"[{counts['done'] + counts['failed']}/{len(jobs)}] {job['id']}: {record['status']}")
+
+    with ProcessPoolExecutor(max_workers=max(1, extract_workers)) as extract_pool:
+        await asyncio.gather(*(run_job(job, extract_pool) for job in jobs))
+    return counts
+
+def run_batch(jobs, output_dir, client=None, concurrency=DEFAULT_CONCURRENCY,
+              extract_workers=DEFAULT_EXTRACT_WORKERS, max_chars=generate_json.MAX_INPUT_CHARS,
+              use_cache=True, resume=True, selection="salience"):
+    """
+    Generates every job and writes <output_dir>/<id>.json for each, logging
+    outcomes to <output_dir>/progress.jsonl. With `resume`, jobs already
+    logged as done (and whose result file exists) are skipped, so a crashed
+    or interrupted batch picks up where it stopped; failed jobs run again.
+    - client: an openai.AsyncOpenAI (default: one built from api_key.txt)
+    - selection: how longer documents are cut to max_chars (see
+      generate_json.extract_source_text)
+    Returns {"done", "failed", "skipped"} counts.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    progress = read_progress(output_dir) if resume else {}
+    pending = [
+        job for job in jobs
+        if not (progress.get(job["id"], {}).get("status") == "done"
+                and os.path.exists(result_file(output_dir, job["id"])))
+    ]
+    skipped = len(jobs) - len(pending)
+    print(f"{len(pending)} jobs to run, {skipped} already done.")
+
+    counts = {"done": 0, "failed": 0}
+    if pending:
+        if client is None:
+            client = openai.AsyncOpenAI(api_key=generate_json.read_api_key())
+        counts = asyncio.run(_run_batch(
+            pending, output_dir, client, concurrency, extract_workers, max_chars, use_cache, selection
+        ))
+    counts["skipped"] = skipped
+    return counts
+
+def parse_arguments(argv=None):
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Generate tests and summaries for every PDF listed in a JSONL manifest."
+    )
+    parser.add_argument(
+        "--manifest", "-m",
+        required=True,
+        help="JSONL file with one job per line: {\"id\", \"file\", \"type\", \"params\"}"
+    )
+    parser.add_argument(
+        "--output-dir", "-o",
+        help="Directory for <id>.json results and progress.jsonl (default: output/batches/<manifest name>/)"
+    )
+    parser.add_argument(
+        "--concurrency", "-c",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Model calls in flight at once (default: {DEFAULT_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--extract-workers", "-w",
+        type=int,
+        default=DEFAULT_EXTRACT_WORKERS,
+        help=f"Processes extracting document text (default: {DEFAULT_EXTRACT_WORKERS})"
+    )
+    parser.add_argument(
+        "--max-chars",
+        type=int,
+        default=generate_json.MAX_INPUT_CHARS,
+        help=f"Characters of source text per document (default: {generate_json.MAX_INPUT_CHARS})"
+    )
+    parser.add_argument(
+        "--selection",
+        choices=generate_json.SOURCE_SELECTIONS,
+        default="salience",
+        help="Keep the most central paragraphs ('salience') or the first pages ('head') of longer documents "
+             "(default: salience)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the extracted-text and generation caches"
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the progress log and run every job again"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Runs a batch from command-line arguments; returns 1 if any job failed."""
+    args = parse_arguments(argv)
+    jobs = load_manifest(args.manifest)
+    output_dir = args.output_dir or default_output_dir(args.manifest)
+
+    counts = run_batch(
+        jobs,
+        output_dir,
+        concurrency=args.concurrency,
+        extract_workers=args.extract_workers,
+        max_chars=args.max_chars,
+        use_cache=not args.no_cache,
+        resume=not args.restart,
+        selection=args.selection,
+    )
+    print(f"Done: {counts['done']} | Failed: {counts['failed']} | Skipped: {counts['skipped']}")
+    print(f"Results in {output_dir}")
+    return 1 if counts["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import fitz  # PyMuPDF
+
+from generate_json import compress_pdf_to_text, get_file_path
+from salience import select_salient_paragraphs
+
+sys.stdout.reconfigure(encoding='utf-8')
+
+
+def two_pass_reference(input_pdf_path, skip_header_footer=True, merge_lines=True):
+    """The original two-pass extraction, kept here as the timing baseline."""
+    doc = fitz.open(input_pdf_path)
+    pages_text = []
+    header_candidates = []
+    footer_candidates = []
+
+    for page in doc:
+        blocks = page.get_text("blocks")
+        blocks.sort(key=lambda b: (round(b[1]), round(b[0])))
+        lines = [b[4].strip() for b in blocks if b[4].strip()]
+        if lines:
+            header_candidates.append(lines[0])
+            footer_candidates.append(lines[-1])
+
+    header_counts = Counter(header_candidates)
+    footer_counts = Counter(footer_candidates)
+    common_header = header_counts.most_common(1)[0][0] if header_counts else None
+    common_footer = footer_counts.most_common(1)[0][0] if footer_counts else None
+
+    for page in doc:
+        blocks = page.get_text("blocks")
+        blocks.sort(key=lambda b: (round(b[1]), round(b[0])))
+        page_lines = []
+        for b in blocks:
+            text = b[4].strip()
+            if not text:
+                continue
+            if skip_header_footer:
+                if text == common_header or text == common_footer:
+                    continue
+            page_lines.append(text)
+
+        if merge_lines:
+            merged = []
+            buffer = ""
+            for line in page_lines:
+                if buffer:
+                    if not buffer[-1] in '.?!:;"' and not buffer.endswith('"'):
+                        buffer += ' ' + line
+                        continue
+                    else:
+                        merged.append(buffer)
+                        buffer = line
+                else:
+                    buffer = line
+            if buffer:
+                merged.append(buffer)
+            page_lines = merged
+
+        pages_text.extend(page_lines)
+
+    doc.close()
+    return "\n".join(pages_text)
+
+
+def build_synthetic_pdf(path, num_pages, paragraphs_per_page=12):
+    """Writes a PDF with a running header/footer and several text blocks per page."""
+    doc = fitz.open()
+    for page_number in range(1, num_pages + 1):
+        page = doc.new_page()
+        page.insert_text((72, 40), "Course pack - Linear Algebra 2")
+        y = 80
+        for paragraph in range(paragraphs_per_page):
+            page.insert_text(
+                (72, y),
+                f"Section {page_number}.{paragraph} covers vector spaces, bases and\n"
+                f"linear maps between them in some detail.",
+            )
+            y += 52
+        page.insert_text((72, 800), "Faculty of Computer Science")
+    doc.save(path)
+    doc.close()
+
+
+def time_call(func, *args, repeat=3, **kwargs):
+    """Returns (best wall time in seconds, last result) over `repeat` runs."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compare(label, pdf_path, repeat, workers=1, max_chars=None):
+    with fitz.open(pdf_path) as doc:
+        num_pages = len(doc)
+    before, expected = time_call(two_pass_reference, pdf_path, repeat=repeat)
+    after, single = time_call(compress_pdf_to_text, pdf_path, repeat=repeat, dedup=False)
+    # Header/footer detection changed after the two-pass baseline, so its
+    # output is only expected to match when headers/footers are unambiguous
+    status = "same output" if single == expected else "headers/footers differ"
+    print(
+        f"{label:<12} pages={num_pages:<5} two-pass={before * 1000:8.1f} ms  "
+        f"single-pass={after * 1000:8.1f} ms  speedup={before / after:5.2f}x  ({status})"
+    )
+    deduped, actual = time_call(compress_pdf_to_text, pdf_path, repeat=repeat)
+    print(
+        f"{'':<12} with dedup={deduped * 1000:8.1f} ms  "
+        f"({len(single) - len(actual)} of {len(single)} chars removed)"
+    )
+    if workers > 1:
+        parallel, actual = time_call(compress_pdf_to_text, pdf_path, repeat=repeat, workers=workers, dedup=False)
+        status = "same output" if actual == single else "OUTPUT DIFFERS"
+        print(
+            f"{'':<12} workers={workers:<3} parallel={parallel * 1000:8.1f} ms  "
+            f"speedup={before / parallel:5.2f}x  ({status})"
+        )
+    if max_chars:
+        budgeted, actual = time_call(compress_pdf_to_text, pdf_path, repeat=repeat, max_chars=max_chars)
+        status = "same prefix" if actual == single[:max_chars] else "prefix differs"
+        print(
+            f"{'':<12} max_chars={max_chars:<7} budget={budgeted * 1000:8.1f} ms  "
+            f"speedup={before / budgeted:5.2f}x  ({status})"
+        )
+        selection, actual = time_call(select_salient_paragraphs, single, max_chars, repeat=repeat)
+        print(
+            f"{'':<12} max_chars={max_chars:<7} salience selection={selection * 1000:8.1f} ms  "
+            f"({len(actual)} of {len(single)} chars)"
+        )
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Time compress_pdf_to_text against the original two-pass extraction."
+    )
+    parser.add_argument(
+        "--input-file", "-i",
+        default=get_file_path("input.pdf"),
+        help="PDF to time (default: the bundled input.pdf)"
+    )
+    parser.add_argument(
+        "--pages", "-p",
+        type=int,
+        default=500,
+        help="Number of pages in the synthetic PDF (default: 500)"
+    )
+    parser.add_argument(
+        "--repeat", "-r",
+        type=int,
+        default=3,
+        help="Runs per measurement; the best time is reported (default: 3)"
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=1,
+        help="Also time the parallel path with this many workers (default: 1, off)"
+    )
+    parser.add_argument(
+        "--max-chars",
+        type=int,
+        default=25000,
+        help="Also time extraction with this character budget (default: 25000, 0 = off)"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    compare("input.pdf", args.input_file, args.repeat, args.workers, args.max_chars)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        synthetic_path = os.path.join(tmp_dir, "synthetic.pdf")
+        build_synthetic_pdf(synthetic_path, args.pages)
+        compare("synthetic", synthetic_path, args.repeat, args.workers, args.max_chars)
@@ -0,0 +1,154 @@
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Start-up paths of generate_json.py, each run in a fresh interpreter:
+# - help: argument parsing only
+# - extract: PDF extraction without generating (e.g. a batch extraction process)
+# - cache_hit: a full summary run answered from the extraction and generation caches
+PATHS = ("help", "extract", "cache_hit")
+
+# Cold-start budgets, in milliseconds of import time (as reported by
+# python -X importtime), per path. Generous enough for a slow CI runner; a
+# module import that slips back to load time blows them by a wide margin
+# (openai alone takes ~700 ms).
+STARTUP_BUDGETS_MS = {"help": 250, "extract": 800, "cache_hit": 250}
+
+# Libraries each path must not import at all
+FORBIDDEN_MODULES = {
+    "help": ("openai", "fitz", "pymupdf", "numpy", "pptx"),
+    "extract": ("openai", "pptx"),
+    "cache_hit": ("openai", "fitz", "pymupdf", "numpy", "pptx"),
+}
+
+# The reply the cache_hit path is served from the generation cache
+CACHED_REPLY = {"subject": "summary"}
+
+_EXTRACT_CODE = "import sys, generate_json; generate_json.compress_pdf_to_text(sys.argv[1])"
+
+# Fills the caches the way the cache_hit run will look them up
+_PRIME_CODE = """
+import sys, generate_json
+args = generate_json.parse_arguments(["-g", "summary", "-f", "pdf", "-i", sys.argv[1]])
+text = generate_json.extract_source_text(args.input_file[0], generate_json.get_extraction_cache())
+key = generate_json.generation_cache_key("summary", generate_json.build_initial_prompt("summary", args),
+                                         generate_json.load_response_structure("summary"), text)
+generate_json.get_generation_cache().set(key, %r)
+""" % (CACHED_REPLY,)
+
+
+def copy_scripts(target_dir):
+    """
+    Copies the scripts and their JSON files to target_dir, so runs there use
+    (and fill) caches of their own and find no api_key.txt.
+    """
+    for pattern in ("*.py", "*.json"):
+        for path in glob.glob(os.path.join(script_dir, pattern)):
+            shutil.copy(path, target_dir)
+
+
+def path_command(path, input_file):
+    """The command line that runs one start-up path."""
+    if path == "help":
+        return ["generate_json.py", "--help"]
+    if path == "extract":
+        return ["-c", _EXTRACT_CODE, input_file]
+    return ["generate_json.py", "-g", "summary", "-f", "pdf", "-i", input_file, "--stdout-json"]
+
+
+def _import_lines(stderr):
+    """Yields (cumulative microseconds, module name as indented by nesting) per -X importtime line."""
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            yield int(cumulative), name[1:]
+
+
+def import_times(stderr):
+    """Parses -X importtime output into {module: cumulative microseconds}, nested imports included."""
+    return {name.strip(): cumulative for cumulative, name in _import_lines(stderr)}
+
+
+def top_level_import_ms(stderr):
+    """Total import time in milliseconds: the sum over modules imported at the top level."""
+    return sum(cumulative for cumulative, name in _import_lines(stderr) if not name.startswith(" ")) / 1000
+
+
+def run_path(work_dir, path, input_file):
+    """
+    Runs one start-up path with -X importtime in work_dir.
+    Returns (import ms, wall ms, imported modules, completed process).
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *path_command(path, input_file)],
+        cwd=work_dir, capture_output=True, text=True, encoding="utf-8",
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    return top_level_import_ms(completed.stderr), wall_ms, import_times(completed.stderr), completed
+
+
+def measure(input_file, repeat=3):
+    """
+    Measures every start-up path on a fresh copy of the scripts.
+    Returns {path: (best import ms, best wall ms, forbidden modules imported, error or None)}.
+    """
+    input_file = os.path.abspath(input_file)
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        copy_scripts(work_dir)
+        subprocess.run([sys.executable, "-c", _PRIME_CODE, input_file], cwd=work_dir, check=True,
+                       capture_output=True)
+        for path in PATHS:
+            best_import = best_wall = float("inf")
+            forbidden = set()
+            error = None
+            for _ in range(repeat):
+                import_ms, wall_ms, modules, completed = run_path(work_dir, path, input_file)
+                best_import = min(best_import, import_ms)
+                best_wall = min(best_wall, wall_ms)
+                forbidden.update(name for name in FORBIDDEN_MODULES[path] if name in modules)
+                if completed.returncode != 0:
+                    error = f"exit code {completed.returncode}"
+                elif path == "cache_hit" and "Generation cache hit." not in completed.stderr:
+                    error = "generation cache missed"
+            results[path] = (best_import, best_wall, sorted(forbidden), error)
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Time generate_json.py start-up with -X importtime against the cold-start budgets."
+    )
+    parser.add_argument(
+        "--input-file", "-i",
+        default=os.path.join(script_dir, "input.pdf"),
+        help="PDF used by the extract and cache_hit paths (default: the bundled input.pdf)"
+    )
+    parser.add_argument(
+        "--repeat", "-r",
+        type=int,
+        default=3,
+        help="Runs per path; the best time is reported (default: 3)"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    failed = False
+    for path, (import_ms, wall_ms, forbidden, error) in measure(args.input_file, args.repeat).items():
+        budget = STARTUP_BUDGETS_MS[path]
+        status = "ok"
+        if error or forbidden or import_ms > budget:
+            failed = True
+            status = error or (f"imports {', '.join(forbidden)}" if forbidden else "over budget")
+        print(f"{path:<10} imports={import_ms:7.1f} ms  budget={budget:4d} ms  wall={wall_ms:7.1f} ms  ({status})")
+    sys.exit(1 if failed else 0)
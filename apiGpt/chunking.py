@@ -0,0 +1,78 @@
+import re
+
+# Offline token estimate tuned to the GPT-4 family tokenizers: Latin words
+# average ~4 characters per token, Hebrew and other scripts closer to 2,
+# digits are grouped up to 3 per token and each punctuation mark is one token.
+LATIN_CHARS_PER_TOKEN = 4
+OTHER_CHARS_PER_TOKEN = 2
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\W\d_]+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.?!:;])\s+")
+
+
+def count_tokens(text):
+    """Estimates the number of model tokens in `text` without a tokenizer download."""
+    tokens = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        piece = match.group()
+        first = piece[0]
+        if first.isascii() and first.isalpha():
+            tokens += -(-len(piece) // LATIN_CHARS_PER_TOKEN)
+        elif first.isalpha():
+            tokens += -(-len(piece) // OTHER_CHARS_PER_TOKEN)
+        else:
+            tokens += 1
+    return tokens
+
+
+def _split_oversized(paragraph, max_tokens):
+    """Splits one paragraph that exceeds max_tokens on sentences, then on words."""
+    pieces = []
+    for sentence in _SENTENCE_END.split(paragraph):
+        if count_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words = []
+        words_tokens = 0
+        for word in sentence.split():
+            word_tokens = count_tokens(word)
+            if words and words_tokens + word_tokens > max_tokens:
+                pieces.append(" ".join(words))
+                words = []
+                words_tokens = 0
+            words.append(word)
+            words_tokens += word_tokens
+        if words:
+            pieces.append(" ".join(words))
+    return pieces
+
+
+def split_into_chunks(text, max_tokens):
+    """
+    Splits text into chunks of at most ~max_tokens tokens on paragraph (line)
+    boundaries. Paragraphs longer than max_tokens are split on sentence and
+    then word boundaries. Chunks keep the original order.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in text.split("\n"):
+        if not paragraph.strip():
+            continue
+        paragraph_tokens = count_tokens(paragraph)
+        if paragraph_tokens > max_tokens:
+            pieces = _split_oversized(paragraph, max_tokens)
+        else:
+            pieces = [paragraph]
+
+        for piece in pieces:
+            piece_tokens = paragraph_tokens if len(pieces) == 1 else count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
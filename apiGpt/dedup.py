@@ -0,0 +1,221 @@
+import re
+import zlib
+from collections import namedtuple
+from itertools import chain
+
+import numpy as np
+
+# Outcome of dedup_pages: the kept pages (lists of lines) and what was removed
+DedupResult = namedtuple("DedupResult", ["pages", "chars_saved", "pages_dropped", "blocks_dropped"])
+
+# Shingles are runs of this many consecutive words within a line
+SHINGLE_WORDS = 3
+# MinHash signature length
+NUM_HASHES = 64
+# Signature rows per LSH band (64 / 2 = 32 bands): units with a Jaccard
+# similarity of 0.25 (e.g. one slide bullet out of four) share a band with
+# probability ~0.87, at 0.5 almost surely
+BAND_ROWS = 2
+# A page or paragraph is dropped when at least this share of its shingles
+# also appear in a bigger one (or an identical earlier one), e.g. a slide
+# that the next build-up step repeats with one more bullet
+CONTAINMENT_THRESHOLD = 0.9
+# Pairs whose estimated containment is at least CONTAINMENT_THRESHOLD minus
+# this margin are checked exactly, so estimation noise neither drops nor keeps
+# a unit wrongly
+ESTIMATE_MARGIN = 0.15
+# Paragraphs shorter than this are never dropped: short labels such as
+# "Example" or "Proof" legitimately repeat
+MIN_BLOCK_WORDS = 8
+# Shingles hashed per NumPy step, which bounds memory to ~2 MB
+HASH_CHUNK_SHINGLES = 4096
+
+_WORD_OR_BREAK = re.compile(r"\w+|\n")
+_ROLLING_PRIME = np.uint64(0x100000001B3)
+_hash_rng = np.random.default_rng(5318008)  # fixed so results are reproducible
+_MULTIPLIERS = _hash_rng.integers(0, 2 ** 63, NUM_HASHES, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_OFFSETS = _hash_rng.integers(0, 2 ** 63, NUM_HASHES, dtype=np.uint64)
+
+
+def _line_shingles(lines):
+    """
+    Hashes the word shingles of every line in one pass. Lines with fewer than
+    SHINGLE_WORDS words get a single shingle of all their words.
+    Returns (shingle hashes, line index of each shingle, words per line);
+    shingles are ordered by line.
+    """
+    # One pass over the text; line breaks are kept as tokens to number the lines
+    tokens = _WORD_OR_BREAK.findall("\n".join(lines).casefold())
+    vocabulary = {token: index for index, token in enumerate(dict.fromkeys(chain(["\n"], tokens)))}
+    token_ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+    is_word = token_ids != 0
+    line_of_word = np.cumsum(~is_word)[is_word]
+    words_per_line = np.bincount(line_of_word, minlength=len(lines))
+    if not len(line_of_word):
+        return np.zeros(0, dtype=np.uint64), line_of_word, words_per_line
+
+    word_hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in vocabulary),
+                              dtype=np.uint64, count=len(vocabulary))
+    hashes = word_hashes[token_ids[is_word]]
+    words = len(hashes)
+
+    # Roll the next words of the same line into each word's hash
+    padding = SHINGLE_WORDS - 1
+    padded_hashes = np.concatenate([hashes, np.zeros(padding, dtype=np.uint64)])
+    padded_lines = np.concatenate([line_of_word, np.full(padding, -1)])
+    shingles = hashes.copy()
+    same_line = np.ones(words, dtype=bool)
+    with np.errstate(over="ignore"):
+        for offset in range(1, SHINGLE_WORDS):
+            same_line &= padded_lines[offset:offset + words] == line_of_word
+            shingles = np.where(same_line, shingles * _ROLLING_PRIME + padded_hashes[offset:offset + words],
+                                shingles)
+
+    first_word = np.r_[True, line_of_word[1:] != line_of_word[:-1]]
+    valid = same_line | (first_word & (words_per_line[line_of_word] < SHINGLE_WORDS))
+    return shingles[valid], line_of_word[valid], words_per_line
+
+
+def _distinct_counts(groups, hashes, num_groups):
+    """Number of distinct hashes in each group."""
+    # One key per (group, hash) pair; equal pairs end up next to each other
+    with np.errstate(over="ignore"):
+        keys = hashes * _ROLLING_PRIME + groups.astype(np.uint64)
+    order = np.argsort(keys)
+    keys, groups = keys[order], groups[order]
+    new = np.r_[True, keys[1:] != keys[:-1]]
+    return np.bincount(groups[new], minlength=num_groups)
+
+
+def _signatures(shingles, shingle_lines):
+    """
+    MinHash signatures of every line that has shingles, computed in chunks
+    of whole lines. Returns (signatures, indices of those lines, index of
+    each of those lines' first shingle).
+    """
+    starts = np.flatnonzero(np.r_[True, shingle_lines[1:] != shingle_lines[:-1]])
+    signatures = np.empty((len(starts), NUM_HASHES), dtype=np.uint64)
+    # Chunk edges as indices into `starts`, so no line is split between chunks
+    edges = np.unique(np.r_[np.searchsorted(starts, np.arange(0, len(shingles), HASH_CHUNK_SHINGLES)), len(starts)])
+    with np.errstate(over="ignore"):
+        for first, last in zip(edges[:-1], edges[1:]):
+            begin = starts[first]
+            end = starts[last] if last < len(starts) else len(shingles)
+            values = (shingles[begin:end, None] * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)
+            signatures[first:last] = np.minimum.reduceat(values, starts[first:last] - begin, axis=0)
+    return signatures, shingle_lines[starts], starts
+
+
+def _contained(signatures, sizes, shingles, spans):
+    """
+    Marks units whose shingles are nearly all contained in another unit that
+    ranks higher: bigger, or the same size and earlier. Candidates come from
+    LSH buckets, and each unit is only compared with the top-ranked unit of
+    its bucket, so the work stays linear in the number of units. Pairs whose
+    estimated containment is close to the threshold are then checked on
+    their exact shingle sets. The highest-ranked unit of a group of
+    near-duplicates is always kept.
+    - spans: (begin, end) of each unit's shingles in `shingles`
+    """
+    count = len(sizes)
+    if not count:
+        return np.zeros(0, dtype=bool)
+    positions = np.arange(count)
+    # Units from the highest-ranked down; a stable sort by bucket keeps this order
+    ranked = np.lexsort((positions, -sizes))
+    candidates = set()
+    with np.errstate(over="ignore"):
+        for band in range(NUM_HASHES // BAND_ROWS):
+            rows = signatures[:, band * BAND_ROWS:(band + 1) * BAND_ROWS]
+            keys = rows[:, 0].copy()
+            for column in range(1, BAND_ROWS):
+                keys = keys * _ROLLING_PRIME + rows[:, column]
+
+            # Bucket by key; within a bucket the biggest, then earliest, unit comes first
+            order = ranked[np.argsort(keys[ranked], kind="stable")]
+            sorted_keys = keys[order]
+            first = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+            leaders = order[np.maximum.accumulate(np.where(first, positions, 0))]
+            members, leaders = order[~first], leaders[~first]
+            if not len(members):
+                continue
+
+            # The share of hashes whose minimum over both units lies in the
+            # leader estimates |leader| / |union|; it is exactly 1 for a subset
+            in_leader = (signatures[leaders] <= signatures[members]).mean(axis=1)
+            union = sizes[leaders] / in_leader
+            containment = (sizes[members] + sizes[leaders] - union) / sizes[members]
+            likely = containment >= CONTAINMENT_THRESHOLD - ESTIMATE_MARGIN
+            candidates.update(zip(members[likely].tolist(), leaders[likely].tolist()))
+
+    dropped = np.zeros(count, dtype=bool)
+    shingle_sets = {}
+
+    def shingle_set(unit):
+        if unit not in shingle_sets:
+            begin, end = spans[unit]
+            shingle_sets[unit] = set(shingles[begin:end].tolist())
+        return shingle_sets[unit]
+
+    for member, leader in sorted(candidates):
+        if not dropped[member]:
+            member_set = shingle_set(member)
+            if len(member_set & shingle_set(leader)) >= CONTAINMENT_THRESHOLD * len(member_set):
+                dropped[member] = True
+    return dropped
+
+
+def dedup_pages(pages):
+    """
+    Collapses near-duplicate pages and paragraphs, keeping the most complete
+    version of each (e.g. the last build-up step of a slide) in its place.
+    First whole pages are compared, then the paragraphs (lines) of the pages
+    left. Candidates are found with MinHash signatures of word shingles and
+    LSH, so the cost is linear in the length of the text.
+    - pages: a list of pages, each a list of lines
+    Returns a DedupResult; pages left without lines are removed.
+    """
+    lines = [line for page in pages for line in page]
+    page_of_line = np.repeat(np.arange(len(pages)), [len(page) for page in pages])
+    shingles, shingle_lines, words_per_line = _line_shingles(lines)
+    if not len(shingles):
+        return DedupResult(pages, 0, 0, 0)
+    signatures, signed_lines, line_starts = _signatures(shingles, shingle_lines)
+    line_ends = np.r_[line_starts[1:], len(shingles)]
+
+    # Step 1: pages; a page's signature is the minimum over its lines' signatures
+    signed_pages = page_of_line[signed_lines]
+    page_starts = np.flatnonzero(np.r_[True, signed_pages[1:] != signed_pages[:-1]])
+    page_ids = signed_pages[page_starts]
+    page_sizes = _distinct_counts(page_of_line[shingle_lines], shingles, len(pages))[page_ids]
+    page_dropped = np.zeros(len(pages), dtype=bool)
+    page_spans = np.column_stack([line_starts[page_starts], np.r_[line_starts[page_starts[1:]], len(shingles)]])
+    page_signatures = np.minimum.reduceat(signatures, page_starts, axis=0)
+    page_dropped[page_ids[_contained(page_signatures, page_sizes, shingles, page_spans)]] = True
+
+    # Step 2: long enough paragraphs of the pages that are left
+    candidates = ~page_dropped[signed_pages] & (words_per_line[signed_lines] >= MIN_BLOCK_WORDS)
+    block_ids = signed_lines[candidates]
+    line_sizes = _distinct_counts(shingle_lines, shingles, len(lines))
+    line_dropped = np.zeros(len(lines), dtype=bool)
+    block_spans = np.column_stack([line_starts, line_ends])[candidates]
+    line_dropped[block_ids[_contained(signatures[candidates], line_sizes[block_ids], shingles, block_spans)]] = True
+
+    kept_pages = []
+    line_index = 0
+    for page_number, page in enumerate(pages):
+        kept = [] if page_dropped[page_number] else [
+            line for offset, line in enumerate(page) if not line_dropped[line_index + offset]
+        ]
+        line_index += len(page)
+        if kept:
+            kept_pages.append(kept)
+
+    chars_saved = _joined_length(pages) - _joined_length(kept_pages)
+    return DedupResult(kept_pages, chars_saved, int(page_dropped.sum()), int(line_dropped.sum()))
+
+
+def _joined_length(pages):
+    """Length of the pages' lines joined with newlines."""
+    lines = sum(len(page) for page in pages)
+    return sum(len(line) for page in pages for line in page) + max(lines - 1, 0)
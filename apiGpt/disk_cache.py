@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# Temporary files start with this prefix and are never treated as entries.
+TMP_PREFIX = ".tmp-"
+ENTRY_SUFFIX = ".json"
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Returns the hex SHA-256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    """Builds a cache key from JSON-serializable parts (order matters)."""
+    encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class DiskCache:
+    """
+    A directory of JSON entries, bounded in total size with LRU eviction.
+    - Writes go to a temporary file in the same directory and are moved into
+      place with os.replace, so readers never see a partial entry and several
+      processes can share one directory.
+    - Reads bump the entry's mtime; eviction removes the oldest entries first.
+    - With ttl_seconds set, entries older than that (since they were written)
+      are treated as misses and removed.
+    """
+
+    def __init__(self, directory, max_bytes, ttl_seconds=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            # Missing, evicted by another process, or unreadable: treat as a miss
+            return None
+        if not isinstance(entry, dict) or "value" not in entry:
+            return None
+
+        if self.ttl_seconds is not None and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # Evicted between the read and the LRU bump
+        return entry["value"]
+
+    def set(self, key, value):
+        """Atomically stores `value` under `key`, then evicts down to max_bytes."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=TMP_PREFIX, dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created_at": time.time(), "value": value}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def _entries(self):
+        """Returns (mtime, size, path) for every entry in the directory."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if name.startswith(TMP_PREFIX) or not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        entries = self._entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+            total_bytes -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Already evicted by another process
+
+    def clear(self):
+        """Deletes every entry in the cache."""
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,19 +1,29 @@
 import argparse
-import openai
-import json
-import fitz  # PyMuPDF
+import contextlib
+import hashlib
 import io
-import time
-import sys
+import json
+import math
 import os
 import re
 import sys
-from collections import Counter, defaultdict
-
-sys.stdout.reconfigure(encoding='utf-8')
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-#from pptx import Presentation
+from assistant_registry import AssistantRegistry, is_not_found_error
+from chunking import count_tokens, split_into_chunks
+from disk_cache import DiskCache, file_sha256, make_key
+import generate_summary_html_from_json
+import generate_test_html_from_json
+from json_repair import TRUNCATION_REPAIR, parse_json_reply
+from question_bank import QUESTION_KINDS, QuestionBank, drop_near_duplicates
+from response_schema import fill_missing_containers, get_validator, response_format_for
+import tracing
 
+# openai, fitz (PyMuPDF), pptx and the NumPy-based dedup and salience modules
+# are imported by the functions that use them, so --help, a cache hit or a
+# PDF-only run doesn't pay for libraries it never touches.
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -24,92 +34,641 @@ def get_file_path(filename):
 def read_api_key(file_path = os.path.join(script_dir, 'api_key.txt')):
     with open(file_path, "r") as f:
         return f.read().strip()
-    
-# def extract_text_from_pptx(pptx_path):
-#     prs = Presentation(pptx_path)
-#     text = []
-    
-#     for slide in prs.slides:
-#         for shape in slide.shapes:
-#             if hasattr(shape, "text"):
-#                 text.append(shape.text)
-    
-#     return "\n".join(text)
 
-import os
-import fitz  # PyMuPDF
-from collections import Counter, defaultdict
+# Documents shorter than this are always extracted in the calling process;
+# below it the cost of starting workers outweighs the parallel speedup.
+PARALLEL_MIN_PAGES = 64
+
+# When extraction stops early on a character budget, headers/footers are
+# detected from this many pages, taken in pairs of neighbouring pages spread
+# evenly across the document.
+HEADER_FOOTER_SAMPLE_PAGES = 20
+
+# Running headers/footers are looked for among this many blocks at the top
+# and at the bottom of each page, within this fraction of the page height
+# from its top or bottom edge.
+HEADER_FOOTER_EDGE_BLOCKS = 3
+HEADER_FOOTER_EDGE_ZONE = 0.15
+# Block heights are compared in steps of this fraction of the page height
+HEADER_FOOTER_POSITION_STEP = 0.02
+# A block is a header/footer when the same text sits at the same height on
+# at least this many pages and at least this share of the pages, and it
+# either comes back after pages without it or, in one run of pages, covers
+# at least HEADER_FOOTER_SINGLE_RUN_SHARE of the document. A slide title
+# repeated over its build-up steps is a single short run and stays, however
+# many steps it has. Running titles on alternate pages qualify, hence the
+# low share.
+HEADER_FOOTER_MIN_PAGES = 3
+HEADER_FOOTER_MIN_SHARE = 0.05
+HEADER_FOOTER_SINGLE_RUN_SHARE = 0.8
+# Digits are masked in blocks of up to this many words, so page numbers
+# match; longer blocks are body text that must match exactly. Masked blocks
+# only match while their number changes on every page (see
+# _detect_header_footer), so numbered titles are told apart.
+HEADER_FOOTER_MASK_MAX_WORDS = 8
+
+# Characters of extracted source text sent to the model.
+MAX_INPUT_CHARS = 25000
+# How a longer document is cut to MAX_INPUT_CHARS: "salience" extracts it
+# all and keeps its most central paragraphs, "head" keeps its first pages.
+SOURCE_SELECTIONS = ("salience", "head")
+# How MAX_INPUT_CHARS is split between several input documents: in proportion
+# to their extracted length, or to their salience for the subject as a whole
+# (see salience.split_budget).
+BUDGET_SPLITS = ("length", "salience")
+
+EXTRACTION_CACHE_DIR = os.path.join(script_dir, "cache", "extraction")
+EXTRACTION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Part of every extraction cache key; bump it when extraction output changes
+# so entries written by older code are not reused.
+EXTRACTION_VERSION = 5
+
+# A text block of a page. edge_key identifies a block near the top or bottom
+# edge that could be a running header or footer; it is None for body blocks.
+PageBlock = namedtuple("PageBlock", ["text", "edge_key"])
+
+_DIGITS = re.compile(r"\d+")
+
+def _edge_key(edge, text, position):
+    """Header/footer candidate key: the edge, the text (digits masked if short) and the height."""
+    if len(text.split()) <= HEADER_FOOTER_MASK_MAX_WORDS:
+        text = _DIGITS.sub("#", text)
+    return edge, text, round(position / HEADER_FOOTER_POSITION_STEP)
+
+def _edge_blocks(positioned):
+    """
+    Turns (text, top, bottom) tuples in reading order, heights as fractions of
+    the page height, into PageBlocks. The first and last
+    HEADER_FOOTER_EDGE_BLOCKS blocks that lie within HEADER_FOOTER_EDGE_ZONE of
+    the top or bottom edge get an edge_key, so header/footer detection needs
+    no second look at the page.
+    """
+    page_blocks = []
+    for index, (text, top, bottom) in enumerate(positioned):
+        edge_key = None
+        if index < HEADER_FOOTER_EDGE_BLOCKS and top <= HEADER_FOOTER_EDGE_ZONE:
+            edge_key = _edge_key("header", text, top)
+        elif index >= len(positioned) - HEADER_FOOTER_EDGE_BLOCKS and bottom >= 1 - HEADER_FOOTER_EDGE_ZONE:
+            edge_key = _edge_key("footer", text, bottom)
+        page_blocks.append(PageBlock(text, edge_key))
+    return tuple(page_blocks)
+
+def _sorted_page_blocks(page):
+    """
+    Returns the non-empty, stripped text blocks of a PDF page in reading order,
+    as PageBlocks (see _edge_blocks).
+    """
+    blocks = page.get_text("blocks")
+    blocks.sort(key=lambda b: (round(b[1]), round(b[0])))
+    top_edge = page.rect.y0
+    height = page.rect.height or 1
+    # (text, top, bottom), heights as fractions of the page height
+    positioned = []
+    for b in blocks:
+        text = b[4].strip()
+        if text:
+            positioned.append((text, (b[1] - top_edge) / height, (b[3] - top_edge) / height))
+    return _edge_blocks(positioned)
 
-def compress_pdf_to_text(input_pdf_path, skip_header_footer=True, merge_lines=True):
+def _shape_blocks(shapes, box=None):
     """
-    Extracts and cleans text from a PDF, optimized for structured Hebrew content.
+    Yields (text, shape) for the text of python-pptx shapes: text frames,
+    table rows (cells joined with " | ") and, recursively, the shapes inside
+    groups. `shape` is the one to position the text by; shapes in a group are
+    positioned by the group, since their own offsets are relative to it.
+    """
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+    for shape in shapes:
+        position = box or shape
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from _shape_blocks(shape.shapes, position)
+        elif shape.has_table:
+            rows = []
+            for row in shape.table.rows:
+                cells = [" ".join(cell.text.split()) for cell in row.cells if not cell.is_spanned]
+                if any(cells):
+                    rows.append(" | ".join(cells))
+            yield "\n".join(rows), position
+        elif shape.has_text_frame:
+            # Line breaks inside a paragraph come out as vertical tabs
+            yield shape.text_frame.text.replace("\v", "\n"), position
+
+def _is_title_placeholder(shape):
+    """True for a slide's title placeholder."""
+    from pptx.enum.shapes import PP_PLACEHOLDER
+
+    return shape.is_placeholder and shape.placeholder_format.type in (
+        PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE, PP_PLACEHOLDER.VERTICAL_TITLE,
+    )
+
+def _sorted_slide_blocks(slide, slide_height):
+    """
+    Returns the non-empty, stripped text blocks of a slide in reading order,
+    as PageBlocks (see _edge_blocks), followed by the slide's speaker notes.
+    Title placeholders sit in the top edge zone and repeat over a section's
+    slides, but they name the section, so they are never header candidates.
+    - slide_height: the presentation's slide height, in EMU
+    """
+    positioned = []
+    for text, shape in _shape_blocks(slide.shapes):
+        text = text.strip()
+        if not text:
+            continue
+        is_title = _is_title_placeholder(shape)
+        if shape.top is None or shape.height is None:
+            # No position of its own or from its layout: treat it as body text
+            positioned.append((text, 0.5, 0.5, 0, is_title))
+        else:
+            positioned.append((text, shape.top / slide_height, (shape.top + shape.height) / slide_height,
+                               shape.left or 0, is_title))
+    positioned.sort(key=lambda block: (round(block[1], 2), block[3]))
+    blocks = _edge_blocks([(text, top, bottom) for text, top, bottom, _, _ in positioned])
+    blocks = tuple(
+        PageBlock(block.text, None) if is_title else block
+        for block, (_, _, _, _, is_title) in zip(blocks, positioned)
+    )
+
+    notes_frame = slide.notes_slide.notes_text_frame if slide.has_notes_slide else None
+    notes = notes_frame.text.replace("\v", "\n").strip() if notes_frame is not None else ""
+    if notes:
+        blocks += (PageBlock(notes, None),)
+    return blocks
+
+def _exact_key(block):
+    """A block's edge key with its digits unmasked."""
+    edge, _, position = block.edge_key
+    return edge, block.text, position
+
+def _detect_header_footer(pages_blocks):
+    """
+    Finds the running headers and footers among the pages' blocks, given in
+    document order (see HEADER_FOOTER_MIN_PAGES). A digit-masked edge key
+    stands for all its blocks only when none of their texts is found on two
+    pages, like page numbers; otherwise each text is judged on its own, so
+    "Section 1: Overview" and "Section 2: Overview" stay different titles.
+    Returns a frozenset of edge keys, masked or exact (see _is_header_footer);
+    a key that occurs once is never included.
+    """
+    # edge key -> text -> positions of the pages it is found on
+    key_pages = {}
+    num_pages = 0
+    for position, blocks in enumerate(pages_blocks):
+        num_pages += 1
+        for block in blocks:
+            if block.edge_key is not None:
+                found = key_pages.setdefault(block.edge_key, {}).setdefault(block.text, [])
+                if not found or found[-1] != position:
+                    found.append(position)
+
+    min_pages = max(HEADER_FOOTER_MIN_PAGES, math.ceil(HEADER_FOOTER_MIN_SHARE * num_pages))
+    header_footer_keys = set()
+    for key, text_pages in key_pages.items():
+        if all(len(found) == 1 for found in text_pages.values()):
+            candidates = [(key, sorted(position for found in text_pages.values() for position in found))]
+        else:
+            candidates = [((key[0], text, key[2]), found) for text, found in text_pages.items()]
+        for candidate, found in candidates:
+            if len(found) >= min_pages and _is_running(found, num_pages):
+                header_footer_keys.add(candidate)
+    return frozenset(header_footer_keys)
+
+def _is_running(positions, num_pages):
+    """
+    True if a block found on the pages at these sorted positions comes back
+    after a gap, or covers HEADER_FOOTER_SINGLE_RUN_SHARE of the pages.
+    """
+    has_gap = any(after - before > 1 for before, after in zip(positions, positions[1:]))
+    return has_gap or len(positions) >= HEADER_FOOTER_SINGLE_RUN_SHARE * num_pages
+
+def _is_header_footer(block, header_footer_keys):
+    """True if a block matches one of _detect_header_footer's keys."""
+    return block.edge_key is not None and (
+        block.edge_key in header_footer_keys or _exact_key(block) in header_footer_keys
+    )
+
+def _merge_broken_lines(lines):
+    """Merges lines that don't end with punctuation into the line that follows."""
+    merged = []
+    buffer = ""
+    for line in lines:
+        if buffer:
+            # if previous line seems incomplete
+            if not buffer[-1] in '.?!:;"' and not buffer.endswith('"'):
+                buffer += ' ' + line
+                continue
+            else:
+                merged.append(buffer)
+                buffer = line
+        else:
+            buffer = line
+    if buffer:
+        merged.append(buffer)
+    return merged
+
+def _sample_page_numbers(num_pages, sample_size=HEADER_FOOTER_SAMPLE_PAGES):
+    """
+    Returns up to `sample_size` page numbers: pairs of neighbouring pages
+    spread evenly over the document, so a block repeated on neighbouring
+    pages (a slide title over its build-up steps) can be told from a running
+    header, and a numbered title from a page number.
+    """
+    if num_pages <= sample_size:
+        return list(range(num_pages))
+    step = num_pages / (sample_size // 2)
+    return sorted({page_number
+                   for index in range(sample_size // 2)
+                   for page_number in (int(index * step), int(index * step) + 1)})
+
+def _clean_page_lines(blocks, header_footer_keys, skip_header_footer=True, merge_lines=True):
+    """Applies the header/footer filter and line merging to one page's blocks."""
+    if skip_header_footer:
+        page_lines = [block.text for block in blocks if not _is_header_footer(block, header_footer_keys)]
+    else:
+        page_lines = [block.text for block in blocks]
+
+    # Optionally merge lines that don't end with punctuation
+    if merge_lines:
+        page_lines = _merge_broken_lines(page_lines)
+    return page_lines
+
+def _resolve_source(source):
+    """
+    Normalizes a PDF or PPTX source: path-like sources become an absolute path
+    to an existing file, in-memory buffers and open binary streams become bytes.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return source
+    if isinstance(source, memoryview):
+        # Older PyMuPDF releases only accept bytes/bytearray streams
+        return source.tobytes()
+    if hasattr(source, "read"):
+        return source.read()
+
+    input_path = os.fspath(source)
+    # Ensure absolute path
+    if not os.path.isabs(input_path):
+        input_path = os.path.abspath(input_path)
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"Input file not found: {input_path}")
+    return input_path
+
+def _open_pdf(pdf_source):
+    """Opens a source returned by _resolve_source with PyMuPDF, imported on first use."""
+    import fitz  # PyMuPDF
+
+    if isinstance(pdf_source, str):
+        return fitz.open(pdf_source)
+    return fitz.open(stream=pdf_source, filetype="pdf")
+
+def _open_pptx(pptx_source):
+    """Opens a source returned by _resolve_source with python-pptx, imported on first use."""
+    from pptx import Presentation
+
+    if isinstance(pptx_source, str):
+        return Presentation(pptx_source)
+    return Presentation(io.BytesIO(pptx_source))
+
+class PdfPages:
+    """The PageBlocks of each page of a PDF; closes the document on exit."""
+
+    def __init__(self, pdf_source):
+        self.doc = _open_pdf(pdf_source)
+
+    def __len__(self):
+        return len(self.doc)
+
+    def blocks(self, page_number):
+        return _sorted_page_blocks(self.doc[page_number])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.doc.close()
+
+class PptxPages:
+    """The PageBlocks of each slide of a presentation; a slide's shapes are walked when it is read."""
+
+    def __init__(self, pptx_source):
+        presentation = _open_pptx(pptx_source)
+        self.slides = presentation.slides
+        self.slide_height = presentation.slide_height or 1
+
+    def __len__(self):
+        return len(self.slides)
+
+    def blocks(self, page_number):
+        return _sorted_slide_blocks(self.slides[page_number], self.slide_height)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+# Page readers by --file-type; slides count as pages everywhere below
+PAGE_READERS = {"pdf": PdfPages, "pptx": PptxPages}
+
+def _extract_page_range(page_range):
+    """
+    Worker entry point: opens the document itself and returns the sorted blocks
+    of pages [start, stop). Takes a single (file type, source, start, stop)
+    tuple so it can be used with Executor.map.
+    """
+    file_type, source, start, stop = page_range
+    with PAGE_READERS[file_type](source) as pages:
+        return [pages.blocks(page_number) for page_number in range(start, stop)]
+
+def _split_page_range(num_pages, workers):
+    """Splits [0, num_pages) into at most `workers` contiguous, near-equal ranges."""
+    chunk_size, remainder = divmod(num_pages, workers)
+    ranges = []
+    start = 0
+    for index in range(workers):
+        stop = start + chunk_size + (1 if index < remainder else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def _collect_pages_blocks(source, workers=1, parallel_min_pages=PARALLEL_MIN_PAGES, file_type="pdf"):
+    """
+    Returns the sorted blocks of every page, in page order.
+    With workers > 1 and at least `parallel_min_pages` pages, the page range is
+    split across a process pool and each worker opens the document on its own
+    (in-memory sources are sent to every worker).
+    """
+    with PAGE_READERS[file_type](source) as pages:
+        num_pages = len(pages)
+        if workers <= 1 or num_pages < parallel_min_pages:
+            return [pages.blocks(page_number) for page_number in range(num_pages)]
+
+    page_ranges = [
+        (file_type, source, start, stop)
+        for start, stop in _split_page_range(num_pages, workers)
+    ]
+    pages_blocks = []
+    with ProcessPoolExecutor(max_workers=len(page_ranges)) as executor:
+        # map() yields results in submission order, so pages stay in order
+        for range_blocks in executor.map(_extract_page_range, page_ranges):
+            pages_blocks.extend(range_blocks)
+    return pages_blocks
+
+def iter_document_text(input_path, file_type="pdf", skip_header_footer=True, merge_lines=True,
+                       workers=1, parallel_min_pages=PARALLEL_MIN_PAGES, sample_header_footer=False):
+    """
+    Yields the cleaned text of each page (or slide) in order, its lines joined
+    with "\n". Pages left with no text are skipped, so "\n".join() over the
+    generator gives the same text as compress_document_text.
+    - input_path: a file path, a bytes/bytearray/memoryview buffer, or an
+      open binary stream
+    - file_type: a key of PAGE_READERS
+    - skip_header_footer, merge_lines, workers, parallel_min_pages: as in
+      compress_document_text
+    - sample_header_footer: detect headers/footers from HEADER_FOOTER_SAMPLE_PAGES
+      pages instead of the whole document. Pages are then read lazily as the
+      generator is consumed, which keeps memory flat and lets callers stop
+      early without reading the rest (workers is ignored in this mode).
+    """
+    source = _resolve_source(input_path)
+
+    if not sample_header_footer:
+        # Single pass: collect the sorted, stripped blocks of every page
+        pages_blocks = _collect_pages_blocks(source, workers, parallel_min_pages, file_type)
+
+        # Determine repeated headers/footers over the combined candidates
+        header_footer_keys = _detect_header_footer(pages_blocks)
+
+        # Filter and merge from the collected blocks, without touching the document again
+        for page_number, blocks in enumerate(pages_blocks):
+            pages_blocks[page_number] = None  # Release pages already handed out
+            page_lines = _clean_page_lines(blocks, header_footer_keys, skip_header_footer, merge_lines)
+            if page_lines:
+                yield "\n".join(page_lines)
+        return
+
+    with PAGE_READERS[file_type](source) as pages:
+        sampled_blocks = {
+            page_number: pages.blocks(page_number)
+            for page_number in _sample_page_numbers(len(pages))
+        }
+        header_footer_keys = _detect_header_footer(sampled_blocks.values())
+
+        for page_number in range(len(pages)):
+            if page_number in sampled_blocks:
+                blocks = sampled_blocks.pop(page_number)
+            else:
+                blocks = pages.blocks(page_number)
+            page_lines = _clean_page_lines(blocks, header_footer_keys, skip_header_footer, merge_lines)
+            if page_lines:
+                yield "\n".join(page_lines)
+
+def iter_pdf_text(input_pdf_path, skip_header_footer=True, merge_lines=True,
+                  workers=1, parallel_min_pages=PARALLEL_MIN_PAGES, sample_header_footer=False):
+    """iter_document_text for a PDF."""
+    return iter_document_text(input_pdf_path, "pdf", skip_header_footer, merge_lines,
+                              workers, parallel_min_pages, sample_header_footer)
+
+def iter_pptx_text(input_pptx_path, skip_header_footer=True, merge_lines=True,
+                   workers=1, parallel_min_pages=PARALLEL_MIN_PAGES, sample_header_footer=False):
+    """iter_document_text for a PowerPoint presentation, one text per slide (notes and tables included)."""
+    return iter_document_text(input_pptx_path, "pptx", skip_header_footer, merge_lines,
+                              workers, parallel_min_pages, sample_header_footer)
+
+def _dedup_pages_text(pages_text):
+    """Drops near-duplicate pages and paragraphs (see dedup.dedup_pages) and reports the saving."""
+    from dedup import dedup_pages
+
+    result = dedup_pages([page_text.split("\n") for page_text in pages_text])
+    tracing.annotate(dedup_pages=result.pages_dropped, dedup_blocks=result.blocks_dropped,
+                     dedup_chars_saved=result.chars_saved)
+    if result.chars_saved:
+        print(f"Removed {result.pages_dropped} near-duplicate pages and {result.blocks_dropped} "
+              f"near-duplicate paragraphs ({result.chars_saved} characters).")
+    return ["\n".join(lines) for lines in result.pages]
+
+def compress_document_text(input_path, file_type="pdf", skip_header_footer=True, merge_lines=True,
+                           workers=1, parallel_min_pages=PARALLEL_MIN_PAGES, max_chars=None, dedup=True):
+    """
+    Extracts and cleans text from a PDF or PPTX, optimized for structured Hebrew content.
+    - input_path: a file path, a bytes/bytearray/memoryview buffer, or an
+      open binary stream
+    - file_type: a key of PAGE_READERS
     - skip_header_footer: detect and remove repeated headers/footers across pages
     - merge_lines: merge lines that are broken mid-sentence
+    - workers: number of processes to extract pages with (1 = single-process)
+    - parallel_min_pages: below this page count extraction stays single-process
+    - max_chars: stop reading pages once this many characters are extracted;
+      the result is at most max_chars long (None = whole document). Headers and
+      footers are then detected from a sample of pages and pages are read
+      sequentially, so workers is ignored.
+    - dedup: collapse near-duplicate pages and paragraphs, such as the
+      build-up steps of a slide, into their most complete version. Needs the
+      whole document, so it is skipped when max_chars is set.
+
+    Thin wrapper that joins the pages yielded by iter_document_text.
     """
-    # Ensure absolute path
-    if not os.path.isabs(input_pdf_path):
-        input_pdf_path = os.path.abspath(input_pdf_path)
-    if not os.path.exists(input_pdf_path):
-        raise FileNotFoundError(f"PDF file not found: {input_pdf_path}")
+    if max_chars is None:
+        pages_text = list(iter_document_text(input_path, file_type, skip_header_footer, merge_lines,
+                                             workers, parallel_min_pages))
+        if dedup:
+            pages_text = _dedup_pages_text(pages_text)
+        tracing.annotate(pages=len(pages_text))
+        # Join pages with blank line for separation
+        return "\n".join(pages_text)
 
-    doc = fitz.open(input_pdf_path)
+    pages = iter_document_text(input_path, file_type, skip_header_footer, merge_lines, sample_header_footer=True)
     pages_text = []
-    header_candidates = []
-    footer_candidates = []
-
-    # First pass: collect first and last lines as header/footer candidates
-    for page in doc:
-        blocks = page.get_text("blocks")
-        blocks.sort(key=lambda b: (round(b[1]), round(b[0])))
-        lines = [b[4].strip() for b in blocks if b[4].strip()]
-        if lines:
-            header_candidates.append(lines[0])
-            footer_candidates.append(lines[-1])
-
-    # Determine repeated headers/footers
-    header_counts = Counter(header_candidates)
-    footer_counts = Counter(footer_candidates)
-    common_header = header_counts.most_common(1)[0][0] if header_counts else None
-    common_footer = footer_counts.most_common(1)[0][0] if footer_counts else None
-
-    # Second pass: extract and clean text
-    for page in doc:
-        blocks = page.get_text("blocks")
-        blocks.sort(key=lambda b: (round(b[1]), round(b[0])))
-        page_lines = []
-        for b in blocks:
-            text = b[4].strip()
-            if not text:
-                continue
-            if skip_header_footer:
-                if text == common_header or text == common_footer:
-                    continue
-            page_lines.append(text)
-
-        # Optionally merge lines that don't end with punctuation
-        if merge_lines:
-            merged = []
-            buffer = ""
-            for line in page_lines:
-                if buffer:
-                    # if previous line seems incomplete
-                    if not buffer[-1] in '.?!:;"' and not buffer.endswith('"'):
-                        buffer += ' ' + line
-                        continue
-                    else:
-                        merged.append(buffer)
-                        buffer = line
-                else:
-                    buffer = line
-            if buffer:
-                merged.append(buffer)
-            page_lines = merged
+    total_chars = 0
+    for page_text in pages:
+        pages_text.append(page_text)
+        total_chars += len(page_text) + 1  # +1 for the joining newline
+        if total_chars > max_chars:
+            break
+    pages.close()  # Closes the document without reading the remaining pages
+    tracing.annotate(pages=len(pages_text))
+    return "\n".join(pages_text)[:max_chars]
+
+def compress_pdf_to_text(input_pdf_path, skip_header_footer=True, merge_lines=True,
+                         workers=1, parallel_min_pages=PARALLEL_MIN_PAGES, max_chars=None, dedup=True):
+    """compress_document_text for a PDF."""
+    return compress_document_text(input_pdf_path, "pdf", skip_header_footer, merge_lines,
+                                  workers, parallel_min_pages, max_chars, dedup)
+
+def compress_pptx_to_text(input_pptx_path, skip_header_footer=True, merge_lines=True,
+                          workers=1, parallel_min_pages=PARALLEL_MIN_PAGES, max_chars=None, dedup=True):
+    """compress_document_text for a PowerPoint presentation (slides count as pages)."""
+    return compress_document_text(input_pptx_path, "pptx", skip_header_footer, merge_lines,
+                                  workers, parallel_min_pages, max_chars, dedup)
+
+def get_extraction_cache():
+    """Returns the shared on-disk cache of extracted document text."""
+    return DiskCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES)
+
+def extract_text_cached(input_path, cache, file_type="pdf", skip_header_footer=True, merge_lines=True,
+                        workers=1, max_chars=None, dedup=True):
+    """
+    Same as compress_document_text, but looks the result up in `cache` first.
+    The key is the file's content hash plus the options that change the output,
+    so a repeat upload of the same file is never opened again.
+    Pass cache=None to bypass the cache.
+    """
+    with tracing.span("extract", file_type=file_type, max_chars=max_chars, workers=workers) as stage:
+        text = _extract_text_cached(input_path, cache, file_type, skip_header_footer, merge_lines,
+                                    workers, max_chars, dedup)
+        if stage.recording:
+            stage.set(chars=len(text), tokens=count_tokens(text))
+        return text
+
+def _extract_text_cached(input_path, cache, file_type, skip_header_footer, merge_lines, workers, max_chars, dedup):
+    if cache is None:
+        return compress_document_text(input_path, file_type, skip_header_footer, merge_lines,
+                                      workers=workers, max_chars=max_chars, dedup=dedup)
+
+    # Resolve once so a stream is read only once, for both hashing and extraction
+    input_path = _resolve_source(input_path)
+    if isinstance(input_path, str):
+        content_hash = file_sha256(input_path)
+    else:
+        content_hash = hashlib.sha256(input_path).hexdigest()
+    key = make_key(file_type, EXTRACTION_VERSION, content_hash,
+                   skip_header_footer, merge_lines, max_chars, dedup and max_chars is None)
+    text = cache.get(key)
+    tracing.annotate(cache_hit=text is not None)
+    if text is not None:
+        print("Extraction cache hit.")
+        return text
+
+    text = compress_document_text(input_path, file_type, skip_header_footer, merge_lines,
+                                  workers=workers, max_chars=max_chars, dedup=dedup)
+    cache.set(key, text)
+    return text
 
-        pages_text.extend(page_lines)
+def extract_source_text(input_path, cache, workers=1, max_chars=MAX_INPUT_CHARS, selection="salience",
+                        dedup=True, file_type="pdf"):
+    """
+    The source text sent to the model: at most max_chars of the document's text.
+    - selection: "salience" extracts the whole document and keeps the
+      paragraphs most central to it, in document order (see
+      salience.select_salient_paragraphs); "head" stops extracting at
+      max_chars, which is cheaper but only covers the first pages
+    - dedup: as in compress_document_text (whole-document extraction only)
+    - file_type: a key of PAGE_READERS
+    """
+    if max_chars is None or selection == "head":
+        return extract_text_cached(input_path, cache, file_type, workers=workers, max_chars=max_chars, dedup=dedup)
+
+    text = extract_text_cached(input_path, cache, file_type, workers=workers, dedup=dedup)
+    if len(text) <= max_chars:
+        return text
+    with tracing.span("select", selection=selection, max_chars=max_chars, chars_in=len(text)) as stage:
+        # The selection is cached too, so a repeat run doesn't import NumPy
+        key = make_key("select", EXTRACTION_VERSION, hashlib.sha256(text.encode("utf-8")).hexdigest(), max_chars)
+        selected = cache.get(key) if cache is not None else None
+        stage.set(cache_hit=selected is not None)
+        if selected is None:
+            from salience import select_salient_paragraphs
+
+            selected = select_salient_paragraphs(text, max_chars)
+            if cache is not None:
+                cache.set(key, selected)
+        stage.set(chars=len(selected))
+    print(f"Selected {len(selected)} of {len(text)} characters of source text.")
+    return selected
+
+def file_type_for(input_path, default="pdf"):
+    """The file type of an input by its extension, or `default` for other names and stdin."""
+    extension = os.path.splitext(os.fspath(input_path))[1].lower().lstrip(".")
+    return extension if extension in PAGE_READERS else default
+
+def source_label(input_path):
+    """The heading of one document's section in a multi-document source text."""
+    return f"--- Source: {os.path.basename(os.fspath(input_path))} ---"
+
+def _extract_whole_text(input_path, cache, file_type, dedup):
+    """Process-pool task: the whole extracted (and cached) text of one document."""
+    return extract_text_cached(input_path, cache, file_type, dedup=dedup)
+
+def extract_sources_text(input_paths, cache, max_chars=MAX_INPUT_CHARS, selection="salience", dedup=True,
+                         budget_split="length", default_file_type="pdf"):
+    """
+    The source text of several documents for one generation: each document's
+    section is headed by source_label and sections are separated by a blank
+    line. The documents are extracted concurrently, one process each (up to
+    the CPU count), then max_chars, less the headings, is split between them
+    with split_budget and each document is cut to its share with `selection`.
+    - input_paths: file paths; their type comes from file_type_for
+    - budget_split: a key of BUDGET_SPLITS
+    """
+    from salience import select_salient_paragraphs, split_budget
+
+    file_types = [file_type_for(path, default_file_type) for path in input_paths]
+    labels = [source_label(path) for path in input_paths]
+    processes = min(len(input_paths), os.cpu_count() or 1)
+    with tracing.span("extract_sources", documents=len(input_paths), processes=processes) as stage:
+        if processes > 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                texts = list(executor.map(_extract_whole_text, input_paths, [cache] * len(input_paths),
+                                          file_types, [dedup] * len(input_paths)))
+        else:
+            texts = [_extract_whole_text(path, cache, file_type, dedup)
+                     for path, file_type in zip(input_paths, file_types)]
 
-    doc.close()
-    # Join pages with blank line for separation
-    return "\n".join(pages_text)
+        if max_chars is not None:
+            # Every heading takes its line and the blank line before the next section
+            overhead = sum(len(label) + 1 for label in labels) + 2 * (len(labels) - 1)
+            budgets = split_budget(texts, max(max_chars - overhead, 0), budget_split)
+            for index, (text, budget) in enumerate(zip(texts, budgets)):
+                if len(text) > budget:
+                    cut = select_salient_paragraphs(text, budget) if selection == "salience" else text[:budget]
+                    print(f"Kept {len(cut)} of {len(text)} characters of {os.path.basename(input_paths[index])}.")
+                    texts[index] = cut
+            stage.set(budgets=budgets)
+
+        source_text = "\n\n".join(f"{label}\n{text}" for label, text in zip(labels, texts))
+        stage.set(chars=len(source_text))
+    return source_text
 
 
 # Define the missing get_prompt function
@@ -146,17 +705,8 @@ def get_prompt(prompt_type, params=None):
             
         return base_prompt
 
-def generate_content(
-    generate_type, initial_prompt, response_structure, text_input
-) -> int:
-    # Step 1: Read API key from file
-    api_key = read_api_key()
-    
-    # Initialize OpenAI Client
-    openai_client = openai.OpenAI(api_key=api_key)
-    
-    # Create more detailed instructions based on generate_type
-    instructions = instructions = """
+# Shared system instructions for every test/summary assistant
+ASSISTANT_INSTRUCTIONS = """
     You are an expert academic assistant specializing in generating high-quality educational content in Hebrew. 
 
     For TEST GENERATION:
@@ -205,28 +755,69 @@ def generate_content(
     Do not return json values with one Quotation mark, always use double quotes.
     """
 
-    # Step 2: Create an Assistant
-    assistant = openai_client.beta.assistants.create(
-        name="Test/Summary Generator",
-        instructions=instructions,
-        model="gpt-4.1",  # Use the latest model
-    )
-    assistant_id = assistant.id
+ASSISTANT_MODEL = "gpt-4.1"  # Use the latest model
+ASSISTANT_NAME = "Test/Summary Generator"
+
+# Assistant ids per (model, instructions hash), reused across runs
+ASSISTANT_REGISTRY_FILE = os.path.join(script_dir, "cache", "assistants.json")
+
+TEMPERATURE = 0.0  # Adjust temperature for more deterministic output
+MAX_COMPLETION_TOKENS = 30000
+
+# Parsed model replies, keyed by source text, prompt and model settings
+GENERATION_CACHE_DIR = os.path.join(script_dir, "cache", "generation")
+GENERATION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+GENERATION_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Every generated exam question, per document, so repeat exam requests can be
+# served from earlier generations (see question_bank.py)
+QUESTION_BANK_DIR = os.path.join(script_dir, "cache", "question_bank")
+# When the bank falls short, also generate this many more exams' worth of
+# questions for later requests (--prefetch-exams). Off by default: it
+# multiplies the completion tokens and latency of the request that pays for it.
+QUESTION_BANK_PREFETCH_EXAMS = 0
+
+# Polling fallback when a run can't be streamed: the delay between status
+# checks grows from POLL_INITIAL_DELAY by POLL_BACKOFF_FACTOR up to
+# POLL_MAX_DELAY, and the run is abandoned after RUN_TIMEOUT_SECONDS.
+POLL_INITIAL_DELAY = 0.5
+POLL_BACKOFF_FACTOR = 1.5
+POLL_MAX_DELAY = 5.0
+RUN_TIMEOUT_SECONDS = 900
+RUN_FAILED_EVENTS = ("thread.run.failed", "thread.run.cancelled", "thread.run.expired")
 
-    print(f"Assistant created: {assistant_id}")
+# --job-id values become a directory name under output/jobs/
+JOB_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,127}$")
 
-    # Step 3: Create a Thread
-    thread = openai_client.beta.threads.create()
-    thread_id = thread.id
+# Map-reduce summary defaults: tokens of source text per chunk and how many
+# chunk runs are in flight at once.
+DEFAULT_CHUNK_TOKENS = 6000
+DEFAULT_CONCURRENCY = 4
 
-    print(f"Thread created: {thread_id}")
+# First message of a thread shared by several generations (--generate-type
+# both): the source is sent once and each task message refers back to it.
+SHARED_SOURCE_MESSAGE = """
+        SOURCE MATERIAL:
+        {text_input}
+
+        The messages that follow each ask for one JSON document (a test or a
+        summary) based only on the source material above.
+        """
+SHARED_SOURCE_REFERENCE = "The source material is in the first message of this thread."
 
+def build_message_content(initial_prompt, response_structure, text_input=None):
+    """
+    Wraps the prompt and source material with the output requirements.
+    With text_input=None the message refers to the source already sent in
+    the thread's first message instead (see shared_source_thread).
+    """
+    source = SHARED_SOURCE_REFERENCE if text_input is None else text_input
     # Format the content to emphasize JSON requirements
-    content = f"""
+    return f"""
         {initial_prompt}
 
         SOURCE MATERIAL:
-        {text_input}
+        {source}
 
         SPECIFIC INSTRUCTIONS:
         1. Analyze the content thoroughly before generating output
@@ -255,108 +846,705 @@ def generate_content(
         - For tests: Avoid trivial questions - focus on meaningful assessment
         - For summaries: Include conceptual relationships between ideas
         """
-    print(content)
 
-    # Step 5: Send a Message with Text Input
-    message = openai_client.beta.threads.messages.create(
-        thread_id=thread_id,
-        role="user",
-        content=content,
-    )
+# Outcome of one assistant run. time_to_first_token and total_latency are in
+# seconds from the start of run_assistant; streamed is False when the reply
+# was collected by polling. usage holds the token counts the API reported
+# ({"prompt_tokens", "completion_tokens", "total_tokens"}), when it did.
+RunResult = namedtuple("RunResult", ["text", "time_to_first_token", "total_latency", "streamed", "usage"],
+                       defaults=(None,))
 
-    print("Message sent to assistant.")
+def _usage_dict(usage):
+    """The API's usage object as a plain dict, or None."""
+    if usage is None:
+        return None
+    return {
+        field: getattr(usage, field, None)
+        for field in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+
+def _run_options(response_format=None):
+    options = {
+        "temperature": TEMPERATURE,
+        "max_completion_tokens": MAX_COMPLETION_TOKENS,
+    }
+    if response_format is not None:
+        options["response_format"] = response_format
+    return options
+
+def _is_stream_keyword_error(error):
+    """True for the TypeError an SDK without streaming support raises for runs.create(stream=True)."""
+    return "unexpected keyword argument 'stream'" in str(error)
 
-    # Step 6: Run the Assistant
-    run = openai_client.beta.threads.runs.create(
+def _stream_run(openai_client, thread_id, assistant_id, started, run_ids, response_format=None,
+                run_info=None):
+    """
+    Creates a streamed run and accumulates the reply from message deltas as
+    they arrive. Appends the run id to `run_ids` as soon as it is known, so a
+    stream that ends without text can fall back to polling the same run.
+    Records the time the run left the queue ("queue_time") and the token
+    usage in `run_info`.
+    Returns (text, time_to_first_token).
+    """
+    if run_info is None:
+        run_info = {}
+    stream = openai_client.beta.threads.runs.create(
         thread_id=thread_id,
         assistant_id=assistant_id,
-        temperature=0.0,  # Adjust temperature for more deterministic output
-        max_completion_tokens=30000,
+        stream=True,
+        **_run_options(response_format),
     )
+    parts = []
+    time_to_first_token = None
+    for event in stream:
+        if event.event == "thread.run.created":
+            run_ids.append(event.data.id)
+        elif event.event == "thread.run.in_progress":
+            run_info.setdefault("queue_time", time.perf_counter() - started)
+        elif event.event == "thread.run.completed":
+            run_info["usage"] = _usage_dict(getattr(event.data, "usage", None))
+        elif event.event == "thread.message.delta":
+            for delta_content in event.data.delta.content or []:
+                if delta_content.type == "text" and delta_content.text and delta_content.text.value:
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - started
+                    parts.append(delta_content.text.value)
+        elif event.event == "thread.run.incomplete":
+            print("Warning: run stopped before completion; the reply may be truncated.")
+            run_info["usage"] = _usage_dict(getattr(event.data, "usage", None))
+        elif event.event in RUN_FAILED_EVENTS:
+            print("Error: Processing failed.")
+            print(event.data)
+            raise RuntimeError(f"Run {event.data.id} ended with status {event.data.status}.")
+        elif event.event == "error":
+            raise RuntimeError(f"Run stream error: {event.data}")
+    return "".join(parts), time_to_first_token
 
-    print("Processing...")
-
-    # Step 7: Wait for Completion & Retrieve the Response
+def _poll_run(openai_client, thread_id, run_id, started, timeout, run_info=None):
+    """
+    Waits for a run to finish, polling with exponential backoff, and raises
+    TimeoutError (after cancelling the run) if it takes longer than `timeout`.
+    Records when the run was first seen out of the queue ("queue_time") and
+    the token usage in `run_info`.
+    """
+    if run_info is None:
+        run_info = {}
+    delay = POLL_INITIAL_DELAY
     while True:
         run_status = openai_client.beta.threads.runs.retrieve(
-            thread_id=thread_id, run_id=run.id
+            thread_id=thread_id, run_id=run_id
         )
+        if run_status.status != "queued":
+            run_info.setdefault("queue_time", time.perf_counter() - started)
         if run_status.status == "completed":
             print("Processing completed.")
-            break
-        elif run_status.status == "failed":
+            run_info["usage"] = _usage_dict(getattr(run_status, "usage", None))
+            return
+        elif run_status.status == "incomplete":
+            print("Warning: run stopped before completion; the reply may be truncated.")
+            run_info["usage"] = _usage_dict(getattr(run_status, "usage", None))
+            return
+        elif run_status.status in ("failed", "cancelled", "expired"):
             print("Error: Processing failed.")
             print(run_status)
-            exit(1)
+            raise RuntimeError(f"Run {run_id} ended with status {run_status.status}.")
+
+        if time.perf_counter() - started + delay > timeout:
+            try:
+                openai_client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+            except Exception as e:
+                print(f"Could not cancel run {run_id}: {e}")
+            raise TimeoutError(f"Run {run_id} did not finish within {timeout} seconds.")
+
         print(f"Status: {run_status.status}")
-        time.sleep(2)  # Wait before checking again
+        time.sleep(delay)  # Wait before checking again, backing off
+        delay = min(delay * POLL_BACKOFF_FACTOR, POLL_MAX_DELAY)
 
-    # Step 8: Fetch Messages
+def _fetch_reply(openai_client, thread_id):
+    """Returns the assistant's text reply on a thread, or None."""
     messages = openai_client.beta.threads.messages.list(thread_id=thread_id)
 
     # Extract assistant response
     response_text = None
     for msg in messages.data:
         if msg.role == "assistant":
-            for content in msg.content:
-                if content.type == "text":
-                    response_text = content.text.value
+            for message_content in msg.content:
+                if message_content.type == "text":
+                    response_text = message_content.text.value
                     break
+    return response_text
+
+def run_assistant(openai_client, assistant_id, content, stream=True, timeout=RUN_TIMEOUT_SECONDS,
+                  response_format=None, thread_id=None, post_message=True):
+    """
+    Sends `content` on a new thread (or on `thread_id`, after the messages
+    already there), runs the assistant and returns a RunResult.
+    With post_message=False, `content` is already the last message on
+    `thread_id` (see send_message) and only the run is created.
+    `response_format` (see response_schema.response_format_for) constrains the
+    reply to JSON or to a JSON Schema.
+    The run is streamed and the reply accumulated as it arrives; if streaming
+    is unavailable it falls back to polling with exponential backoff, bounded
+    by `timeout` seconds. Raises RuntimeError if the run fails or no text
+    comes back.
+    """
+    with tracing.span("run", model=ASSISTANT_MODEL, prompt_chars=len(content)) as stage:
+        result = _run_assistant(openai_client, assistant_id, content, stream, timeout, response_format,
+                                stage, thread_id, post_message)
+        stage.set(
+            streamed=result.streamed,
+            time_to_first_token_ms=round(result.time_to_first_token * 1000, 3),
+            **(result.usage or {}),
+        )
+        return result
+
+def send_message(openai_client, content, thread_id=None):
+    """Sends `content` on a new thread (or on `thread_id`) and returns the thread id."""
+    # Step 3: Create a Thread, unless continuing a shared one
+    if thread_id is None:
+        thread = openai_client.beta.threads.create()
+        thread_id = thread.id
+
+        print(f"Thread created: {thread_id}")
+
+    # Step 5: Send a Message with Text Input
+    openai_client.beta.threads.messages.create(
+        thread_id=thread_id,
+        role="user",
+        content=content,
+    )
+
+    print("Message sent to assistant.")
+    return thread_id
+
+def _run_assistant(openai_client, assistant_id, content, stream, timeout, response_format, stage,
+                   thread_id=None, post_message=True):
+    started = time.perf_counter()
+    run_info = {}
+
+    if post_message:
+        thread_id = send_message(openai_client, content, thread_id)
+
+    # Step 6: Run the Assistant, streaming the reply when possible
+    print("Processing...")
+    run_ids = []
+    if stream:
+        try:
+            response_text, time_to_first_token = _stream_run(
+                openai_client, thread_id, assistant_id, started, run_ids, response_format, run_info
+            )
+            if response_text:
+                total_latency = time.perf_counter() - started
+                _record_queue_time(stage, run_info)
+                return RunResult(response_text, time_to_first_token, total_latency, True,
+                                 run_info.get("usage"))
+        except TypeError as e:
+            if not _is_stream_keyword_error(e):
+                raise
+            print(f"Streaming unavailable ({e}); falling back to polling.")
+
+    # Step 7: Wait for Completion & Retrieve the Response
+    if run_ids:
+        run_id = run_ids[-1]
+    else:
+        run = openai_client.beta.threads.runs.create(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            **_run_options(response_format),
+        )
+        run_id = run.id
+    _poll_run(openai_client, thread_id, run_id, started, timeout, run_info)
+    _record_queue_time(stage, run_info)
+
+    # Step 8: Fetch Messages
+    response_text = _fetch_reply(openai_client, thread_id)
 
     if not response_text:
         print("No response received.")
-        exit(1)
+        raise RuntimeError("No response received.")
+
+    total_latency = time.perf_counter() - started
+    return RunResult(response_text, total_latency, total_latency, False, run_info.get("usage"))
+
+def _record_queue_time(stage, run_info):
+    if "queue_time" in run_info:
+        stage.set(queue_ms=round(run_info["queue_time"] * 1000, 3))
+
+def parse_response_json(response_text, debug_file=None):
+    """
+    Parses a reply as JSON, repairing fences, stray prose, bad commas or
+    quotes and truncation (see json_repair.parse_json_reply) and printing
+    what was repaired or dropped. The raw reply is written to `debug_file`
+    first, if given. Raises JSONRepairError if no JSON can be recovered.
+    """
+    return _parse_response(response_text, debug_file).value
+
+def _parse_response(response_text, debug_file):
+    """parse_response_json, returning the whole json_repair.ParseResult."""
+    if debug_file:
+        with open(debug_file, "w", encoding="utf-8") as f:
+            f.write(response_text)
+
+    result = parse_json_reply(response_text)
+    tracing.annotate(repairs=len(result.repairs), dropped=len(result.dropped))
+    if result.repairs:
+        print(f"Repaired reply: {', '.join(result.repairs)}.")
+    if result.dropped:
+        print(f"Warning: reply was truncated; dropped incomplete {', '.join(result.dropped)}.")
+    return result
+
+def parse_reply(generate_type, response_structure, response_text, debug_file=None):
+    """
+    Parses a reply with parse_response_json and validates it against the
+    structure's schema. A truncated reply first gets the required lists and
+    objects it never reached added empty (e.g. open_questions when the reply
+    was cut off inside multiple_choice), so its complete questions are kept.
+    Raises SchemaValidationError if the reply still doesn't match.
+    """
+    result = _parse_response(response_text, debug_file)
+    if TRUNCATION_REPAIR in result.repairs:
+        filled = fill_missing_containers(generate_type, response_structure, result.value)
+        if filled:
+            print(f"Warning: truncated reply never reached {', '.join(filled)}; left empty.")
+    return get_validator(generate_type, response_structure)(result.value)
+
+def default_response_file():
+    """The shared response path used when a run has no job id or output file."""
+    return os.path.join(script_dir, "output", "response.json")
+
+def job_output_dir(job_id):
+    """Directory holding one job's response and debug files."""
+    return os.path.join(script_dir, "output", "jobs", job_id)
+
+def job_id_type(value):
+    """argparse type for --job-id: a single, safe path component."""
+    if not JOB_ID_PATTERN.match(value):
+        raise argparse.ArgumentTypeError(
+            f"invalid job id {value!r}: use letters, digits, '.', '_' or '-' (max 128 chars)"
+        )
+    return value
+
+def resolve_job_outputs(job_id=None, output_file=None, json_stream=None):
+    """
+    Returns (response_target, debug_dir) for one run:
+    - json_stream: the response is written to this stream (e.g. stdout)
+    - output_file: the response is written to this path
+    - job_id: the response defaults to output/jobs/<job_id>/response.json and
+      debug files go in the same directory
+    - none of these: the shared output/response.json and debug files in apiGpt/
+    Debug files are skipped (debug_dir is None) when an output is given
+    without a job id, so concurrent runs never write the same file.
+    """
+    debug_dir = job_output_dir(job_id) if job_id else None
+    if json_stream is not None:
+        return json_stream, debug_dir
+    if output_file:
+        return output_file, debug_dir
+    if job_id:
+        return os.path.join(debug_dir, "response.json"), debug_dir
+    return default_response_file(), script_dir
+
+def save_response_json(parsed_json, output_file=None):
+    """
+    Writes the parsed reply and returns where it went.
+    output_file is a path (default: output/response.json) or an open text
+    stream such as stdout, which receives the JSON on a single line.
+    """
+    if output_file is None:
+        output_file = default_response_file()
+
+    if hasattr(output_file, "write"):
+        json.dump(parsed_json, output_file)
+        output_file.write("\n")
+        output_file.flush()
+        return output_file
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as json_file:
+        json.dump(parsed_json, json_file)
+
+    print(f"Response saved to {output_file}")
+    return output_file
+
+_openai_client = None
+
+def get_openai_client():
+    """
+    Returns a process-wide OpenAI client, created on first use. Reusing it
+    keeps the HTTP connection pool warm across jobs in a long-lived worker.
+    """
+    global _openai_client
+    if _openai_client is None:
+        import openai
+
+        # Initialize OpenAI Client
+        _openai_client = openai.OpenAI(api_key=read_api_key())
+    return _openai_client
+
+def get_assistant_id(openai_client, recreate=False):
+    """Returns the shared test/summary assistant's id, creating it on first use."""
+    with tracing.span("assistant", recreate=recreate):
+        registry = AssistantRegistry(ASSISTANT_REGISTRY_FILE)
+        return registry.get_or_create(
+            openai_client, ASSISTANT_MODEL, ASSISTANT_INSTRUCTIONS, ASSISTANT_NAME, recreate=recreate
+        )
+
+def run_registered_assistant(openai_client, content, response_format=None, thread_id=None):
+    """
+    Runs `content` on the registered assistant and returns the RunResult. If
+    the stored assistant was deleted on the OpenAI side, a new one is created
+    and only the run is retried, on the thread already holding the message.
+    """
+    assistant_id = get_assistant_id(openai_client)
+    thread_id = send_message(openai_client, content, thread_id)
+    try:
+        return run_assistant(openai_client, assistant_id, content, response_format=response_format,
+                             thread_id=thread_id, post_message=False)
+    except Exception as e:
+        if not is_not_found_error(e):
+            raise
+        print(f"Assistant {assistant_id} no longer exists; creating a new one.")
+        assistant_id = get_assistant_id(openai_client, recreate=True)
+        return run_assistant(openai_client, assistant_id, content, response_format=response_format,
+                             thread_id=thread_id, post_message=False)
+
+def get_generation_cache():
+    """Returns the shared on-disk cache of parsed model replies."""
+    return DiskCache(GENERATION_CACHE_DIR, GENERATION_CACHE_MAX_BYTES, GENERATION_CACHE_TTL_SECONDS)
+
+def generation_cache_key(*parts):
+    """
+    Builds a generation cache key from the source text hash, the model
+    settings and the caller's prompt parts (text_input must be the last part).
+    """
+    *prompt_parts, text_input = parts
+    source_hash = hashlib.sha256(text_input.encode("utf-8")).hexdigest()
+    instructions_hash = hashlib.sha256(ASSISTANT_INSTRUCTIONS.encode("utf-8")).hexdigest()
+    return make_key("generation", ASSISTANT_MODEL, instructions_hash, TEMPERATURE,
+                    MAX_COMPLETION_TOKENS, *prompt_parts, source_hash)
+
+def generate_content(
+    generate_type, initial_prompt, response_structure, text_input, cache=None,
+    output_file=None, debug_dir=None, source_thread=None
+) -> int:
+    # Step 0: Serve repeated requests from the generation cache
+    cache_key = None
+    if cache is not None:
+        cache_key = generation_cache_key(generate_type, initial_prompt, response_structure, text_input)
+        with tracing.span("generation_cache") as stage:
+            parsed_json = cache.get(cache_key)
+            stage.set(hit=parsed_json is not None)
+        if parsed_json is not None:
+            print("Generation cache hit.")
+            save_response_json(parsed_json, output_file)
+            return 0
+
+    parsed_json = request_generation(generate_type, initial_prompt, response_structure, text_input, debug_dir,
+                                     source_thread)
+    with tracing.span("save"):
+        save_response_json(parsed_json, output_file)
+    if cache is not None:
+        cache.set(cache_key, parsed_json)
+
+    return 0
+
+def request_generation(generate_type, initial_prompt, response_structure, text_input, debug_dir=None,
+                       source_thread=None):
+    """
+    Runs one model generation and returns the parsed, validated reply.
+    - source_thread: a shared_source_thread() getter; the request then runs
+      on that thread, which already holds the source, instead of resending it
+    """
+    # Step 1: Get the OpenAI client (API key read from file on first use)
+    openai_client = get_openai_client()
+
+    thread_id = None
+    if source_thread is not None:
+        thread_id = source_thread(openai_client)
+        content = build_message_content(initial_prompt, response_structure)
+    else:
+        content = build_message_content(initial_prompt, response_structure, text_input)
+    print(f"Prompt: {len(content)} characters.")
+
+    # Step 2: Reuse the registered Assistant (created on first use) and run it,
+    # constraining the reply to the structure's JSON Schema
+    response_format = response_format_for(generate_type, response_structure)
+    run_result = run_registered_assistant(openai_client, content, response_format, thread_id)
+    response_text = run_result.text
+    print(
+        f"Time to first token: {run_result.time_to_first_token:.2f}s | "
+        f"Total latency: {run_result.total_latency:.2f}s | Streamed: {run_result.streamed}"
+    )
 
     # Print the raw response for debugging
     print("Raw response:")
     print(response_text)
 
-    # Step 9: Parse the JSON response with enhanced error handling
-       # Step 9: Save Response to JSON File
-    cleaned_text = (
-        response_text.replace("```json\n", "").replace("\n```", "").replace("\n", "")
+    # Step 9: Parse and validate the JSON response and save it to a JSON file
+    debug_name = "debug_response.txt" if source_thread is None else f"debug_response_{generate_type}.txt"
+    debug_file = os.path.join(debug_dir, debug_name) if debug_dir else None
+    with tracing.span("parse", chars=len(response_text)):
+        return parse_reply(generate_type, response_structure, response_text, debug_file=debug_file)
+
+def shared_source_thread(text_input):
+    """
+    Returns a getter for a thread whose first message is the source
+    material. The thread is created on the first call (so fully cached runs
+    never create one); later calls return the same id, so several
+    generations send the source once.
+    """
+    thread = {}
+
+    def get_thread_id(openai_client):
+        if "id" not in thread:
+            created = openai_client.beta.threads.create()
+            openai_client.beta.threads.messages.create(
+                thread_id=created.id,
+                role="user",
+                content=SHARED_SOURCE_MESSAGE.format(text_input=text_input),
+            )
+            print(f"Shared source thread created: {created.id}")
+            thread["id"] = created.id
+        return thread["id"]
+    return get_thread_id
+
+def get_question_bank():
+    """Returns the shared on-disk question bank."""
+    return QuestionBank(QUESTION_BANK_DIR)
+
+def question_bank_key(text_input, additional_prompt):
+    """Bank key: the document text's hash plus the extra instructions (e.g. difficulty)."""
+    source_hash = hashlib.sha256(text_input.encode("utf-8")).hexdigest()
+    return make_key("question-bank", source_hash, additional_prompt.strip())
+
+def existing_questions_note(exam):
+    """Prompt addition listing the questions an exam already has, so they aren't repeated."""
+    questions = [question.get("question", "") for kind in QUESTION_KINDS for question in exam.get(kind, [])]
+    if not questions:
+        return ""
+    listed = "\n".join(f"- {question}" for question in questions)
+    return (
+        "\n\nThe exam already contains the following questions. Generate only new questions: "
+        f"do not repeat, rephrase or overlap with any of them.\n{listed}\n"
     )
-    
-    debug_file = os.path.join(script_dir, "debug_response.txt")
-    with open(debug_file, "w", encoding="utf-8") as f:
-        f.write(cleaned_text)
 
-    # Parse the cleaned text as a JSON string
-    parsed_json = json.loads(cleaned_text)
+def request_exam_questions(counts, additional_prompt, response_structure, text_input, existing=None,
+                           debug_dir=None, source_thread=None):
+    """
+    Asks the model for counts["multiple_choice"] and counts["open_questions"]
+    questions, telling it which questions `existing` already has. Returns the
+    generated exam ({"multiple_choice": [...], "open_questions": [...]}).
+    """
+    initial_prompt = get_prompt("test", {
+        "num_of_american": counts["multiple_choice"],
+        "num_of_open": counts["open_questions"],
+        "additional_prompt": additional_prompt,
+    })
+    if existing:
+        initial_prompt += existing_questions_note(existing)
+    return request_generation("test", initial_prompt, response_structure, text_input, debug_dir,
+                              source_thread)["exam"]
 
-    output_dir = os.path.join(script_dir, "output")
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir, recursive=True)
+def _kept_questions(existing, wanted):
+    """The questions of an existing exam to keep, trimmed to the wanted counts."""
+    existing = existing or {}
+    return {kind: list(existing.get(kind, []))[:wanted[kind]] for kind in QUESTION_KINDS}
 
-    output_file = os.path.join(output_dir, "response.json")
-    with open(output_file, "w", encoding="utf-8") as json_file:
-        json.dump(parsed_json, json_file)
+def generate_exam_from_bank(
+    num_american, num_open, additional_prompt, response_structure, text_input, bank,
+    output_file=None, debug_dir=None, existing=None, source_thread=None,
+    prefetch_exams=QUESTION_BANK_PREFETCH_EXAMS
+) -> int:
+    """
+    Builds an exam from the document's question bank. Unused questions are
+    served first; the model is called only for the shortfall, and its new
+    questions (minus near-duplicates of banked ones) are added to the bank.
+    The model call runs without holding the bank's lock; adding and drawing
+    happen under it, on the bank as it is by then.
+    - existing: an exam to top up ({"multiple_choice": [...], "open_questions": [...]});
+      its questions are kept (trimmed to the new counts) and only the
+      difference is drawn, never repeating one of them
+    - source_thread: run model calls on this shared source thread (see request_generation)
+    - prefetch_exams: when the bank falls short, also ask for this many more
+      exams' worth of questions for later requests
+    """
+    key = question_bank_key(text_input, additional_prompt)
+    wanted = {"multiple_choice": num_american, "open_questions": num_open}
+    kept = _kept_questions(existing, wanted)
+    needed = {kind: wanted[kind] - len(kept[kind]) for kind in QUESTION_KINDS}
 
-    print(f"Response saved to {output_file}")
+    with tracing.span("question_bank", **wanted) as stage:
+        questions = bank.load(key)
+        unused = bank.unused_counts(questions, exclude=kept)
+        shortfall = {kind: max(0, needed[kind] - unused[kind]) for kind in QUESTION_KINDS}
+        stage.set(kept=sum(len(kept[kind]) for kind in QUESTION_KINDS),
+                  unused=sum(unused.values()), shortfall=sum(shortfall.values()))
+    print(f"Question bank: {unused['multiple_choice']} multiple choice and {unused['open_questions']} "
+          f"open questions unused; {shortfall['multiple_choice']} and {shortfall['open_questions']} short.")
 
+    generated = None
+    if any(shortfall.values()):
+        request = {kind: shortfall[kind] + wanted[kind] * prefetch_exams for kind in QUESTION_KINDS}
+        generated = request_exam_questions(request, additional_prompt, response_structure, text_input,
+                                           existing=kept, debug_dir=debug_dir, source_thread=source_thread)
+
+    # Reloaded under the lock: other jobs may have drawn or added questions meanwhile
+    with bank.locked(key) as questions:
+        if generated is not None:
+            added = bank.add(questions, generated)
+            print(f"Added {added['multiple_choice']} multiple choice and {added['open_questions']} open "
+                  "questions to the bank.")
+        drawn = bank.draw(questions, needed, exclude=kept)
+    exam = {kind: kept[kind] + drawn[kind] for kind in QUESTION_KINDS}
+    for kind in QUESTION_KINDS:
+        if len(exam[kind]) < wanted[kind]:
+            print(f"Warning: only {len(exam[kind])} of {wanted[kind]} {kind} questions available.")
+
+    with tracing.span("save"):
+        save_response_json({"exam": exam}, output_file)
     return 0
 
-def parse_arguments():
+def top_up_exam(
+    existing, num_american, num_open, additional_prompt, response_structure, text_input,
+    output_file=None, debug_dir=None, source_thread=None
+) -> int:
+    """
+    Changes an existing exam's question counts without regenerating it: the
+    existing questions are kept (trimmed if a count went down) and the model
+    is asked only for the missing ones, with the existing questions in the
+    prompt so they aren't duplicated. New questions are merged into the same
+    exam.multiple_choice / exam.open_questions lists.
+    """
+    wanted = {"multiple_choice": num_american, "open_questions": num_open}
+    exam = _kept_questions(existing, wanted)
+    missing = {kind: wanted[kind] - len(exam[kind]) for kind in QUESTION_KINDS}
+    print(f"Top-up: keeping {len(exam['multiple_choice'])} multiple choice and "
+          f"{len(exam['open_questions'])} open questions; generating {missing['multiple_choice']} "
+          f"and {missing['open_questions']}.")
+
+    if any(missing.values()):
+        generated = request_exam_questions(missing, additional_prompt, response_structure, text_input,
+                                           existing=exam, debug_dir=debug_dir, source_thread=source_thread)
+        for kind in QUESTION_KINDS:
+            new_questions = drop_near_duplicates(generated.get(kind, []), exam[kind])
+            exam[kind].extend(new_questions[:missing[kind]])
+            if len(exam[kind]) < wanted[kind]:
+                print(f"Warning: only {len(exam[kind])} of {wanted[kind]} {kind} questions available.")
+
+    with tracing.span("save"):
+        save_response_json({"exam": exam}, output_file)
+    return 0
+
+def _merge_summary_section(existing, addition):
+    """Combines two contents that different chunks produced under one title."""
+    if isinstance(existing, str) and isinstance(addition, str):
+        return existing + "\n\n" + addition
+    if isinstance(existing, dict) and isinstance(addition, dict):
+        return merge_summaries([existing, addition])
+    existing = existing if isinstance(existing, list) else [existing]
+    addition = addition if isinstance(addition, list) else [addition]
+    return existing + addition
+
+def merge_summaries(partial_summaries):
+    """
+    Reduce step: merges per-chunk summaries into a single object with the
+    summary_json_structure.json shape (title -> content). Titles keep the
+    order they first appear in; a title produced by several chunks gets
+    their contents combined.
+    """
+    merged = {}
+    for summary in partial_summaries:
+        for title, value in summary.items():
+            if title in merged:
+                merged[title] = _merge_summary_section(merged[title], value)
+            else:
+                merged[title] = value
+    return merged
+
+def generate_summary_map_reduce(
+    initial_prompt, response_structure, text_input,
+    max_chunk_tokens=DEFAULT_CHUNK_TOKENS, concurrency=DEFAULT_CONCURRENCY, cache=None,
+    output_file=None
+) -> int:
+    """
+    Summarizes long material by splitting it into token-bounded chunks on
+    paragraph boundaries, summarizing up to `concurrency` chunks at a time on
+    the registered assistant, and merging the partial JSON summaries locally.
+    The merged summary is looked up in / stored to `cache` when one is given.
+    """
+    cache_key = None
+    if cache is not None:
+        cache_key = generation_cache_key("summary-map-reduce", max_chunk_tokens, initial_prompt,
+                                         response_structure, text_input)
+        merged_summary = cache.get(cache_key)
+        if merged_summary is not None:
+            print("Generation cache hit.")
+            save_response_json(merged_summary, output_file)
+            return 0
+
+    chunks = split_into_chunks(text_input, max_chunk_tokens)
+    print(f"Summarizing {len(chunks)} chunks, up to {concurrency} at a time.")
+    # Chunks run on pool threads, so their spans name this thread's span as parent
+    parent_span = tracing.current_span() if tracing.enabled() else None
+
+    openai_client = get_openai_client()
+    response_format = response_format_for("summary", response_structure)
+
+    def summarize_chunk(indexed_chunk):
+        index, chunk = indexed_chunk
+        with tracing.span("chunk", parent=parent_span, index=index, chars=len(chunk)):
+            return _summarize_chunk(index, chunk)
+
+    def _summarize_chunk(index, chunk):
+        chunk_prompt = (
+            f"{initial_prompt} The source material below is part {index + 1} of {len(chunks)} "
+            "of the full material; summarize only this part."
+        )
+        content = build_message_content(chunk_prompt, response_structure, chunk)
+        run_result = run_registered_assistant(openai_client, content, response_format)
+        print(
+            f"Chunk {index + 1}/{len(chunks)} summarized in {run_result.total_latency:.2f}s "
+            f"(first token after {run_result.time_to_first_token:.2f}s)."
+        )
+        with tracing.span("parse", chars=len(run_result.text)):
+            return parse_reply("summary", response_structure, run_result.text)
+
+    # Map: executor.map keeps the chunk order for the reduce step
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        partial_summaries = list(executor.map(summarize_chunk, enumerate(chunks)))
+
+    # Reduce
+    merged_summary = merge_summaries(partial_summaries)
+    save_response_json(merged_summary, output_file)
+    if cache is not None:
+        cache.set(cache_key, merged_summary)
+
+    return 0
+
+def parse_arguments(argv=None):
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(
         description="Generate test or summary from PDF or PPTX files."
     )
     parser.add_argument(
         "--generate-type", "-g",
-        choices=["test", "summary"],
+        choices=["test", "summary", "both"],
         required=True,
-        help="Specify whether to generate a 'test' or a 'summary'."
+        help="Specify whether to generate a 'test', a 'summary' or 'both' from one extraction."
     )
     parser.add_argument(
         "--file-type", "-f",
         choices=["pdf", "pptx"],
         required=True,
-        help="Specify the file type (pdf or pptx)."
+        help="Specify the file type (pdf or pptx). With several input files it only applies to names "
+             "without a .pdf or .pptx extension."
     )
     parser.add_argument(
         "--input-file", "-i",
+        nargs="+",
         required=True,
-        help="Path to the input PDF or PPTX file."
+        help="Path to the input PDF or PPTX file, or '-' to read the file from stdin. Several files are "
+             "generated from together, each labeled with its name and given a share of --max-chars."
     )
     # Add new arguments for question counts
     parser.add_argument(
@@ -377,51 +1565,309 @@ def parse_arguments():
         default="",
         help="Additional instructions to add to the prompt for the AI"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=1,
+        help=f"Processes used to extract PDF pages or PPTX slides; documents under {PARALLEL_MIN_PAGES} pages always use one (default: 1)"
+    )
+    parser.add_argument(
+        "--max-chars",
+        type=int,
+        default=MAX_INPUT_CHARS,
+        help=f"Characters of source text sent to the model (default: {MAX_INPUT_CHARS})"
+    )
+    parser.add_argument(
+        "--selection",
+        choices=SOURCE_SELECTIONS,
+        default="salience",
+        help="How longer documents are cut to --max-chars: keep the most central paragraphs of the whole "
+             "document ('salience') or the first pages only ('head') (default: salience)"
+    )
+    parser.add_argument(
+        "--budget-split",
+        choices=BUDGET_SPLITS,
+        default="length",
+        help="How --max-chars is split between several input files: in proportion to their extracted "
+             "length ('length') or to how central they are to the files together ('salience') (default: length)"
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Keep near-duplicate pages and paragraphs (e.g. slide build-up steps) in the source text"
+    )
+    parser.add_argument(
+        "--map-reduce",
+        action="store_true",
+        help="Summary only (not with 'both'): summarize the whole document in token-bounded chunks and merge the results"
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=DEFAULT_CHUNK_TOKENS,
+        help=f"Estimated source tokens per chunk in --map-reduce mode (default: {DEFAULT_CHUNK_TOKENS})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Chunks summarized at the same time in --map-reduce mode (default: {DEFAULT_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--job-id",
+        type=job_id_type,
+        help="Write this run's response and debug files under output/jobs/<job-id>/ so parallel runs don't collide"
+    )
+    parser.add_argument(
+        "--output-file", "-o",
+        help="Path to write the response JSON to (default: output/response.json, or the job directory with --job-id)"
+    )
+    parser.add_argument(
+        "--stdout-json",
+        action="store_true",
+        help="Print only the response JSON on stdout (progress messages go to stderr) instead of writing a file"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the extracted-text and generation caches for this run"
+    )
+    parser.add_argument(
+        "--top-up",
+        metavar="RESPONSE_JSON",
+        help="Tests only: keep the questions of this earlier response and generate only the ones missing for the new --num-american/--num-open"
+    )
+    parser.add_argument(
+        "--no-question-bank",
+        action="store_true",
+        help="Tests only: generate every question instead of reusing unused ones from the document's question bank. "
+             "Tests drawn from the bank bypass the generation cache, so each request gets questions not served "
+             "before; with this option a repeated request is served from the generation cache"
+    )
+    parser.add_argument(
+        "--prefetch-exams",
+        type=int,
+        default=QUESTION_BANK_PREFETCH_EXAMS,
+        help="Tests only: when the question bank falls short, also generate this many more exams' worth of "
+             f"questions for later requests (default: {QUESTION_BANK_PREFETCH_EXAMS})"
+    )
+    parser.add_argument(
+        "--render-html",
+        action="store_true",
+        help="Also render each response to HTML (exam.html / summary.html next to the JSON) in this process"
+    )
+    parser.add_argument(
+        "--trace-file",
+        help=f"Append per-stage timing spans as JSON lines to this file ('-' for stderr; default: ${tracing.TRACE_FILE_ENV}, unset = off)"
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Delete every entry in the extracted-text and generation caches before running"
+    )
+    return parser.parse_args(argv)
 
-if __name__ == "__main__":
-    args = parse_arguments()
-    generate_type = args.generate_type
-    file_type = args.file_type
-    input_file = args.input_file
+def main(argv=None):
+    """Runs one generation from command-line arguments; argv defaults to sys.argv[1:]."""
+    args = parse_arguments(argv)
+    if args.stdout_json:
+        # Keep stdout for the JSON alone; progress messages go to stderr
+        json_stream = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            return run_generation(args, json_stream)
+    return run_generation(args)
 
-    print(f"Generate type: {generate_type} | File type: {file_type} | Input file: {input_file}")
+def run_generation(args, json_stream=None):
+    """Runs one generation for parsed arguments; see parse_arguments."""
+    tracing.configure(args.trace_file, trace_id=args.job_id)
+    with tracing.span("generate_json", generate_type=args.generate_type, file_type=args.file_type,
+                      job_id=args.job_id):
+        return _run_generation(args, json_stream)
 
-    # Load the appropriate response structure JSON
+def load_response_structure(generate_type):
+    """Loads the JSON structure file for 'test' or 'summary'."""
     response_structure_file = "test_json_structure.json" if generate_type == "test" else "summary_json_structure.json"
     response_structure_file = get_file_path(response_structure_file)
     with open(response_structure_file, "r", encoding="utf-8") as json_file:
-        response_structure = json.load(json_file)
+        return json.load(json_file)
 
+def build_initial_prompt(generate_type, args):
+    """The prompt for 'test' or 'summary' from the command-line options."""
     # Define the initial prompt parameters
-        params = {
+    params = {
         "num_of_american": args.num_american,
         "num_of_open": args.num_open,
         "additional_prompt": args.additional_prompt
     } if generate_type == "test" else {
         "additional_prompt": args.additional_prompt
     }
-    initial_prompt = get_prompt(prompt_type=generate_type, params=params)
+    return get_prompt(prompt_type=generate_type, params=params)
+
+def typed_output_file(output_file, generate_type):
+    """
+    Where one document of a 'both' run goes: response.json becomes
+    response.test.json / response.summary.json; a stream receives both.
+    """
+    if hasattr(output_file, "write"):
+        return output_file
+    root, extension = os.path.splitext(output_file)
+    return f"{root}.{generate_type}{extension or '.json'}"
+
+def render_html(generate_type, json_file):
+    """
+    Renders a saved response with the matching HTML generator, in this
+    process, to exam.html or summary.html next to it. Returns the HTML path.
+    """
+    renderer = generate_test_html_from_json if generate_type == "test" else generate_summary_html_from_json
+    html_file = os.path.join(os.path.dirname(os.path.abspath(json_file)),
+                             "exam.html" if generate_type == "test" else "summary.html")
+    render_args = renderer.parse_arguments(["--input-file", json_file, "--output-file", html_file])
+    with tracing.span("render", kind="exam" if generate_type == "test" else "summary") as stage:
+        renderer.render(render_args, stage)
+    return html_file
 
-    # Extract text from the input file
-    if file_type == "pdf":
-        total_input = compress_pdf_to_text(input_file)[:25000]
-  #  elif file_type == "pptx":
-  #      total_input = extract_text_from_pptx(input_file)
+def _run_generation(args, json_stream):
+    generate_type = args.generate_type
+    file_type = args.file_type
+    input_files = args.input_file
+
+    print(f"Generate type: {generate_type} | File type: {file_type} | Input file: {', '.join(input_files)}")
+
+    # 'both' makes a test and a summary from one extraction; the test goes
+    # first so the summary run carries the smaller reply in its context
+    generate_types = ["test", "summary"] if generate_type == "both" else [generate_type]
+    if generate_type == "both" and args.map_reduce:
+        print("Error: --map-reduce can't be combined with --generate-type both.")
+        sys.exit(2)
+    if len(input_files) > 1 and "-" in input_files:
+        print("Error: '-' (stdin) can't be combined with other input files.")
+        sys.exit(2)
+    if args.render_html and json_stream is not None:
+        print("Error: --render-html needs a response file, not --stdout-json.")
+        sys.exit(2)
+
+    # Load the appropriate response structure JSON and build the prompts
+    response_structures = {t: load_response_structure(t) for t in generate_types}
+    initial_prompts = {t: build_initial_prompt(t, args) for t in generate_types}
+
+    # An earlier exam to top up instead of generating from scratch
+    existing_exam = None
+    if args.top_up:
+        if "test" not in generate_types:
+            print("Error: --top-up only applies to --generate-type test or both.")
+            sys.exit(2)
+        with open(args.top_up, "r", encoding="utf-8") as json_file:
+            existing_exam = json.load(json_file).get("exam", {})
+
+    if args.clear_cache:
+        get_extraction_cache().clear()
+        get_generation_cache().clear()
+        print("Extraction and generation caches cleared.")
+    extraction_cache = None if args.no_cache else get_extraction_cache()
+    generation_cache = None if args.no_cache else get_generation_cache()
+
+    # Map-reduce summaries cover the whole document instead of a head cut
+    map_reduce = generate_type == "summary" and args.map_reduce
+    max_chars = None if map_reduce else args.max_chars
+
+    # Extract text from the input files ('-' reads the file's bytes from stdin)
+    if len(input_files) > 1:
+        total_input = extract_sources_text(
+            input_files, extraction_cache, max_chars=max_chars, selection=args.selection, dedup=not args.no_dedup,
+            budget_split=args.budget_split, default_file_type=file_type,
+        )
+    elif file_type in PAGE_READERS:
+        source = sys.stdin.buffer.read() if input_files[0] == "-" else input_files[0]
+        total_input = extract_source_text(
+            source, extraction_cache, workers=args.workers, max_chars=max_chars, selection=args.selection,
+            dedup=not args.no_dedup, file_type=file_type,
+        )
     else:
         print("Error: Unsupported file type.")
         sys.exit(1)
 
-    input_debug_file = os.path.join(script_dir, "input_debug.txt")
-    with open(input_debug_file, "w", encoding="utf-8") as f:
-        f.write(total_input)
-    
-    # Generate content
-    result = generate_content(
+    # Where this run's response and debug files go
+    output_file, debug_dir = resolve_job_outputs(args.job_id, args.output_file, json_stream)
+    if debug_dir:
+        os.makedirs(debug_dir, exist_ok=True)
+        input_debug_file = os.path.join(debug_dir, "input_debug.txt")
+        with open(input_debug_file, "w", encoding="utf-8") as f:
+            f.write(total_input)
+
+    # Several generations share one thread holding the source, sent once
+    source_thread = shared_source_thread(total_input) if len(generate_types) > 1 else None
+
+    result = 0
+    output_files = {}
+    for current_type in generate_types:
+        output_files[current_type] = (
+            output_file if len(generate_types) == 1 else typed_output_file(output_file, current_type)
+        )
+        with tracing.span("generate", generate_type=current_type):
+            result = max(result, _generate(
+                current_type, args, initial_prompts[current_type], response_structures[current_type],
+                total_input, existing_exam, generation_cache, output_files[current_type], debug_dir,
+                source_thread, map_reduce,
+            ))
+
+    if args.render_html:
+        for current_type in generate_types:
+            print(f"HTML saved to {render_html(current_type, output_files[current_type])}")
+
+    print("Exit code:", result)
+    return result
+
+def _generate(generate_type, args, initial_prompt, response_structure, total_input, existing_exam,
+              generation_cache, output_file, debug_dir, source_thread, map_reduce):
+    """Generates one 'test' or 'summary' document the way the options ask for."""
+    if map_reduce:
+        return generate_summary_map_reduce(
+            initial_prompt=initial_prompt,
+            response_structure=response_structure,
+            text_input=total_input,
+            max_chunk_tokens=args.chunk_tokens,
+            concurrency=args.concurrency,
+            cache=generation_cache,
+            output_file=output_file,
+        )
+    elif generate_type == "test" and not args.no_question_bank:
+        # No generation cache: a repeated request should draw unused questions, not replay the last exam
+        return generate_exam_from_bank(
+            existing=existing_exam,
+            num_american=args.num_american,
+            num_open=args.num_open,
+            additional_prompt=args.additional_prompt,
+            response_structure=response_structure,
+            text_input=total_input,
+            bank=get_question_bank(),
+            output_file=output_file,
+            debug_dir=debug_dir,
+            source_thread=source_thread,
+            prefetch_exams=args.prefetch_exams,
+        )
+    elif generate_type == "test" and existing_exam is not None:
+        return top_up_exam(
+            existing=existing_exam,
+            num_american=args.num_american,
+            num_open=args.num_open,
+            additional_prompt=args.additional_prompt,
+            response_structure=response_structure,
+            text_input=total_input,
+            output_file=output_file,
+            debug_dir=debug_dir,
+            source_thread=source_thread,
+        )
+    return generate_content(
         generate_type=generate_type,
         initial_prompt=initial_prompt,
         response_structure=response_structure,
         text_input=total_input,
+        cache=generation_cache,
+        output_file=output_file,
+        debug_dir=debug_dir,
+        source_thread=source_thread,
     )
 
-    print("Exit code:", result)
\ No newline at end of file
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -5,6 +5,8 @@ import re
 import os
 import sys
 
+import tracing
+
 def detect_direction(text):
     return "rtl" if re.search(r'[\u0590-\u05FF]', text) else "ltr"
 
@@ -198,18 +200,27 @@ def json_to_html(json_data, output_file="output/summary.html"):
 
     print(f"HTML file '{output_file}' generated successfully.")
 
-def parse_arguments():
+def parse_arguments(argv=None):
     parser = argparse.ArgumentParser(description="Convert JSON to styled HTML.")
     parser.add_argument("--input-file", "-i", required=True, help="Input JSON file path")
     parser.add_argument("--output-file", "-o", default="output/summary.html", help="Output HTML file path")
-    return parser.parse_args()
+    parser.add_argument("--trace-file", help="Append timing spans as JSON lines to this file ('-' for stderr; default: $TRACE_FILE)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    tracing.configure(args.trace_file)
+    with tracing.span("render", kind="summary") as stage:
+        render(args, stage)
 
-def main():
-    args = parse_arguments()
+def render(args, stage):
+    """Renders the summary HTML for parsed arguments, recording counts on `stage`."""
     try:
         with open(args.input_file, "r", encoding="utf-8") as json_file:
             data = json.load(json_file)
         json_to_html(data, output_file=args.output_file)
+        if stage.recording:
+            stage.set(sections=len(data), html_bytes=os.path.getsize(args.output_file))
     except FileNotFoundError:
         print(f"שגיאה: הקובץ '{args.input_file}' לא נמצא.")
         sys.exit(1)
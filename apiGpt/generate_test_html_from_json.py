@@ -4,6 +4,8 @@ import random
 import os
 import sys
 
+import tracing
+
 # Function to generate HTML
 def generate_html(data):
     # Add more detailed logging to debug the data structure
@@ -249,7 +251,7 @@ def generate_html(data):
     return html_content
 
 
-def parse_arguments():
+def parse_arguments(argv=None):
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(description="Generate HTML for an exam from a JSON file.")
     
@@ -265,7 +267,12 @@ def parse_arguments():
         help="Path to the output HTML file (default: 'output/exam.html')."
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--trace-file",
+        help="Append timing spans as JSON lines to this file ('-' for stderr; default: $TRACE_FILE, unset = off)"
+    )
+
+    return parser.parse_args(argv)
 
 
 def validate_and_repair_json(data):
@@ -347,10 +354,16 @@ def validate_and_repair_json(data):
     
     return data
 
-def main():
+def main(argv=None):
     # Parse command-line arguments
-    args = parse_arguments()
+    args = parse_arguments(argv)
+
+    tracing.configure(args.trace_file)
+    with tracing.span("render", kind="exam") as stage:
+        return render(args, stage)
 
+def render(args, stage):
+    """Renders the exam HTML for parsed arguments, recording counts on `stage`."""
     # Read the input JSON file
     try:
         with open(args.input_file, "r", encoding="utf-8") as json_file:
@@ -384,11 +397,18 @@ def main():
 
     # Validate and repair the data
     data = validate_and_repair_json(data)
+    if stage.recording:
+        exam = data.get("exam", data)
+        stage.set(
+            multiple_choice=len(exam.get("multiple_choice", [])),
+            open_questions=len(exam.get("open_questions", [])),
+        )
 
     # Generate the HTML
     try:
         html_output = generate_html(data)
         print(f"HTML generation completed, content length: {len(html_output)} characters")
+        stage.set(html_chars=len(html_output))
     except Exception as e:
         print(f"Error generating HTML: {str(e)}")
         import traceback
@@ -3,27 +3,59 @@ import { runPythonScript } from './pythonExecutor.js';
 import * as fs from 'fs';
 import { promises as fsPromises } from 'fs';
 import path from 'path';
+import { randomUUID } from 'crypto';
 import { fileURLToPath } from 'url';
 
 const __dirname = path.dirname(fileURLToPath(import.meta.url));
 
+// Each generation job gets its own directory, so concurrent uploads never share files
+const JOBS_DIR = path.join(__dirname, 'output', 'jobs');
+
+/**
+ * Returns the directory generate_json.py uses for a job id
+ * @param {string} jobId - The job id
+ * @returns {string} - Absolute path of the job directory
+ */
+function jobDir(jobId) {
+  return path.join(JOBS_DIR, jobId);
+}
+
+/**
+ * Deletes the job directory holding a generated file, once its content has been read
+ * or the request has failed
+ * @param {string} outputPath - Path of a file inside output/jobs/<jobId>/
+ */
+export async function cleanupJobOutput(outputPath) {
+  const dir = path.dirname(path.resolve(outputPath));
+  if (path.dirname(dir) !== JOBS_DIR) {
+    return;
+  }
+  await fsPromises.rm(dir, { recursive: true, force: true });
+}
+
 /**
  * Processes a file (PDF or PPTX) using generate_json.py script
- * @param {string} filePath - Path to the file
+ * @param {string|Buffer} filePath - Path to the file, or the PDF or PPTX contents (piped to the script's stdin)
  * @param {string} fileType - Type of file ('pdf' or 'pptx')
  * @param {string} generateType - Type of generation ('test' or 'summary')
+ * @param {string|null} jobId - When set, the result is written to output/jobs/<jobId>/response.json;
+ *   otherwise the script prints it on stdout and nothing is written to disk
  * @returns {Promise<Object>} - The processed result as a JSON object
  */
-export async function generateJsonFromFile(filePath, fileType = 'pdf', generateType = 'summary', numAmerican = 8, numOpen = 3, additionalPrompt = '') {
+export async function generateJsonFromFile(filePath, fileType = 'pdf', generateType = 'summary', numAmerican = 8, numOpen = 3, additionalPrompt = '', jobId = null) {
   try {
-    console.log(`Processing file: ${filePath}`);
+    const fromBuffer = Buffer.isBuffer(filePath);
+    console.log(fromBuffer ? `Processing in-memory file (${filePath.length} bytes)` : `Processing file: ${filePath}`);
     
-    const absoluteFilePath = path.isAbsolute(filePath) ? filePath : path.resolve(__dirname, filePath);
+    let inputFile = '-';
+    if (!fromBuffer) {
+      inputFile = path.isAbsolute(filePath) ? filePath : path.resolve(__dirname, filePath);
+    }
     
     const args = [
       '--generate-type', generateType,
       '--file-type', fileType,
-      '--input-file', absoluteFilePath
+      '--input-file', inputFile
     ];
     
     // Add optional parameters if provided
@@ -33,12 +65,22 @@ export async function generateJsonFromFile(filePath, fileType = 'pdf', generateT
     }
     
     if (additionalPrompt) {
-      args.push('--additional-prompt', JSON.stringify(additionalPrompt));
+      args.push('--additional-prompt', additionalPrompt);
     }
     
-    await runPythonScript('generate_json.py', args);
+    if (jobId) {
+      args.push('--job-id', jobId);
+    } else {
+      args.push('--stdout-json');
+    }
     
-    const resultPath = path.join(__dirname, 'output', 'response.json');
+    const stdout = await runPythonScript('generate_json.py', args, fromBuffer ? filePath : null);
+    
+    if (!jobId) {
+      return JSON.parse(stdout);
+    }
+    
+    const resultPath = path.join(jobDir(jobId), 'response.json');
     const resultData = await fsPromises.readFile(resultPath, 'utf8');
     
     return JSON.parse(resultData);
@@ -50,15 +92,15 @@ export async function generateJsonFromFile(filePath, fileType = 'pdf', generateT
 
 /**
  * Generates an HTML exam from the processed JSON
- * @param {string} inputJsonFile - Path to the input JSON file
- * @param {string} outputHtmlFile - Path to the output HTML file
+ * @param {string} inputJsonFile - Path to the input JSON file, absolute or relative to apiGpt/
+ * @param {string} outputHtmlFile - Path to the output HTML file, absolute or relative to apiGpt/
  * @returns {Promise<string>} - Path to the generated HTML file
  */
 export async function generateHtmlExam(inputJsonFile = 'output/response.json', outputHtmlFile = 'output/exam.html') {
   try {
-    // Build the full paths
-    const inputPath = path.join(__dirname, inputJsonFile);
-    const outputPath = path.join(__dirname, outputHtmlFile);
+    // Build the full paths; absolute paths (e.g. a job directory) are kept as they are
+    const inputPath = path.resolve(__dirname, inputJsonFile);
+    const outputPath = path.resolve(__dirname, outputHtmlFile);
     
     // Run the Python script to generate HTML from JSON with the required arguments
     await runPythonScript('generate_test_html_from_json.py', [
@@ -76,15 +118,15 @@ export async function generateHtmlExam(inputJsonFile = 'output/response.json', o
 
 /**
  * Generates an HTML summary from the processed JSON
- * @param {string} inputJsonFile - Path to the input JSON file
- * @param {string} outputHtmlFile - Path to the output HTML file
+ * @param {string} inputJsonFile - Path to the input JSON file, absolute or relative to apiGpt/
+ * @param {string} outputHtmlFile - Path to the output HTML file, absolute or relative to apiGpt/
  * @returns {Promise<string>} - Path to the generated HTML file
  */
 export async function generateHtmlSummary(inputJsonFile = 'output/response.json', outputHtmlFile = 'output/summary.html') {
   try {
-    // Build the full paths
-    const inputPath = path.join(__dirname, inputJsonFile);
-    const outputPath = path.join(__dirname, outputHtmlFile);
+    // Build the full paths; absolute paths (e.g. a job directory) are kept as they are
+    const inputPath = path.resolve(__dirname, inputJsonFile);
+    const outputPath = path.resolve(__dirname, outputHtmlFile);
     
     // Run the Python script to generate HTML from JSON with the required arguments
     await runPythonScript('generate_summary_html_from_json.py', [
@@ -102,25 +144,35 @@ export async function generateHtmlSummary(inputJsonFile = 'output/response.json'
 
 /**
  * Processes a file and generates an HTML exam
- * @param {string} filePath - Path to the file
+ * @param {string|Buffer} filePath - Path to the file, or its contents
  * @param {string} fileType - Type of file ('pdf' or 'pptx')
  * @returns {Promise<string>} - Path to the generated HTML file
  */
 export async function processPdfAndGenerateHtmlExam(filePath = 'input.pdf', fileType = 'pdf', numAmerican = 8, numOpen = 3, additionalPrompt = '') {
   try {
-    console.log(`Processing PDF file for exam: ${filePath}`);
+    console.log(Buffer.isBuffer(filePath) ? 'Processing uploaded file for exam' : `Processing PDF file for exam: ${filePath}`);
     
-    if (!fs.existsSync(filePath)) {
+    if (!Buffer.isBuffer(filePath) && !fs.existsSync(filePath)) {
       console.error(`File not found: ${filePath}`);
       throw new Error(`File not found: ${filePath}`);
     }
     
     // Pass the parameters to generateJsonFromFile
-    await generateJsonFromFile(filePath, fileType, 'test', numAmerican, numOpen, additionalPrompt);
-    
-    const htmlPath = await generateHtmlExam();
-    
-    return htmlPath;
+    const jobId = randomUUID();
+    try {
+      await generateJsonFromFile(filePath, fileType, 'test', numAmerican, numOpen, additionalPrompt, jobId);
+      
+      const htmlPath = await generateHtmlExam(
+        path.join(jobDir(jobId), 'response.json'),
+        path.join(jobDir(jobId), 'exam.html')
+      );
+      
+      return htmlPath;
+    } catch (error) {
+      // Nothing will read the job's files now
+      await cleanupJobOutput(path.join(jobDir(jobId), 'response.json'));
+      throw error;
+    }
   } catch (error) {
     console.error('Error in processPdfAndGenerateHtmlExam:', error);
     throw error;
@@ -129,25 +181,35 @@ export async function processPdfAndGenerateHtmlExam(filePath = 'input.pdf', file
 
 /**
  * Processes a file and generates an HTML summary
- * @param {string} filePath - Path to the file
+ * @param {string|Buffer} filePath - Path to the file, or its contents
  * @param {string} fileType - Type of file ('pdf' or 'pptx')
  * @returns {Promise<string>} - Path to the generated HTML file
  */
 export async function processPdfAndGenerateHtmlSummary(filePath = 'input.pdf', fileType = 'pdf', additionalPrompt = '') {
   try {
-    console.log(`Processing PDF file: ${filePath}`);
+    console.log(Buffer.isBuffer(filePath) ? 'Processing uploaded file for summary' : `Processing PDF file: ${filePath}`);
     
-    if (!fs.existsSync(filePath)) {
+    if (!Buffer.isBuffer(filePath) && !fs.existsSync(filePath)) {
       console.error(`File not found: ${filePath}`);
       throw new Error(`File not found: ${filePath}`);
     }
     
     // Pass the additional prompt parameter
-    await generateJsonFromFile(filePath, fileType, 'summary', null, null, additionalPrompt);
-    
-    const htmlPath = await generateHtmlSummary();
-    
-    return htmlPath;
+    const jobId = randomUUID();
+    try {
+      await generateJsonFromFile(filePath, fileType, 'summary', null, null, additionalPrompt, jobId);
+      
+      const htmlPath = await generateHtmlSummary(
+        path.join(jobDir(jobId), 'response.json'),
+        path.join(jobDir(jobId), 'summary.html')
+      );
+      
+      return htmlPath;
+    } catch (error) {
+      // Nothing will read the job's files now
+      await cleanupJobOutput(path.join(jobDir(jobId), 'response.json'));
+      throw error;
+    }
   } catch (error) {
     console.error('Error in processPdfAndGenerateHtmlSummary:', error);
     throw error;
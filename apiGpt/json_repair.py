@@ -0,0 +1,304 @@
+import json
+import re
+from collections import namedtuple
+
+# Outcome of parsing a model reply. `repairs` describes each fix applied to
+# the text; `dropped` lists the paths of items cut off by truncation (e.g.
+# "$.exam.multiple_choice[7]") that were left out of `value`.
+ParseResult = namedtuple("ParseResult", ["value", "repairs", "dropped"])
+# The repair noted when a reply was cut off and its open containers closed
+TRUNCATION_REPAIR = "closed containers left open by truncation"
+
+_WHITESPACE = re.compile(r"(?:\s+|//[^\n]*|/\*.*?\*/)*", re.DOTALL)
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_BAREWORD = re.compile(r"[A-Za-z_$][\w$]*")
+_STRING_CHUNK = {'"': re.compile(r'[^"\\]*'), "'": re.compile(r"[^'\\]*")}
+_ESCAPES = {'"': '"', "'": "'", "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+# A double quote only closes a string when one of these follows it, or when
+# whitespace and another string follow (a missing comma); any other quote is
+# kept as text (Hebrew abbreviations such as צה"ל use it unescaped).
+_STRING_END_FOLLOWERS = ",:}]"
+
+# Prose around the JSON may contain brackets of its own; only the first few
+# brackets are tried as the start of the JSON.
+MAX_ROOT_CANDIDATES = 5
+
+
+class JSONRepairError(ValueError):
+    """The reply holds no JSON value that could be recovered."""
+
+
+class _Truncated(Exception):
+    """
+    The text ended inside a value. Truncation is handled by the outermost
+    array around it (which drops the unfinished item, e.g. a whole question)
+    or, outside arrays, by the innermost object (which drops the unfinished
+    key, e.g. a summary section). Once handled, `value` is the partial
+    container and the ancestors keep it as it is.
+    """
+
+    def __init__(self, value=None, handled=False):
+        super().__init__()
+        self.value = value
+        self.handled = handled
+
+
+class _Parser:
+    def __init__(self, text, start):
+        self.text = text
+        self.pos = start
+        self.repairs = []
+        self.dropped = []
+
+    @staticmethod
+    def truncated(partial, in_array):
+        """The exception for running out of text inside a container."""
+        return _Truncated() if in_array else _Truncated(partial, handled=True)
+
+    def note(self, repair):
+        if repair not in self.repairs:
+            self.repairs.append(repair)
+
+    def skip_whitespace(self):
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()
+        if self.text.startswith("/*", self.pos):
+            # An unterminated block comment runs to the end of the reply
+            self.pos = len(self.text)
+
+    def at_end(self):
+        return self.pos >= len(self.text)
+
+    def parse_value(self, path, in_array):
+        self.skip_whitespace()
+        if self.at_end():
+            raise _Truncated()
+        char = self.text[self.pos]
+        if char == "{":
+            return self.parse_object(path, in_array)
+        if char == "[":
+            return self.parse_array(path, in_array)
+        if char in "\"'":
+            return self.parse_string()
+        number = _NUMBER.match(self.text, self.pos)
+        if number:
+            self.pos = number.end()
+            if self.at_end():
+                raise _Truncated()
+            text = number.group()
+            return float(text) if any(c in text for c in ".eE") else int(text)
+        word = _BAREWORD.match(self.text, self.pos)
+        if word and word.group() in _LITERALS:
+            if word.group() not in ("true", "false", "null"):
+                self.note("converted Python literals")
+            self.pos = word.end()
+            return _LITERALS[word.group()]
+        if word and word.end() == len(self.text) and any(
+            literal.startswith(word.group()) for literal in ("true", "false", "null")
+        ):
+            raise _Truncated()
+        raise JSONRepairError(f"Unexpected {char!r} at position {self.pos}")
+
+    def parse_string(self):
+        quote = self.text[self.pos]
+        if quote == "'":
+            self.note("replaced single quotes")
+        self.pos += 1
+        chunk = _STRING_CHUNK[quote]
+        parts = []
+        while True:
+            match = chunk.match(self.text, self.pos)
+            parts.append(match.group())
+            self.pos = match.end()
+            if self.at_end():
+                raise _Truncated()
+            char = self.text[self.pos]
+            if char == "\\":
+                self.parse_escape(parts)
+                continue
+            # Closing quote, unless it's an unescaped quote inside the text
+            self.pos += 1
+            if quote == '"':
+                following = _WHITESPACE.match(self.text, self.pos).end()
+                if (following < len(self.text)
+                        and self.text[following] not in _STRING_END_FOLLOWERS
+                        and not (self.text[following] == '"' and following > self.pos)):
+                    self.note("escaped quotes inside strings")
+                    parts.append(quote)
+                    continue
+            value = "".join(parts)
+            if "\n" in value or "\r" in value or "\t" in value:
+                self.note("kept raw control characters inside strings")
+            return value
+
+    def parse_escape(self, parts):
+        if self.pos + 1 >= len(self.text):
+            raise _Truncated()
+        code = self.text[self.pos + 1]
+        if code == "u":
+            digits = self.text[self.pos + 2:self.pos + 6]
+            if len(digits) < 4 and self.pos + 6 > len(self.text):
+                raise _Truncated()
+            try:
+                parts.append(chr(int(digits, 16)))
+                self.pos += 6
+                return
+            except ValueError:
+                pass
+        parts.append(_ESCAPES.get(code, code))
+        self.pos += 2
+
+    def parse_key(self):
+        self.skip_whitespace()
+        if self.at_end():
+            raise _Truncated()
+        if self.text[self.pos] in "\"'":
+            return self.parse_string()
+        word = _BAREWORD.match(self.text, self.pos)
+        if not word:
+            raise JSONRepairError(f"Expected a key at position {self.pos}")
+        self.note("quoted bare keys")
+        self.pos = word.end()
+        return word.group()
+
+    def parse_object(self, path, in_array):
+        self.pos += 1
+        result = {}
+        while True:
+            self.skip_whitespace()
+            if self.at_end():
+                raise self.truncated(result, in_array)
+            if self.text[self.pos] == "}":
+                self.pos += 1
+                return result
+            if result:
+                if self.text[self.pos] == ",":
+                    self.pos += 1
+                    self.skip_whitespace()
+                    if self.at_end():
+                        raise self.truncated(result, in_array)
+                    if self.text[self.pos] == "}":
+                        self.note("removed trailing commas")
+                        self.pos += 1
+                        return result
+                else:
+                    self.note("inserted missing commas")
+
+            key = None
+            try:
+                key = self.parse_key()
+                self.skip_whitespace()
+                if self.at_end():
+                    raise _Truncated()
+                if self.text[self.pos] != ":":
+                    raise JSONRepairError(f"Expected ':' at position {self.pos}")
+                self.pos += 1
+                value = self.parse_value(f"{path}.{key}", in_array=in_array)
+            except _Truncated as truncated:
+                if truncated.handled:
+                    result[key] = truncated.value
+                    raise _Truncated(result, handled=True)
+                if in_array:
+                    # The enclosing array drops this whole item
+                    raise
+                if key is not None:
+                    self.dropped.append(f"{path}.{key}")
+                raise _Truncated(result, handled=True)
+            result[key] = value
+
+    def parse_array(self, path, in_array):
+        self.pos += 1
+        result = []
+        while True:
+            self.skip_whitespace()
+            if self.at_end():
+                raise self.truncated(result, in_array)
+            if self.text[self.pos] == "]":
+                self.pos += 1
+                return result
+            if result:
+                if self.text[self.pos] == ",":
+                    self.pos += 1
+                    self.skip_whitespace()
+                    if self.at_end():
+                        raise self.truncated(result, in_array)
+                    if self.text[self.pos] == "]":
+                        self.note("removed trailing commas")
+                        self.pos += 1
+                        return result
+                else:
+                    self.note("inserted missing commas")
+
+            item_path = f"{path}[{len(result)}]"
+            try:
+                value = self.parse_value(item_path, in_array=True)
+            except _Truncated:
+                if in_array:
+                    raise
+                self.dropped.append(item_path)
+                raise _Truncated(result, handled=True)
+            result.append(value)
+
+
+def _strip_fences(text):
+    return re.sub(r"```[a-zA-Z]*", "", text)
+
+
+def _root_candidates(text):
+    starts = [m.start() for m in re.finditer(r"[{\[]", text)]
+    return starts[:MAX_ROOT_CANDIDATES]
+
+
+def parse_json_reply(text):
+    """
+    Parses a model reply as JSON, repairing what models commonly get wrong:
+    Markdown fences and prose around the JSON, trailing or missing commas,
+    single quotes, bare keys, Python literals, comments, raw newlines and
+    unescaped quotes inside strings. A reply cut off mid-way (e.g. at
+    max_completion_tokens) keeps every complete item: the unfinished array
+    item (a question) or, outside arrays, the unfinished key (a summary
+    section) is dropped and reported, and the open containers are closed.
+    Well-formed replies take the json.loads fast path.
+    Returns a ParseResult; raises JSONRepairError if nothing can be recovered.
+    """
+    try:
+        return ParseResult(json.loads(text), [], [])
+    except json.JSONDecodeError:
+        pass
+
+    cleaned = _strip_fences(text)
+    if cleaned != text:
+        text = cleaned
+        try:
+            return ParseResult(json.loads(text), ["removed Markdown fences"], [])
+        except json.JSONDecodeError:
+            pass
+        fences = ["removed Markdown fences"]
+    else:
+        fences = []
+
+    last_error = None
+    for start in _root_candidates(text):
+        parser = _Parser(text, start)
+        parser.repairs.extend(fences)
+        if text[:start].strip():
+            parser.note("ignored text before the JSON")
+        try:
+            value = parser.parse_value("$", in_array=False)
+        except _Truncated as truncated:
+            if not truncated.handled:
+                last_error = JSONRepairError("Reply ended before any complete value")
+                continue
+            value = truncated.value
+            if not value:
+                last_error = JSONRepairError("Reply ended before any complete item")
+                continue
+            parser.note(TRUNCATION_REPAIR)
+        except JSONRepairError as e:
+            last_error = e
+            continue
+        if text[parser.pos:].strip():
+            parser.note("ignored text after the JSON")
+        return ParseResult(value, parser.repairs, parser.dropped)
+
+    raise last_error or JSONRepairError("Reply contains no JSON object or array")
@@ -1,29 +1,37 @@
 // pythonExecutor.js
-import { exec } from 'child_process';
+import { execFile } from 'child_process';
 import path from 'path';
 import { fileURLToPath } from 'url';
+import { getPythonWorkerPool } from './pythonWorkerPool.js';
 
 // Get the directory name in ESM
 const __dirname = path.dirname(fileURLToPath(import.meta.url));
 
 /**
- * Executes a Python script with the given arguments
+ * Executes a Python script with the given arguments.
+ * When PYTHON_WORKERS is set, the job runs in a long-lived worker from the
+ * shared pool instead of a new python process.
  * @param {string} scriptName - Name of the script (without path)
  * @param {Array} args - Array of arguments to pass to the script
+ * @param {Buffer|string|null} input - Optional data written to the script's stdin
  * @returns {Promise<string>} - The script's output
  */
-export function runPythonScript(scriptName, args = []) {
+export function runPythonScript(scriptName, args = [], input = null) {
   return new Promise((resolve, reject) => {
+    const pool = getPythonWorkerPool();
+    if (pool) {
+      console.log(`Running in Python worker: ${scriptName} ${args.join(' ')}`);
+      pool.run(scriptName, args, input).then(resolve, reject);
+      return;
+    }
+
     // Build the full path to the script
     const scriptPath = path.join(__dirname, scriptName);
     
-    // Build the command with arguments
-    const argString = args.join(' ');
-    const command = `python "${scriptPath}" ${argString}`;
-    
-    console.log(`Executing: ${command}`);
+    console.log(`Executing: python ${scriptPath} ${args.join(' ')}`);
     
-    exec(command, (error, stdout, stderr) => {
+    // Arguments go to python as an argv array, never through a shell
+    const child = execFile('python', [scriptPath, ...args.map(String)], (error, stdout, stderr) => {
       // Always log output for debugging
       console.log(`Python stdout: ${stdout}`);
       
@@ -40,5 +48,10 @@ export function runPythonScript(scriptName, args = []) {
       
       resolve(stdout);
     });
+
+    // Pipe in-memory input (e.g. PDF bytes for '--input-file -') to the script
+    if (input !== null) {
+      child.stdin.end(input);
+    }
   });
 }
\ No newline at end of file
@@ -0,0 +1,158 @@
+// pythonWorkerPool.js
+import { spawn } from 'child_process';
+import readline from 'readline';
+import path from 'path';
+import { fileURLToPath } from 'url';
+
+// Get the directory name in ESM
+const __dirname = path.dirname(fileURLToPath(import.meta.url));
+
+const WORKER_SCRIPT = path.join(__dirname, 'worker.py');
+
+/**
+ * One long-lived `python worker.py` process. It runs one job at a time and
+ * keeps its imports and HTTP connections warm between jobs.
+ */
+class PythonWorker {
+  constructor(onExit) {
+    this.current = null;
+    this.process = spawn('python', [WORKER_SCRIPT], { stdio: ['pipe', 'pipe', 'pipe'] });
+
+    readline.createInterface({ input: this.process.stdout }).on('line', (line) => this.handleResponse(line));
+    this.process.stderr.on('data', (data) => console.error(`Python worker stderr: ${data}`));
+    this.process.on('exit', (code) => {
+      console.error(`Python worker exited with code ${code}`);
+      if (this.current) {
+        this.current.reject(new Error(`Python worker exited with code ${code}`));
+        this.current = null;
+      }
+      onExit(this);
+    });
+  }
+
+  get busy() {
+    return this.current !== null;
+  }
+
+  run(job) {
+    return new Promise((resolve, reject) => {
+      this.current = { job, resolve, reject };
+      this.process.stdin.write(`${JSON.stringify(job)}\n`);
+    });
+  }
+
+  handleResponse(line) {
+    const pending = this.current;
+    this.current = null;
+    if (!pending) {
+      return;
+    }
+
+    let response;
+    try {
+      response = JSON.parse(line);
+    } catch (error) {
+      pending.reject(new Error(`Invalid response from Python worker: ${line}`));
+      return;
+    }
+
+    // Always log output for debugging
+    console.log(`Python stdout: ${response.output}`);
+    if (response.log) {
+      console.error(`Python stderr: ${response.log}`);
+    }
+    if (!response.ok) {
+      console.error(`Python exit code: ${response.exit_code}`);
+      pending.reject(new Error(`Python script failed: ${response.error || response.output}`));
+      return;
+    }
+    pending.resolve(response.output);
+  }
+
+  stop() {
+    this.process.stdin.end();
+  }
+}
+
+/**
+ * A fixed-size pool of Python workers. Jobs queue until a worker is free;
+ * workers that die are replaced.
+ */
+export class PythonWorkerPool {
+  constructor(size) {
+    this.size = size;
+    this.queue = [];
+    this.nextJobId = 1;
+    this.stopped = false;
+    this.workers = [];
+    for (let i = 0; i < size; i++) {
+      this.workers.push(this.createWorker());
+    }
+  }
+
+  createWorker() {
+    return new PythonWorker((worker) => {
+      this.workers = this.workers.filter((w) => w !== worker);
+      if (!this.stopped) {
+        this.workers.push(this.createWorker());
+        this.dispatch();
+      }
+    });
+  }
+
+  /**
+   * Runs a script's main() in a worker
+   * @param {string} scriptName - Name of the script (without path)
+   * @param {Array} args - Array of arguments to pass to the script
+   * @param {Buffer|string|null} input - Optional data the script reads as stdin
+   * @returns {Promise<string>} - The script's output
+   */
+  run(scriptName, args = [], input = null) {
+    return new Promise((resolve, reject) => {
+      const job = {
+        id: this.nextJobId++,
+        script: scriptName,
+        args: args.map(String),
+        stdin: input === null ? null : Buffer.from(input).toString('base64'),
+      };
+      this.queue.push({ job, resolve, reject });
+      this.dispatch();
+    });
+  }
+
+  dispatch() {
+    for (const worker of this.workers) {
+      if (this.queue.length === 0) {
+        return;
+      }
+      if (!worker.busy) {
+        const { job, resolve, reject } = this.queue.shift();
+        worker.run(job)
+          .then(resolve, reject)
+          .finally(() => this.dispatch());
+      }
+    }
+  }
+
+  stop() {
+    this.stopped = true;
+    this.workers.forEach((worker) => worker.stop());
+  }
+}
+
+let sharedPool = null;
+
+/**
+ * Returns the shared worker pool, or null when PYTHON_WORKERS is unset or 0
+ * (scripts then run as one-off processes).
+ */
+export function getPythonWorkerPool() {
+  const size = parseInt(process.env.PYTHON_WORKERS || '0', 10);
+  if (!size) {
+    return null;
+  }
+  if (!sharedPool) {
+    sharedPool = new PythonWorkerPool(size);
+  }
+  return sharedPool;
+}
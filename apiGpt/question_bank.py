@@ -0,0 +1,197 @@
+import contextlib
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Question kinds, named after the exam's lists in test_json_structure.json
+QUESTION_KINDS = ("multiple_choice", "open_questions")
+
+# Questions whose word sets overlap at least this much (Jaccard) count as
+# the same question asked twice
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# Unicode direction marks the model is asked to add around Hebrew text
+_DIRECTION_MARKS = re.compile(r"[\u200e\u200f\u202a-\u202e\u2066-\u2069]")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def question_signature(question):
+    """The set of normalized words in a question, options included."""
+    text = question.get("question", "")
+    options = question.get("options")
+    if isinstance(options, list):
+        text += " " + " ".join(str(option) for option in options)
+    text = _NON_WORD.sub(" ", _DIRECTION_MARKS.sub("", text)).casefold()
+    return frozenset(text.split())
+
+
+def is_near_duplicate(signature, other):
+    """True if two question signatures are similar enough to be the same question."""
+    if not signature or not other:
+        return signature == other
+    overlap = len(signature & other) / len(signature | other)
+    return overlap >= NEAR_DUPLICATE_THRESHOLD
+
+
+def _lock_file(lock_file):
+    """Blocks until this process holds the exclusive lock on an open file."""
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        return
+    lock_file.seek(0)
+    while True:
+        try:
+            # Retries for about 10 seconds before raising
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def drop_near_duplicates(questions, existing):
+    """Returns `questions` without near-duplicates of `existing` or of each other."""
+    signatures = [question_signature(question) for question in existing]
+    kept = []
+    for question in questions:
+        signature = question_signature(question)
+        if not any(is_near_duplicate(signature, other) for other in signatures):
+            kept.append(question)
+            signatures.append(signature)
+    return kept
+
+
+class QuestionBank:
+    """
+    Every question generated for a document, stored as one JSON file per
+    bank key in `directory`. A key is usually the document's content hash
+    plus the prompt options that change the questions. Each stored question
+    counts how many exams it was served in, so exams draw unused questions
+    first and the model is only asked for the shortfall. Changes go through
+    locked() so concurrent jobs can share a bank.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    @contextlib.contextmanager
+    def locked(self, key):
+        """
+        Loads a bank for a read-modify-write and saves it when the block
+        exits without an error. An exclusive lock on the bank is held
+        throughout, so concurrent jobs for the same document never draw the
+        same unused questions or lose each other's additions.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{key}.lock"), "a+b") as lock_file:
+            _lock_file(lock_file)
+            try:
+                bank = self.load(key)
+                yield bank
+                self.save(key, bank)
+            finally:
+                _unlock_file(lock_file)
+
+    def load(self, key):
+        """Returns {kind: [entries]}; each entry is a question plus its "uses" count."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                bank = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            bank = {}
+        for kind in QUESTION_KINDS:
+            bank.setdefault(kind, [])
+        return bank
+
+    def save(self, key, bank):
+        """Writes a bank atomically so concurrent jobs never read half a file."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(bank, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _candidates(entries, exclude):
+        """Entries that aren't near-duplicates of the questions in `exclude`."""
+        if not exclude:
+            return list(entries)
+        signatures = [question_signature(question) for question in exclude]
+        return [
+            entry for entry in entries
+            if not any(is_near_duplicate(question_signature(entry), other) for other in signatures)
+        ]
+
+    @classmethod
+    def unused_counts(cls, bank, exclude=None):
+        """
+        Returns {kind: number of questions not served in any exam yet}, not
+        counting near-duplicates of exclude[kind].
+        """
+        exclude = exclude or {}
+        return {
+            kind: sum(1 for entry in cls._candidates(bank[kind], exclude.get(kind)) if not entry["uses"])
+            for kind in QUESTION_KINDS
+        }
+
+    @staticmethod
+    def add(bank, exam):
+        """
+        Adds the questions of an exam ({"multiple_choice": [...],
+        "open_questions": [...]}) to the bank, skipping near-duplicates of
+        questions already in it. Returns {kind: number added}.
+        """
+        added = {}
+        for kind in QUESTION_KINDS:
+            new_questions = drop_near_duplicates(exam.get(kind, []), bank[kind])
+            bank[kind].extend(dict(question, uses=0, added_at=time.time()) for question in new_questions)
+            added[kind] = len(new_questions)
+        return added
+
+    @classmethod
+    def draw(cls, bank, counts, rng=random, exclude=None):
+        """
+        Samples up to counts[kind] questions of each kind, unused ones first
+        (then the least used), marks them as used and returns them as an
+        exam ({"multiple_choice": [...], "open_questions": [...]}).
+        Near-duplicates of exclude[kind] (e.g. questions an exam already has)
+        are never drawn.
+        """
+        exclude = exclude or {}
+        exam = {}
+        for kind in QUESTION_KINDS:
+            entries = cls._candidates(bank[kind], exclude.get(kind))
+            rng.shuffle(entries)
+            entries.sort(key=lambda entry: entry["uses"])
+            chosen = entries[:counts.get(kind, 0)]
+            for entry in chosen:
+                entry["uses"] += 1
+            exam[kind] = [
+                {field: value for field, value in entry.items() if field not in ("uses", "added_at")}
+                for entry in chosen
+            ]
+        return exam
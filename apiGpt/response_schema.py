@@ -0,0 +1,202 @@
+import json
+
+
+class SchemaValidationError(ValueError):
+    """A parsed reply does not match the response schema; `path` locates the problem."""
+
+    def __init__(self, path, message):
+        super().__init__(f"{path}: {message}")
+        self.path = path
+
+
+_JSON_TYPES = {str: "string", bool: "boolean", int: "integer", float: "number"}
+
+# Types a summary section may have. The structure file shows text sections,
+# but the prompt asks for notes and a "dynamic format", so the model also
+# answers with lists and nested objects. The summary renderer and
+# merge_summaries handle all three.
+SUMMARY_SECTION_TYPES = ["string", "array", "object"]
+
+
+def schema_from_example(example):
+    """
+    Compiles an example document, like the *_json_structure.json files, into a
+    JSON Schema: every object key is required, no other keys are allowed and
+    arrays take the shape of their first item.
+    """
+    if isinstance(example, dict):
+        return {
+            "type": "object",
+            "properties": {key: schema_from_example(value) for key, value in example.items()},
+            "required": list(example),
+            "additionalProperties": False,
+        }
+    if isinstance(example, list):
+        return {"type": "array", "items": schema_from_example(example[0]) if example else {}}
+    if example is None:
+        return {"type": "null"}
+    return {"type": _JSON_TYPES[type(example)]}
+
+
+def schema_for_structure(generate_type, structure):
+    """
+    Returns the JSON Schema for a generation type's structure file. Summary
+    structures only show the shape of a section: the model replaces the
+    placeholder subjects with real titles, so any key is allowed as long as
+    its value is one of SUMMARY_SECTION_TYPES.
+    """
+    if generate_type == "summary":
+        return {
+            "type": "object",
+            "additionalProperties": {"type": SUMMARY_SECTION_TYPES},
+            "minProperties": 1,
+        }
+    return schema_from_example(structure)
+
+
+def fill_missing_containers(generate_type, structure, value):
+    """
+    Completes a reply cut off by truncation so its complete part validates:
+    required arrays and objects the reply never reached are added empty, and
+    objects added this way get their own required arrays and objects too.
+    Returns the paths that were filled in.
+    """
+    filled = []
+    _fill_object(schema_for_structure(generate_type, structure), value, "$", filled)
+    return filled
+
+
+def _fill_object(schema, value, path, filled):
+    if schema.get("type") != "object" or not isinstance(value, dict):
+        return
+    properties = schema.get("properties", {})
+    for key in schema.get("required", []):
+        item_schema = properties.get(key, {})
+        item_path = f"{path}.{key}"
+        if key not in value:
+            if item_schema.get("type") == "array":
+                value[key] = []
+            elif item_schema.get("type") == "object":
+                value[key] = {}
+            else:
+                continue
+            filled.append(item_path)
+        _fill_object(item_schema, value[key], item_path, filled)
+
+
+def response_format_for(generate_type, structure):
+    """
+    The response_format to request for a generation type. Strict structured
+    output needs fixed keys, so summaries (free titles) use JSON mode and are
+    held to their schema by the local validator instead.
+    """
+    schema = schema_for_structure(generate_type, structure)
+    if schema.get("additionalProperties") is False:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": f"{generate_type}_response", "schema": schema, "strict": True},
+        }
+    return {"type": "json_object"}
+
+
+def _check_type(expected):
+    if expected == "object":
+        return lambda value: isinstance(value, dict)
+    if expected == "array":
+        return lambda value: isinstance(value, list)
+    if expected == "string":
+        return lambda value: isinstance(value, str)
+    if expected == "boolean":
+        return lambda value: isinstance(value, bool)
+    if expected == "integer":
+        return lambda value: isinstance(value, int) and not isinstance(value, bool)
+    if expected == "number":
+        return lambda value: isinstance(value, (int, float)) and not isinstance(value, bool)
+    if expected == "null":
+        return lambda value: value is None
+    raise ValueError(f"Unsupported schema type: {expected}")
+
+
+def _compile(schema):
+    """Turns a schema into a check(value, path) function, resolving it once."""
+    checks = []
+
+    expected = schema.get("type")
+    if isinstance(expected, list):
+        # One of several types; their contents are not checked further
+        type_checks = [_check_type(name) for name in expected]
+
+        def check_types(value, path):
+            if not any(is_type(value) for is_type in type_checks):
+                raise SchemaValidationError(
+                    path, f"expected {' or '.join(expected)}, got {type(value).__name__}"
+                )
+        checks.append(check_types)
+    elif expected:
+        is_type = _check_type(expected)
+
+        def check_type(value, path):
+            if not is_type(value):
+                raise SchemaValidationError(path, f"expected {expected}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if expected == "object":
+        properties = {key: _compile(sub) for key, sub in schema.get("properties", {}).items()}
+        required = schema.get("required", [])
+        additional = schema.get("additionalProperties", True)
+        check_additional = _compile(additional) if isinstance(additional, dict) else None
+        min_properties = schema.get("minProperties", 0)
+
+        def check_object(value, path):
+            for key in required:
+                if key not in value:
+                    raise SchemaValidationError(path, f"missing required key {key!r}")
+            if len(value) < min_properties:
+                raise SchemaValidationError(path, f"expected at least {min_properties} keys")
+            for key, item in value.items():
+                item_path = f"{path}.{key}"
+                if key in properties:
+                    properties[key](item, item_path)
+                elif check_additional is not None:
+                    check_additional(item, item_path)
+                elif additional is False:
+                    raise SchemaValidationError(path, f"unexpected key {key!r}")
+        checks.append(check_object)
+
+    if expected == "array" and schema.get("items"):
+        check_item = _compile(schema["items"])
+
+        def check_array(value, path):
+            for index, item in enumerate(value):
+                check_item(item, f"{path}[{index}]")
+        checks.append(check_array)
+
+    def check(value, path):
+        for check_part in checks:
+            check_part(value, path)
+    return check
+
+
+def compile_validator(schema):
+    """
+    Compiles a schema (the subset schema_from_example produces, plus
+    minProperties and a list of types) into a validate(value) function that raises
+    SchemaValidationError on the first mismatch.
+    """
+    check = _compile(schema)
+
+    def validate(value):
+        check(value, "$")
+        return value
+    return validate
+
+
+_validators = {}
+
+
+def get_validator(generate_type, structure):
+    """Returns the compiled validator for a structure, compiling it on first use."""
+    key = (generate_type, json.dumps(structure, sort_keys=True))
+    if key not in _validators:
+        _validators[key] = compile_validator(schema_for_structure(generate_type, structure))
+    return _validators[key]
@@ -0,0 +1,178 @@
+import re
+from itertools import chain
+
+import numpy as np
+
+# Share of the character budget spread over the document in proportion to
+# each part's length, so every part keeps its most central paragraphs; the
+# rest goes to the highest-scoring paragraphs wherever they are.
+COVERAGE_SHARE = 0.5
+# Number of equal-length parts the coverage share is spread over
+COVERAGE_SEGMENTS = 10
+# Share of the budget split evenly between several documents (see
+# split_budget); the rest follows their length or salience.
+EVEN_SHARE = 0.5
+
+# Niqqud, cantillation marks and Unicode direction marks carry no meaning for
+# scoring; removing them makes pointed and unpointed spellings the same word.
+_IGNORED_MARKS = re.compile(r"[\u0591-\u05c7\u200e\u200f\u202a-\u202e\u2066-\u2069]")
+# Words of at least two characters and line breaks; words without a letter
+# (numbers) are skipped when scoring
+_WORD_OR_BREAK = re.compile(r"\w{2,}|\n")
+_LETTER = re.compile(r"[^\W\d_]")
+_HEBREW_WORD = re.compile(r"[\u05d0-\u05ea]+")
+# One-letter Hebrew prefixes written attached to the word: "and"/"that"
+# (ו, ש) may come before "the", "in", "to", "from" or "as" (ה, ב, ל, מ, כ),
+# so "והמטריצה" and "מטריצה" count as the same term.
+HEBREW_CONJUNCTION_PREFIXES = "וש"
+HEBREW_PREFIXES = "הבלמכ"
+MIN_STEM_LETTERS = 3
+
+
+def stem(word):
+    """Strips the attached prefixes from a Hebrew word, keeping at least MIN_STEM_LETTERS."""
+    if not _HEBREW_WORD.fullmatch(word):
+        return word
+    if word[0] in HEBREW_CONJUNCTION_PREFIXES and len(word) - 1 >= MIN_STEM_LETTERS:
+        word = word[1:]
+    if word[0] in HEBREW_PREFIXES and len(word) - 1 >= MIN_STEM_LETTERS:
+        word = word[1:]
+    return word
+
+
+def normalize(text):
+    """Removes niqqud and direction marks and case-folds Latin letters."""
+    return _IGNORED_MARKS.sub("", text).casefold()
+
+
+def paragraph_scores(text):
+    """
+    Scores each paragraph (line) of text by how central it is to the
+    document: the cosine between its TF-IDF vector and the mean of all
+    paragraph vectors. Terms are stemmed words; paragraphs without words
+    score 0. Returns a float array with one score per line.
+    """
+    num_paragraphs = text.count("\n") + 1
+    # One pass over the text; line breaks are kept as tokens to number the paragraphs
+    tokens = _WORD_OR_BREAK.findall(normalize(text))
+    vocabulary = {token: index for index, token in enumerate(dict.fromkeys(chain(["\n"], tokens)))}
+    token_ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+    paragraph_ids = np.cumsum(token_ids == 0)
+
+    # Stem each distinct word once; term 0 stands for line breaks and numbers
+    stems = {"\n": 0}
+    stem_ids = np.fromiter(
+        (stems.setdefault(stem(token), len(stems)) if _LETTER.search(token) else 0 for token in vocabulary),
+        dtype=np.int64, count=len(vocabulary),
+    )
+    terms = stem_ids[token_ids]
+    is_word = terms != 0
+    if not is_word.any():
+        return np.zeros(num_paragraphs)
+    paragraph_ids = paragraph_ids[is_word]
+    terms = terms[is_word]
+    num_terms = len(stems)
+
+    # Sparse paragraph x term counts as (paragraph, term, count) triples
+    pairs, counts = np.unique(paragraph_ids * num_terms + terms, return_counts=True)
+    rows, columns = np.divmod(pairs, num_terms)
+
+    document_frequency = np.bincount(columns, minlength=num_terms)
+    idf = np.log((1 + num_paragraphs) / (1 + document_frequency)) + 1
+    weights = (1 + np.log(counts)) * idf[columns]
+    norms = np.sqrt(np.bincount(rows, weights * weights, minlength=num_paragraphs))
+    weights /= norms[rows]
+
+    centroid = np.bincount(columns, weights, minlength=num_terms)
+    centroid /= np.linalg.norm(centroid)
+    return np.bincount(rows, weights * centroid[columns], minlength=num_paragraphs)
+
+
+def select_salient_paragraphs(text, max_chars, coverage_share=COVERAGE_SHARE, segments=COVERAGE_SEGMENTS):
+    """
+    Shortens text to at most max_chars by keeping whole paragraphs (lines):
+    coverage_share of the budget is spread over `segments` equal parts of the
+    document, each taking its best-scoring paragraphs (see paragraph_scores),
+    and the rest of the budget takes the best remaining paragraphs overall.
+    The kept paragraphs are returned in document order. Text within budget is
+    returned unchanged.
+    """
+    if len(text) <= max_chars:
+        return text
+
+    paragraphs = text.split("\n")
+    scores = paragraph_scores(text)
+    sizes = np.fromiter((len(paragraph) + 1 for paragraph in paragraphs), dtype=np.int64,
+                        count=len(paragraphs))  # +1 for the joining newline
+    chosen = np.zeros(len(paragraphs), dtype=bool)
+    remaining = max_chars + 1  # the last paragraph has no newline after it
+
+    # Step 1: each part of the document gets its share of the coverage budget
+    starts = np.cumsum(sizes) - sizes
+    segment = starts * segments // (starts[-1] + sizes[-1])
+    segment_budget = np.bincount(segment, sizes, minlength=segments) * (coverage_share * max_chars / len(text))
+    for index in np.lexsort((-scores, segment)):
+        if scores[index] > 0 and sizes[index] <= segment_budget[segment[index]]:
+            segment_budget[segment[index]] -= sizes[index]
+            remaining -= sizes[index]
+            chosen[index] = True
+
+    # Step 2: the rest of the budget goes to the best paragraphs left anywhere
+    smallest = sizes.min()
+    for index in np.argsort(-scores, kind="stable"):
+        if remaining < smallest:
+            break
+        if not chosen[index] and sizes[index] <= remaining:
+            remaining -= sizes[index]
+            chosen[index] = True
+
+    return "\n".join(paragraphs[index] for index in np.flatnonzero(chosen))
+
+
+def _fill(budgets, lengths, weights, amount):
+    """
+    Adds `amount` to budgets in proportion to weights, never past a
+    document's length; what a full document leaves over is split between
+    the others the same way.
+    """
+    open_documents = budgets < lengths
+    while amount > 0 and open_documents.any():
+        total = weights[open_documents].sum()
+        if total <= 0:
+            break
+        shares = np.where(open_documents, amount * weights / total, 0)
+        filled = open_documents & (budgets + shares >= lengths)
+        if not filled.any():
+            budgets += shares
+            break
+        # Documents that fit whole take their length; the rest is split again
+        amount -= (lengths - budgets)[filled].sum()
+        budgets[filled] = lengths[filled]
+        open_documents &= ~filled
+
+
+def split_budget(texts, max_chars, by="length", even_share=EVEN_SHARE):
+    """
+    Splits max_chars between several documents' texts. even_share of it is
+    split evenly, so a short document is kept whole instead of being cut to
+    a sliver, and the rest in proportion to each document's length
+    ("length") or salience ("salience"): the length-weighted
+    paragraph_scores of the document against the centroid of all documents
+    together, so documents central to their common subject get more than
+    side material. A document never gets more than its own length; what it
+    leaves over goes to the others. Returns one budget (int) per text.
+    """
+    lengths = np.array([len(text) for text in texts], dtype=float)
+    weights = lengths
+    if by == "salience":
+        joined = "\n".join(texts)
+        sizes = np.fromiter((len(paragraph) + 1 for paragraph in joined.split("\n")), dtype=np.int64)
+        document = np.repeat(np.arange(len(texts)), [text.count("\n") + 1 for text in texts])
+        weights = np.bincount(document, paragraph_scores(joined) * sizes, minlength=len(texts))
+        if not weights.any():
+            weights = lengths  # No words to score
+
+    budgets = np.zeros(len(texts))
+    _fill(budgets, lengths, np.ones(len(texts)), even_share * max_chars)
+    _fill(budgets, lengths, weights, max_chars - budgets.sum())
+    return np.floor(budgets).astype(int).tolist()
@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+# Where spans go when a script isn't told explicitly: a file path, or "-" for
+# stderr. Unset or empty disables tracing.
+TRACE_FILE_ENV = "TRACE_FILE"
+# Groups the spans of one request, e.g. across generate_json.py and the renderer
+TRACE_ID_ENV = "TRACE_ID"
+
+_lock = threading.Lock()
+_local = threading.local()
+_sink = None
+_sink_path = None
+_trace_id = None
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is disabled, so instrumentation costs a call."""
+
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """
+    A timed stage. On exit it writes one JSON line with its name, start time,
+    duration in milliseconds, status and attributes to the configured sink.
+    """
+
+    recording = True
+
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.attrs = attrs or {}
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = _stack()
+        if self.parent is None and stack:
+            self.parent = stack[-1]
+        stack.append(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        duration_ms = (time.perf_counter() - self._started) * 1000
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        record = {
+            "trace_id": _trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(duration_ms, 3),
+            "status": "ok" if exc_type is None else "error",
+            "attrs": self.attrs,
+        }
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc_value}"
+        _write(record)
+        return False
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _write(record):
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        if _sink is not None:
+            _sink.write(line)
+            _sink.flush()
+
+
+def configure(sink=None, trace_id=None):
+    """
+    Sets where spans are written: a file path (appended to), "-" for stderr,
+    or None to use the TRACE_FILE environment variable. Tracing is disabled
+    when neither is set. trace_id defaults to TRACE_ID or a random id.
+    Returns True if tracing is enabled.
+    """
+    global _sink, _sink_path, _trace_id
+    if sink is None:
+        sink = os.environ.get(TRACE_FILE_ENV) or None
+
+    with _lock:
+        if sink != _sink_path:
+            if _sink is not None and _sink is not sys.stderr:
+                _sink.close()
+            if sink is None:
+                _sink = None
+            elif sink == "-":
+                _sink = sys.stderr
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(sink)), exist_ok=True)
+                _sink = open(sink, "a", encoding="utf-8")
+            _sink_path = sink
+        _trace_id = trace_id or os.environ.get(TRACE_ID_ENV) or uuid.uuid4().hex[:16]
+    return _sink is not None
+
+
+def enabled():
+    return _sink is not None
+
+
+def span(name, parent=None, **attrs):
+    """
+    Context manager timing one stage, e.g.
+        with tracing.span("extract", file_type="pdf") as s:
+            ...
+            s.set(chars=len(text))
+    The enclosing span on the same thread is the parent; pass `parent` for
+    work handed to other threads. While tracing is disabled this returns a
+    shared no-op span; check `s.recording` before computing costly attributes.
+    """
+    if _sink is None:
+        return _NOOP_SPAN
+    return Span(name, parent, attrs)
+
+
+def current_span():
+    """The innermost open span on this thread (a no-op span if none)."""
+    stack = _stack() if _sink is not None else None
+    return stack[-1] if stack else _NOOP_SPAN
+
+
+def annotate(**attrs):
+    """Adds attributes to the innermost open span, if any."""
+    if _sink is not None:
+        current_span().set(**attrs)
@@ -0,0 +1,120 @@
+import base64
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+
+# Jobs name the script they would otherwise be run as; each maps to the
+# module whose main(argv) runs it.
+SCRIPT_MODULES = {
+    "generate_json.py": "generate_json",
+    "generate_test_html_from_json.py": "generate_test_html_from_json",
+    "generate_summary_html_from_json.py": "generate_summary_html_from_json",
+}
+
+
+def load_script(script):
+    """Returns the main() of a known script, importing its module on first use."""
+    module_name = SCRIPT_MODULES.get(script)
+    if module_name is None:
+        return None
+    return importlib.import_module(module_name).main
+
+
+# Libraries the scripts only import when they first need them; a long-lived
+# worker loads them up front so no job pays for them.
+WARM_UP_MODULES = ["openai", "fitz", "pptx", "dedup", "salience"]
+
+
+def warm_up():
+    """Imports every script module and WARM_UP_MODULES up front."""
+    for script in SCRIPT_MODULES:
+        load_script(script)
+    for module_name in WARM_UP_MODULES:
+        importlib.import_module(module_name)
+
+
+def run_job(job):
+    """
+    Runs one job in this process and returns its response.
+    A job is {"id", "script", "args", "stdin"}: `args` is the script's argument
+    list and the optional `stdin` is base64 data the script reads as standard
+    input (e.g. a PDF for '--input-file -').
+    The response is {"id", "ok", "exit_code", "output", "log", "error", "duration"},
+    where `output` is everything the script printed, `log` everything it wrote
+    to stderr, and `error` is None unless the job failed, when it holds the
+    traceback, the exit message or else the stderr text.
+    """
+    response = {"id": job.get("id"), "ok": False, "exit_code": 2, "output": "", "log": "", "error": None}
+    main = load_script(job.get("script"))
+    if main is None:
+        response["error"] = f"Unknown script: {job.get('script')}"
+        return response
+
+    stdin_data = base64.b64decode(job["stdin"]) if job.get("stdin") else b""
+    captured = io.StringIO()
+    captured_errors = io.StringIO()
+    saved_stdin = sys.stdin
+    sys.stdin = io.TextIOWrapper(io.BytesIO(stdin_data), encoding="utf-8")
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured_errors):
+            result = main(job.get("args", []))
+        exit_code = result if isinstance(result, int) else 0
+    except SystemExit as e:
+        # argparse errors and sys.exit() calls end the job, not the worker
+        if e.code is None or isinstance(e.code, int):
+            exit_code = e.code or 0
+        else:
+            exit_code = 1
+            response["error"] = str(e.code)
+    except Exception:
+        exit_code = 1
+        response["error"] = traceback.format_exc()
+    finally:
+        sys.stdin = saved_stdin
+
+    log = captured_errors.getvalue()
+    response.update(
+        ok=exit_code == 0,
+        exit_code=exit_code,
+        output=captured.getvalue(),
+        log=log,
+        error=None if exit_code == 0 else response["error"] or log or None,
+        duration=time.perf_counter() - started,
+    )
+    return response
+
+
+def serve(input_stream, output_stream):
+    """Reads one JSON job per line and writes one JSON response per line."""
+    for line in input_stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {"id": None, "ok": False, "exit_code": 2, "output": "", "log": "",
+                        "error": f"Invalid job: {e}"}
+        else:
+            response = run_job(job)
+        output_stream.write(json.dumps(response) + "\n")
+        output_stream.flush()
+
+
+if __name__ == "__main__":
+    # Keep the real stdout for protocol responses only. File descriptor 1 is
+    # pointed at stderr, so prints outside a job, including ones from C
+    # extensions such as MuPDF, can't corrupt the protocol stream.
+    protocol_output = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdin.reconfigure(encoding="utf-8")
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    warm_up()
+    serve(sys.stdin, protocol_output)
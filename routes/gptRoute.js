@@ -10,7 +10,8 @@ import {
   generateHtmlExam, 
   generateHtmlSummary, 
   processPdfAndGenerateHtmlExam, 
-  processPdfAndGenerateHtmlSummary 
+  processPdfAndGenerateHtmlSummary,
+  cleanupJobOutput
 } from '../apiGpt/gptApiService.js';
 import contentController from '../controllers/contentController.js';
 
@@ -23,25 +24,9 @@ if (!fs.existsSync(outputDir)) {
   fs.mkdirSync(outputDir, { recursive: true });
 }
 
-// Configure multer for file uploads
-const storage = multer.diskStorage({
-  destination: function (req, file, cb) {
-    // Similar to above, we need to make sure we're using the correct path
-    const projectRoot = path.dirname(__dirname);
-    const uploadPath = path.join(projectRoot, 'apiGpt');
-    
-    console.log(`Upload directory: ${uploadPath}`); // Add for debugging
-    if (!fs.existsSync(uploadPath)) {
-      fs.mkdirSync(uploadPath, { recursive: true });
-    }
-    cb(null, uploadPath);
-  },
-  filename: function (req, file, cb) {
-    cb(null, 'input.' + file.originalname.split('.').pop()); // Save as input.pdf or input.pptx
-  }
-});
-
-const upload = multer({ storage: storage });
+// Keep uploads in memory: req.file.buffer is piped to generate_json.py's stdin,
+// so uploads are never written to disk and concurrent uploads can't overwrite each other
+const upload = multer({ storage: multer.memoryStorage() });
 
 /**
  * @swagger
@@ -57,7 +42,7 @@ router.post('/process-file', upload.single('file'), async (req, res) => {
       return res.status(400).json({ error: 'No file uploaded' });
     }
     
-    const filePath = req.file.path;
+    const fileData = req.file.buffer;
     const fileType = req.file.originalname.split('.').pop().toLowerCase();
     const generateType = req.body.type || 'summary';
     
@@ -65,7 +50,7 @@ router.post('/process-file', upload.single('file'), async (req, res) => {
       return res.status(400).json({ error: 'Only PDF and PPTX files are supported' });
     }
     
-    const result = await generateJsonFromFile(filePath, fileType, generateType);
+    const result = await generateJsonFromFile(fileData, fileType, generateType);
     res.json(result);
   } catch (error) {
     console.error('Error processing file:', error);
@@ -122,7 +107,7 @@ router.post('/upload-and-generate-summary', upload.single('file'), async (req, r
       return res.status(400).json({ error: 'No file uploaded' });
     }
     
-    const filePath = req.file.path;
+    const fileData = req.file.buffer;
     const fileType = req.file.originalname.split('.').pop().toLowerCase();
     
     if (fileType !== 'pdf' && fileType !== 'pptx') {
@@ -134,7 +119,7 @@ router.post('/upload-and-generate-summary', upload.single('file'), async (req, r
     
     // Process the file and generate the summary with the additional prompt
     const htmlPath = await processPdfAndGenerateHtmlSummary(
-      filePath,
+      fileData,
       fileType,
       additionalPrompt
     );
@@ -143,7 +128,12 @@ router.post('/upload-and-generate-summary', upload.single('file'), async (req, r
 
     try {
       // Get userId from the request body or use default
-      const htmlContent = await fsPromises.readFile(htmlPath, 'utf8');
+      let htmlContent;
+      try {
+        htmlContent = await fsPromises.readFile(htmlPath, 'utf8');
+      } finally {
+        await cleanupJobOutput(htmlPath);
+      }
       const userId = req.body.userId || "67f3bd679937c252dacacee4"; // Default user ID if not provided
       const defaultTitle = `Summary - ${new Date().toLocaleString()}`;
       const subject = req.body.subject;
@@ -224,7 +214,7 @@ router.post('/upload-and-generate-exam', upload.single('file'), async (req, res)
       return res.status(400).json({ error: 'No file uploaded' });
     }
     
-    const filePath = req.file.path;
+    const fileData = req.file.buffer;
     const fileType = req.file.originalname.split('.').pop().toLowerCase();
     
     if (fileType !== 'pdf' && fileType !== 'pptx') {
@@ -245,7 +235,7 @@ router.post('/upload-and-generate-exam', upload.single('file'), async (req, res)
     additionalPrompt = additionalPrompt + '. Make it on a ' + difficulty + ' difficulty level.';
     // Process the file and generate the exam with the new parameters
     const htmlPath = await processPdfAndGenerateHtmlExam(
-      filePath,
+      fileData,
       fileType,
       numAmerican,
       numOpen,
@@ -256,7 +246,12 @@ router.post('/upload-and-generate-exam', upload.single('file'), async (req, res)
 
     try {
       // Get userId from the request body or use default
-      const htmlContent = await fsPromises.readFile(htmlPath, 'utf8');
+      let htmlContent;
+      try {
+        htmlContent = await fsPromises.readFile(htmlPath, 'utf8');
+      } finally {
+        await cleanupJobOutput(htmlPath);
+      }
       const userId = req.body.userId || "67f3bd679937c252dacacee4"; // Default user ID if not provided
       const defaultTitle = `Exam - ${difficulty} - ${new Date().toLocaleString()}`;
       const subject = req.body.subject;
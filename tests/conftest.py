@@ -0,0 +1,43 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# The Python generators are standalone scripts in apiGpt/ that import their
+# sibling modules by name, so tests import them the same way.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "apiGpt"))
+
+from fake_openai import FakeOpenAI, structured_reply  # noqa: E402
+
+import generate_json  # noqa: E402
+
+API_DIR = os.path.dirname(os.path.abspath(generate_json.__file__))
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """
+    Points generate_json at tmp_path: a copy of the structure files, and the
+    caches, assistant registry and question bank under tmp_path/cache.
+    """
+    for name in ("test_json_structure.json", "summary_json_structure.json"):
+        shutil.copy(os.path.join(API_DIR, name), tmp_path / name)
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(generate_json, "script_dir", str(tmp_path))
+    monkeypatch.setattr(generate_json, "EXTRACTION_CACHE_DIR", str(cache_dir / "extraction"))
+    monkeypatch.setattr(generate_json, "GENERATION_CACHE_DIR", str(cache_dir / "generation"))
+    monkeypatch.setattr(generate_json, "ASSISTANT_REGISTRY_FILE", str(cache_dir / "assistants.json"))
+    monkeypatch.setattr(generate_json, "QUESTION_BANK_DIR", str(cache_dir / "question_bank"))
+    return tmp_path
+
+
+@pytest.fixture
+def client(workspace, monkeypatch):
+    """
+    The FakeOpenAI generate_json talks to in the workspace. It answers with
+    structured_reply; a test module overrides this fixture to change that.
+    """
+    client = FakeOpenAI(reply=structured_reply)
+    monkeypatch.setattr(generate_json, "get_openai_client", lambda: client)
+    return client
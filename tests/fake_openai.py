@@ -0,0 +1,193 @@
+import itertools
+import json
+import re
+from types import SimpleNamespace
+
+
+EXAM_REPLY = json.dumps({"exam": {
+    "multiple_choice": [{"question": "q", "options": ["a", "b", "c", "d"], "answer": "a"}],
+    "open_questions": [{"question": "q", "answer": "a"}],
+}})
+SUMMARY_REPLY = json.dumps({"subject": "summary"})
+# Token usage reported for every completed run
+USAGE = SimpleNamespace(prompt_tokens=1200, completion_tokens=300, total_tokens=1500)
+
+
+def structured_reply(content):
+    """A reply matching the structure file the prompt asked for."""
+    return EXAM_REPLY if "Generate a test" in content else SUMMARY_REPLY
+
+
+def numbered_exam_reply():
+    """A fake model that writes as many distinct questions as the prompt asks for."""
+    counter = itertools.count(1)
+
+    def reply(content):
+        num_american, num_open = map(int, re.search(
+            r"with (\d+) multiple choice questions and (\d+) open questions", content
+        ).groups())
+        return json.dumps({"exam": {
+            "multiple_choice": [
+                {"question": f"topic {n} question", "options": ["a", "b", "c", "d"], "answer": "a"}
+                for n in itertools.islice(counter, num_american)
+            ],
+            "open_questions": [
+                {"question": f"explain topic {n}", "answer": "because"}
+                for n in itertools.islice(counter, num_open)
+            ],
+        }})
+    return reply
+
+
+class FakeNotFoundError(Exception):
+    """Stands in for openai.NotFoundError; only status_code is inspected."""
+    status_code = 404
+
+
+class FakeOpenAI:
+    """
+    Minimal in-memory stand-in for openai.OpenAI covering the Assistants API
+    calls generate_json.py makes. `reply` maps the user message content to
+    the assistant's text reply.
+    - streaming: when False, runs.create(stream=True) raises TypeError like
+      an SDK without streaming support
+    - statuses: run statuses returned by successive runs.retrieve calls; the
+      last one repeats
+    """
+
+    def __init__(self, reply=None, streaming=True, statuses=("completed",)):
+        self.reply = reply or (lambda content: json.dumps({"reply": "ok"}))
+        self.streaming = streaming
+        self.statuses = list(statuses)
+        self.retrieve_calls = 0
+        self.cancelled_runs = []
+        self.assistants = {}
+        self.threads = {}
+        self.created_assistants = []
+        self.runs = []
+        self._ids = itertools.count(1)
+        self.beta = SimpleNamespace(
+            assistants=SimpleNamespace(
+                create=self._create_assistant,
+                retrieve=self._retrieve_assistant,
+                delete=self._delete_assistant,
+            ),
+            threads=SimpleNamespace(
+                create=self._create_thread,
+                messages=SimpleNamespace(create=self._create_message, list=self._list_messages),
+                runs=SimpleNamespace(
+                    create=self._create_run,
+                    retrieve=self._retrieve_run,
+                    cancel=self._cancel_run,
+                ),
+            ),
+        )
+
+    def _new_id(self, prefix):
+        return f"{prefix}_{next(self._ids)}"
+
+    def _create_assistant(self, name, instructions, model):
+        assistant = SimpleNamespace(id=self._new_id("asst"), name=name, instructions=instructions, model=model)
+        self.assistants[assistant.id] = assistant
+        self.created_assistants.append(assistant.id)
+        return assistant
+
+    def _retrieve_assistant(self, assistant_id):
+        if assistant_id not in self.assistants:
+            raise FakeNotFoundError(assistant_id)
+        return self.assistants[assistant_id]
+
+    def _delete_assistant(self, assistant_id):
+        self.assistants.pop(assistant_id, None)
+
+    def _create_thread(self):
+        thread = SimpleNamespace(id=self._new_id("thread"))
+        self.threads[thread.id] = []
+        return thread
+
+    def _create_message(self, thread_id, role, content):
+        self.threads[thread_id].append(SimpleNamespace(role=role, content=content))
+
+    def _create_run(self, thread_id, assistant_id, stream=False, **kwargs):
+        if stream and not self.streaming:
+            raise TypeError("create() got an unexpected keyword argument 'stream'")
+        if assistant_id not in self.assistants:
+            raise FakeNotFoundError(assistant_id)
+        run = SimpleNamespace(id=self._new_id("run"), thread_id=thread_id, assistant_id=assistant_id,
+                              stream=stream, kwargs=kwargs)
+        self.runs.append(run)
+        text = self.reply(self.threads[thread_id][-1].content)
+        self.threads[thread_id].append(SimpleNamespace(
+            role="assistant",
+            content=[SimpleNamespace(type="text", text=SimpleNamespace(value=text))],
+        ))
+        if stream:
+            return self._events(run, text)
+        return run
+
+    def _events(self, run, text):
+        yield SimpleNamespace(event="thread.run.created", data=SimpleNamespace(id=run.id, status="queued"))
+        yield SimpleNamespace(event="thread.run.in_progress", data=SimpleNamespace(id=run.id, status="in_progress"))
+        for start in range(0, len(text), 7):
+            delta = SimpleNamespace(content=[SimpleNamespace(
+                type="text", text=SimpleNamespace(value=text[start:start + 7]),
+            )])
+            yield SimpleNamespace(event="thread.message.delta", data=SimpleNamespace(delta=delta))
+        yield SimpleNamespace(event="thread.run.completed",
+                              data=SimpleNamespace(id=run.id, status="completed", usage=USAGE))
+
+    def _retrieve_run(self, thread_id, run_id):
+        status = self.statuses[min(self.retrieve_calls, len(self.statuses) - 1)]
+        self.retrieve_calls += 1
+        return SimpleNamespace(id=run_id, status=status, usage=USAGE if status == "completed" else None)
+
+    def _cancel_run(self, thread_id, run_id):
+        self.cancelled_runs.append(run_id)
+
+    def _list_messages(self, thread_id):
+        # The API lists newest messages first
+        return SimpleNamespace(data=list(reversed(self.threads[thread_id])))
+
+
+class FakeRateLimitError(Exception):
+    """Stands in for openai.RateLimitError; only status_code is inspected."""
+    status_code = 429
+
+
+class FakeAsyncOpenAI:
+    """
+    openai.AsyncOpenAI stand-in sharing a FakeOpenAI's state, so assistants
+    created through the sync client exist for async runs too.
+    - run_errors: exceptions raised by successive runs.create calls before
+      they start succeeding
+    """
+
+    def __init__(self, sync_client, run_errors=()):
+        self.sync = sync_client
+        self.run_errors = list(run_errors)
+        threads = sync_client.beta.threads
+        self.beta = SimpleNamespace(
+            threads=SimpleNamespace(
+                create=self._wrap(threads.create),
+                messages=SimpleNamespace(
+                    create=self._wrap(threads.messages.create),
+                    list=self._wrap(threads.messages.list),
+                ),
+                runs=SimpleNamespace(
+                    create=self._create_run,
+                    retrieve=self._wrap(threads.runs.retrieve),
+                    cancel=self._wrap(threads.runs.cancel),
+                ),
+            ),
+        )
+
+    @staticmethod
+    def _wrap(method):
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+    async def _create_run(self, **kwargs):
+        if self.run_errors:
+            raise self.run_errors.pop(0)
+        return self.sync.beta.threads.runs.create(**kwargs)
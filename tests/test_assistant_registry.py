@@ -0,0 +1,75 @@
+import pytest
+
+from assistant_registry import AssistantRegistry, assistant_key
+from fake_openai import FakeOpenAI
+
+import generate_json
+
+
+@pytest.fixture
+def registry_file(tmp_path, monkeypatch):
+    path = tmp_path / "assistants.json"
+    monkeypatch.setattr(generate_json, "ASSISTANT_REGISTRY_FILE", str(path))
+    return path
+
+
+def test_creates_assistant_once_and_reuses_it_across_runs(tmp_path):
+    client = FakeOpenAI()
+    path = str(tmp_path / "assistants.json")
+
+    first = AssistantRegistry(path).get_or_create(client, "gpt-4.1", "instructions", "Generator")
+    # A new registry object reads the same file, like a later process would
+    second = AssistantRegistry(path).get_or_create(client, "gpt-4.1", "instructions", "Generator")
+
+    assert first == second
+    assert client.created_assistants == [first]
+
+
+def test_new_assistant_for_different_model_or_instructions(tmp_path):
+    client = FakeOpenAI()
+    registry = AssistantRegistry(str(tmp_path / "assistants.json"))
+
+    base = registry.get_or_create(client, "gpt-4.1", "instructions", "Generator")
+    other_model = registry.get_or_create(client, "gpt-4.1-mini", "instructions", "Generator")
+    other_instructions = registry.get_or_create(client, "gpt-4.1", "changed", "Generator")
+
+    assert len({base, other_model, other_instructions}) == 3
+    assert assistant_key("gpt-4.1", "instructions") != assistant_key("gpt-4.1", "changed")
+
+
+def test_generate_content_reuses_registered_assistant(registry_file, monkeypatch, tmp_path):
+    client = FakeOpenAI()
+    monkeypatch.setattr(generate_json, "get_openai_client", lambda: client)
+    monkeypatch.setattr(generate_json, "script_dir", str(tmp_path))
+
+    for _ in range(3):
+        generate_json.generate_content("summary", "prompt", {}, "source text")
+
+    assert len(client.created_assistants) == 1
+    assert len(client.runs) == 3
+    assert {run.assistant_id for run in client.runs} == set(client.created_assistants)
+
+
+def test_recreates_assistant_deleted_on_the_server(registry_file):
+    client = FakeOpenAI()
+    stale_id = generate_json.get_assistant_id(client)
+    client.beta.assistants.delete(stale_id)
+
+    generate_json.run_registered_assistant(client, "content")
+    new_id = generate_json.get_assistant_id(client)
+
+    assert new_id != stale_id
+    assert client.created_assistants == [stale_id, new_id]
+    assert client.runs[-1].assistant_id == new_id
+
+
+def test_retry_after_deletion_does_not_resend_the_message(registry_file):
+    client = FakeOpenAI()
+    stale_id = generate_json.get_assistant_id(client)
+    client.beta.assistants.delete(stale_id)
+
+    generate_json.run_registered_assistant(client, "content")
+
+    (thread_id,) = client.threads
+    assert [message.role for message in client.threads[thread_id]] == ["user", "assistant"]
+    assert [run.thread_id for run in client.runs] == [thread_id]
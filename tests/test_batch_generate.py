@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from fake_openai import FakeAsyncOpenAI, FakeRateLimitError, structured_reply
+
+import batch_generate
+import generate_json
+
+API_DIR = os.path.dirname(os.path.abspath(generate_json.__file__))
+
+
+@pytest.fixture
+def workspace(workspace, client, monkeypatch):
+    """A manifest with three jobs over copies of input.pdf, and the fake client."""
+    tmp_path = workspace
+    for name in ("week1.pdf", "week2.pdf"):
+        shutil.copy(os.path.join(API_DIR, "input.pdf"), tmp_path / name)
+    (tmp_path / "manifest.jsonl").write_text("\n".join(json.dumps(job) for job in [
+        {"id": "week1-test", "file": "week1.pdf", "type": "test", "params": {"num_american": 5}},
+        {"id": "week1-summary", "file": "week1.pdf", "type": "summary"},
+        {"file": "week2.pdf", "type": "summary"},
+    ]) + "\n")
+
+    delays = []
+
+    async def no_sleep(delay):
+        delays.append(delay)
+    monkeypatch.setattr(batch_generate.asyncio, "sleep", no_sleep)
+    client.sleep_delays = delays
+    return tmp_path, client
+
+
+def run(tmp_path, client, **kwargs):
+    jobs = batch_generate.load_manifest(str(tmp_path / "manifest.jsonl"))
+    return batch_generate.run_batch(
+        jobs, str(tmp_path / "out"), client=FakeAsyncOpenAI(client, **kwargs),
+        extract_workers=1, use_cache=False,
+    )
+
+
+def test_writes_one_result_per_job(workspace):
+    tmp_path, client = workspace
+
+    counts = run(tmp_path, client)
+
+    assert counts == {"done": 3, "failed": 0, "skipped": 0}
+    results = sorted(p.name for p in (tmp_path / "out").glob("*.json"))
+    assert len(results) == 3 and "week1-test.json" in results
+    assert "exam" in json.loads((tmp_path / "out" / "week1-test.json").read_text())
+    assert len(client.created_assistants) == 1
+    test_run = next(r for r in client.runs if "5 multiple choice" in client.threads[r.thread_id][0].content)
+    assert test_run.kwargs["temperature"] == generate_json.TEMPERATURE
+
+
+def test_resume_skips_finished_jobs_and_retries_failed_ones(workspace):
+    tmp_path, client = workspace
+    client.reply = lambda content: "not json" if "Generate a test" in content else structured_reply(content)
+
+    first = run(tmp_path, client)
+    assert first == {"done": 2, "failed": 1, "skipped": 0}
+    progress = batch_generate.read_progress(str(tmp_path / "out"))
+    assert progress["week1-test"]["status"] == "failed"
+
+    client.reply = structured_reply
+    runs_before = len(client.runs)
+    second = run(tmp_path, client)
+
+    assert second == {"done": 1, "failed": 0, "skipped": 2}
+    assert len(client.runs) == runs_before + 1
+    assert batch_generate.read_progress(str(tmp_path / "out"))["week1-test"]["status"] == "done"
+
+
+def test_rate_limits_are_retried_with_backoff(workspace):
+    tmp_path, client = workspace
+
+    counts = run(tmp_path, client, run_errors=[FakeRateLimitError("slow down")] * 3)
+
+    assert counts["done"] == 3
+    assert len(client.sleep_delays) >= 3
+    assert max(client.sleep_delays) <= batch_generate.RETRY_MAX_DELAY
+
+
+def test_manifest_rejects_duplicate_ids(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(
+        '{"id": "a", "file": "x.pdf", "type": "test"}\n{"id": "a", "file": "y.pdf", "type": "summary"}\n'
+    )
+
+    with pytest.raises(ValueError, match="duplicate"):
+        batch_generate.load_manifest(str(manifest))
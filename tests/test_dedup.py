@@ -0,0 +1,84 @@
+import random
+
+import fitz
+
+from dedup import dedup_pages
+
+import generate_json
+
+rng = random.Random(5)
+VOCABULARY = [f"מונח{n}" for n in range(2000)]
+
+
+def paragraph(words=20):
+    return " ".join(rng.choices(VOCABULARY, k=words))
+
+
+def test_slide_build_up_steps_collapse_into_the_last_one():
+    bullets = [paragraph() for _ in range(4)]
+    other = [paragraph() for _ in range(3)]
+    pages = [["כותרת השקף"] + bullets[:step] for step in range(1, 5)] + [other]
+
+    result = dedup_pages(pages)
+
+    assert result.pages == [["כותרת השקף"] + bullets, other]
+    assert result.pages_dropped == 3
+    joined = lambda pages: "\n".join("\n".join(page) for page in pages)
+    assert result.chars_saved == len(joined(pages)) - len(joined(result.pages))
+
+
+def test_repeated_paragraphs_keep_their_first_copy():
+    repeated = paragraph()
+    pages = [[paragraph(), repeated], [paragraph(), repeated, paragraph()]]
+
+    result = dedup_pages(pages)
+
+    assert result.pages == [pages[0], [pages[1][0], pages[1][2]]]
+    assert result.blocks_dropped == 1
+
+
+def test_near_identical_paragraphs_keep_the_longer_version():
+    words = paragraph(40).split()
+    shorter = " ".join(words[:-1])
+    pages = [[shorter, paragraph()], [paragraph(), " ".join(words)]]
+
+    result = dedup_pages(pages)
+
+    assert shorter not in result.pages[0]
+    assert " ".join(words) in result.pages[1]
+
+
+def test_short_labels_and_distinct_text_are_kept():
+    pages = [["דוגמה", paragraph()], ["דוגמה", paragraph()], ["12 + 3 = 15"]]
+
+    result = dedup_pages(pages)
+
+    assert result.pages == pages
+    assert result.chars_saved == 0
+
+
+def test_pages_of_only_short_lines_are_handled():
+    pages = [["Vector spaces", "Bases and dimension"], ["Linear maps", "Kernel and image"]]
+
+    result = dedup_pages(pages)
+
+    assert result.pages == pages
+
+
+def test_extraction_drops_duplicate_slides(tmp_path):
+    pdf_path = tmp_path / "slides.pdf"
+    doc = fitz.open()
+    for lines in (["Eigenvalues and eigenvectors of a square matrix."],
+                  ["Eigenvalues and eigenvectors of a square matrix.",
+                   "Every eigenvalue is a root of the characteristic polynomial."]):
+        page = doc.new_page()
+        for index, line in enumerate(lines):
+            page.insert_text((72, 100 + 40 * index), line)
+    doc.save(pdf_path)
+    doc.close()
+
+    text = generate_json.compress_pdf_to_text(str(pdf_path), skip_header_footer=False)
+    kept = generate_json.compress_pdf_to_text(str(pdf_path), skip_header_footer=False, dedup=False)
+
+    assert text.count("Eigenvalues and eigenvectors") == 1
+    assert kept.count("Eigenvalues and eigenvectors") == 2
@@ -0,0 +1,69 @@
+import os
+import time
+
+from disk_cache import DiskCache
+
+import generate_json
+
+from test_pdf_extraction import build_pdf
+
+
+def test_eviction_removes_the_least_recently_read_entry(tmp_path):
+    cache = DiskCache(str(tmp_path), 10 ** 6)
+    for age, key in enumerate(["c", "b", "a"], start=1):
+        cache.set(key, "x" * 100)
+        # Space the mtimes well beyond the filesystem's timestamp resolution
+        os.utime(tmp_path / f"{key}.json", (time.time() - 100 * age,) * 2)
+    entry_bytes = (tmp_path / "a.json").stat().st_size
+
+    assert cache.get("a") == "x" * 100
+    # Room for three entries; their timestamps make sizes differ by a few bytes
+    cache.max_bytes = 3 * entry_bytes + entry_bytes // 2
+    cache.set("d", "x" * 100)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.json", "c.json", "d.json"]
+    assert cache.get("b") is None
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), 10 ** 6, ttl_seconds=60)
+    cache.set("key", {"a": 1})
+    assert cache.get("key") == {"a": 1}
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("key") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def generate(workspace, *flags):
+    path = workspace / "notes.pdf"
+    if not path.exists():
+        build_pdf(str(path), num_pages=3)
+    assert generate_json.main(["-g", "summary", "-f", "pdf", "-i", str(path), *flags]) == 0
+
+
+def test_no_cache_neither_reads_nor_writes(workspace, client):
+    cache_dir = workspace / "cache"
+
+    generate(workspace, "--no-cache")
+    assert not (cache_dir / "extraction").exists()
+    assert not (cache_dir / "generation").exists()
+
+    generate(workspace)
+    entries = {path: path.stat().st_mtime_ns for path in cache_dir.rglob("*.json")}
+    runs = len(client.runs)
+    generate(workspace, "--no-cache")
+
+    assert len(client.runs) == runs + 1
+    assert {path: path.stat().st_mtime_ns for path in cache_dir.rglob("*.json")} == entries
+
+
+def test_clear_cache_empties_both_caches(workspace, client):
+    generate(workspace)
+    assert list((workspace / "cache" / "generation").iterdir())
+
+    generate(workspace, "--clear-cache", "--no-cache")
+
+    assert not (workspace / "cache" / "extraction").exists()
+    assert not (workspace / "cache" / "generation").exists()
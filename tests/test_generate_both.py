@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+import generate_json
+
+INPUT_PDF = os.path.join(os.path.dirname(os.path.abspath(generate_json.__file__)), "input.pdf")
+
+
+def run(*extra_args):
+    return generate_json.main(["-g", "both", "-f", "pdf", "-i", INPUT_PDF, "--num-american", "1", "--num-open", "1", *extra_args])
+
+
+def test_both_documents_share_one_thread_holding_the_source_once(workspace, client):
+    assert run("--no-cache", "--job-id", "job-a") == 0
+
+    job_dir = workspace / "output" / "jobs" / "job-a"
+    assert "exam" in json.loads((job_dir / "response.test.json").read_text(encoding="utf-8"))
+    assert json.loads((job_dir / "response.summary.json").read_text(encoding="utf-8")) == {"subject": "summary"}
+
+    assert len(client.threads) == 1
+    assert {run.thread_id for run in client.runs} == set(client.threads)
+    source = (job_dir / "input_debug.txt").read_text(encoding="utf-8")
+    messages = next(iter(client.threads.values()))
+    user_messages = [message.content for message in messages if message.role == "user"]
+    assert len(user_messages) == 3
+    assert sum(source in content for content in user_messages) == 1
+
+
+def test_html_is_rendered_next_to_the_responses(workspace, client):
+    assert run("--no-cache", "--job-id", "job-a", "--render-html") == 0
+
+    job_dir = workspace / "output" / "jobs" / "job-a"
+    assert (job_dir / "exam.html").exists()
+    assert (job_dir / "summary.html").exists()
+
+
+def test_cached_documents_skip_the_model(client):
+    generate_json.main(["-g", "summary", "-f", "pdf", "-i", INPUT_PDF])
+    runs_before = len(client.runs)
+
+    assert run("--no-question-bank") == 0
+
+    # Only the test needed the model; the summary came from the cache
+    assert len(client.runs) == runs_before + 1
+    last_prompt = client.threads[client.runs[-1].thread_id][-2].content
+    assert "Generate a test" in last_prompt
+
+
+def test_map_reduce_is_rejected_with_both(client):
+    with pytest.raises(SystemExit) as e:
+        run("--map-reduce")
+    assert e.value.code == 2
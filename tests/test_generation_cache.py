@@ -0,0 +1,24 @@
+from disk_cache import DiskCache
+
+import generate_json
+
+
+def test_repeat_request_is_served_from_cache(client, tmp_path):
+    cache = DiskCache(str(tmp_path / "generation"), 10 ** 6, ttl_seconds=60)
+
+    for _ in range(2):
+        generate_json.generate_content("summary", "prompt", {}, "source", cache=cache)
+
+    assert len(client.runs) == 1
+    assert (tmp_path / "output" / "response.json").read_text(encoding="utf-8") == '{"subject": "summary"}'
+
+
+def test_changed_prompt_or_source_misses(client, tmp_path):
+    cache = DiskCache(str(tmp_path / "generation"), 10 ** 6)
+
+    generate_json.generate_content("summary", "8 questions", {}, "source", cache=cache)
+    generate_json.generate_content("summary", "12 questions", {}, "source", cache=cache)
+    generate_json.generate_content("summary", "8 questions", {}, "other source", cache=cache)
+
+    assert len(client.runs) == 3
+
@@ -0,0 +1,155 @@
+import fitz
+import pytest
+
+import generate_json
+
+# Labelled pages: every line is a header, title, body or footer line; titles
+# sit in the top margin like headers but must be kept like body text. Page
+# geometry follows a typical A4 export (or a 16:9 slide export for decks):
+# headers and titles in the top margin, footers at the bottom.
+CHAPTERS = ["Vector spaces", "Linear maps", "Eigenvalues"]
+TOPICS = ["Bases", "Kernels", "Inner products", "Determinants", "Duality", "Projections"]
+
+
+def sentence(case, page, line):
+    return f"{case} body text for page {page} line {line} with its own wording."
+
+
+def book():
+    """Book title on even pages and the chapter title on odd ones on top, 'Page n of N' at the bottom."""
+    return [
+        {
+            "header": ["Linear Algebra - Lecture Notes" if page % 2 == 0
+                       else f"Chapter {1 + page // 8}: {CHAPTERS[page // 8]}"],
+            "body": [sentence("book", page, line) for line in range(5)],
+            "footer": [f"Page {page + 1} of 24"],
+        }
+        for page in range(24)
+    ]
+
+
+def slides():
+    """Two-block footer; slide titles in the top margin repeat over two build-up steps."""
+    return [
+        {
+            "header": [],
+            "body": [f"Topic: {TOPICS[page // 2]}"] + [sentence("slides", page, line) for line in range(3)],
+            "footer": ["Faculty of Computer Science", "Semester B"],
+        }
+        for page in range(12)
+    ]
+
+
+def short_document():
+    """Two pages whose first and last blocks are not repeated at all."""
+    return [
+        {"header": [], "body": ["Final exam", sentence("short", 0, 0), sentence("short", 0, 1)], "footer": []},
+        {"header": [], "body": [sentence("short", 1, 0), "Good luck"], "footer": []},
+    ]
+
+
+def numbered_pages():
+    """Bare page numbers; a numbered label repeats mid-page."""
+    return [
+        {
+            "header": [],
+            "body": [sentence("numbered", page, 0), f"Example {page + 1}", sentence("numbered", page, 1)],
+            "footer": [f"- {page + 1} -"],
+        }
+        for page in range(30)
+    ]
+
+
+def deck(sections=5):
+    """
+    A 16:9 deck exported to PDF: sections of four build-up slides, each
+    section's numbered title on top of all its steps, a slide number at the bottom.
+    """
+    return [
+        {
+            "header": [],
+            "title": [f"Section title number {section + 1}: key ideas"],
+            "body": [sentence("deck", section, line) for line in range(step + 1)],
+            "footer": [f"{4 * section + step + 1} / {4 * sections}"],
+        }
+        for section in range(sections)
+        for step in range(4)
+    ]
+
+
+CASES = {"book": book, "slides": slides, "short": short_document, "numbered": numbered_pages, "deck": deck}
+# Page size (width, height) of a case's PDF; A4 portrait by default
+PAGE_SIZES = {"deck": (960, 540)}
+
+
+def build_pdf(path, pages, width=595, height=842):
+    doc = fitz.open()
+    for labelled in pages:
+        page = doc.new_page(width=width, height=height)
+        for index, line in enumerate(labelled["header"] + labelled.get("title", [])):
+            page.insert_text((72, 30 + 24 * index), line)
+        for index, line in enumerate(labelled["body"]):
+            page.insert_text((72, 120 + 48 * index), line)
+        for index, line in enumerate(reversed(labelled["footer"])):
+            page.insert_text((72, height - 22 - 24 * index), line)
+    doc.save(path)
+    doc.close()
+
+
+def score(tmp_path, name):
+    """Returns (true positives, false positives, false negatives) of header/footer removal."""
+    pages = CASES[name]()
+    pdf_path = tmp_path / f"{name}.pdf"
+    build_pdf(str(pdf_path), pages, *PAGE_SIZES.get(name, ()))
+    extracted = list(generate_json.iter_pdf_text(str(pdf_path), merge_lines=False))
+    assert len(extracted) == len(pages)
+
+    true_positives = false_positives = false_negatives = 0
+    for labelled, text in zip(pages, extracted):
+        kept = set(text.split("\n"))
+        for line in labelled["header"] + labelled["footer"]:
+            if line in kept:
+                false_negatives += 1
+            else:
+                true_positives += 1
+        false_positives += sum(line not in kept for line in labelled.get("title", []) + labelled["body"])
+    return true_positives, false_positives, false_negatives
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_each_case_keeps_all_body_text(tmp_path, name):
+    _, false_positives, _ = score(tmp_path, name)
+    assert false_positives == 0
+
+
+def test_precision_and_recall_over_the_test_set(tmp_path):
+    totals = [sum(counts) for counts in zip(*(score(tmp_path, name) for name in CASES))]
+    true_positives, false_positives, false_negatives = totals
+
+    precision = true_positives / (true_positives + false_positives)
+    recall = true_positives / (true_positives + false_negatives)
+    assert precision == 1.0
+    assert recall >= 0.95
+
+
+def test_sampled_detection_matches_the_full_walk(tmp_path):
+    pdf_path = tmp_path / "book.pdf"
+    build_pdf(str(pdf_path), book())
+
+    full = list(generate_json.iter_pdf_text(str(pdf_path), merge_lines=False))
+    sampled = list(generate_json.iter_pdf_text(str(pdf_path), merge_lines=False, sample_header_footer=True))
+
+    assert sampled == full
+
+
+@pytest.mark.parametrize("sample_header_footer", [False, True])
+def test_deck_titles_survive_their_build_up_steps(tmp_path, sample_header_footer):
+    pages = deck(sections=15)  # more slides than HEADER_FOOTER_SAMPLE_PAGES
+    pdf_path = tmp_path / "deck.pdf"
+    build_pdf(str(pdf_path), pages, *PAGE_SIZES["deck"])
+
+    extracted = list(generate_json.iter_pdf_text(str(pdf_path), merge_lines=False,
+                                                 sample_header_footer=sample_header_footer))
+
+    assert [text.split("\n")[0] for text in extracted] == [labelled["title"][0] for labelled in pages]
+    assert not any(labelled["footer"][0] in text for labelled, text in zip(pages, extracted))
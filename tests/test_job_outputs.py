@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+import generate_json
+
+INPUT_PDF = os.path.join(os.path.dirname(os.path.abspath(generate_json.__file__)), "input.pdf")
+
+
+def run(*extra_args):
+    return generate_json.main(["-g", "summary", "-f", "pdf", "-i", INPUT_PDF, "--no-cache", *extra_args])
+
+
+def test_jobs_write_to_their_own_directories(workspace, client):
+    run("--job-id", "job-a")
+    run("--job-id", "job-b")
+
+    for job_id in ("job-a", "job-b"):
+        job_dir = workspace / "output" / "jobs" / job_id
+        assert json.loads((job_dir / "response.json").read_text()) == {"subject": "summary"}
+        assert (job_dir / "input_debug.txt").exists()
+        assert (job_dir / "debug_response.txt").exists()
+    assert not (workspace / "output" / "response.json").exists()
+    assert not (workspace / "input_debug.txt").exists()
+
+
+def test_output_file_without_job_id_skips_shared_debug_files(workspace, client):
+    output_file = workspace / "custom" / "result.json"
+
+    run("--output-file", str(output_file))
+
+    assert json.loads(output_file.read_text()) == {"subject": "summary"}
+    assert not (workspace / "input_debug.txt").exists()
+    assert not (workspace / "debug_response.txt").exists()
+
+
+def test_stdout_json_prints_only_the_response(workspace, client, capsys):
+    run("--stdout-json")
+
+    captured = capsys.readouterr()
+    assert json.loads(captured.out) == {"subject": "summary"}
+    assert "Generate type: summary" in captured.err
+    assert not (workspace / "output").exists()
+
+
+@pytest.mark.parametrize("job_id", ["../escape", "a/b", "", ".hidden"])
+def test_rejects_unsafe_job_ids(client, job_id):
+    with pytest.raises(SystemExit):
+        run("--job-id", job_id)
@@ -0,0 +1,66 @@
+import json
+import os
+import time
+
+import pytest
+
+from json_repair import JSONRepairError, parse_json_reply
+
+import generate_json
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "json_repair_corpus")
+CASES = sorted(name[:-len(".txt")] for name in os.listdir(CORPUS_DIR) if name.endswith(".txt"))
+TEST_STRUCTURE = {"exam": {
+    "multiple_choice": [{"question": "q", "options": ["a", "b", "c", "d"], "answer": "a"}],
+    "open_questions": [{"question": "q", "answer": "a"}],
+}}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_corpus(case):
+    with open(os.path.join(CORPUS_DIR, f"{case}.txt"), "r", encoding="utf-8") as f:
+        reply = f.read()
+    with open(os.path.join(CORPUS_DIR, f"{case}.expected.json"), "r", encoding="utf-8") as f:
+        expected = json.load(f)
+
+    result = parse_json_reply(reply)
+
+    assert result.value == expected["value"]
+    assert result.dropped == expected["dropped"]
+    assert result.repairs
+
+
+def test_valid_json_needs_no_repairs():
+    assert parse_json_reply('{"a": [1, 2.5, "x"]}') == ({"a": [1, 2.5, "x"]}, [], [])
+
+
+@pytest.mark.parametrize("reply", ["", "Sorry, I can't help with that.", '{"a": ', "[1, 2"[:1]])
+def test_unrecoverable_replies_raise(reply):
+    with pytest.raises(JSONRepairError):
+        parse_json_reply(reply)
+
+
+def test_repairs_a_large_truncated_reply_quickly():
+    question = {"question": "שאלה " * 20, "options": ["אפשרות"] * 4, "answer": "אפשרות"}
+    reply = json.dumps({"exam": {"multiple_choice": [question] * 400}}, ensure_ascii=False)
+    reply = "```json\n" + reply[:-1000]
+
+    started = time.perf_counter()
+    result = parse_json_reply(reply)
+    elapsed = time.perf_counter() - started
+
+    assert len(result.dropped) == 1
+    assert all(q == question for q in result.value["exam"]["multiple_choice"])
+    assert elapsed < 0.5
+
+
+@pytest.mark.parametrize("case", ["truncated_mid_question", "truncated_after_complete_question"])
+def test_truncated_exam_keeps_its_complete_questions(client, case):
+    with open(os.path.join(CORPUS_DIR, f"{case}.txt"), "r", encoding="utf-8") as f:
+        client.reply = lambda content, reply=f.read(): reply
+    with open(os.path.join(CORPUS_DIR, f"{case}.expected.json"), "r", encoding="utf-8") as f:
+        expected = json.load(f)["value"]
+
+    exam = generate_json.request_generation("test", "Generate a test", TEST_STRUCTURE, "source")
+
+    assert exam == {"exam": {"multiple_choice": expected["exam"]["multiple_choice"], "open_questions": []}}
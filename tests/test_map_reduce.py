@@ -0,0 +1,110 @@
+import json
+import re
+import threading
+import time
+
+import pytest
+
+from chunking import count_tokens, split_into_chunks
+from disk_cache import DiskCache
+
+import generate_json
+
+STRUCTURE = {"מבוא": "...", "סיכום": "..."}
+
+
+def test_token_estimate_per_script():
+    assert count_tokens("") == 0
+    assert count_tokens("tokenizer") == 3  # 9 Latin letters, 4 per token
+    assert count_tokens("שלום עולם") == 4  # 4 Hebrew letters each, 2 per token
+    assert count_tokens("1234567") == 3  # digits grouped by three
+    assert count_tokens("a, b.") == 4
+
+
+def test_chunks_follow_paragraphs_in_order():
+    paragraphs = [f"Paragraph {n} is about topic {n}." for n in range(12)]
+
+    chunks = split_into_chunks("\n".join(paragraphs) + "\n\n", 40)
+
+    assert len(chunks) > 1
+    assert "\n".join(chunks).split("\n") == paragraphs
+    assert all(count_tokens(chunk) <= 40 for chunk in chunks)
+
+
+def test_long_paragraphs_split_on_sentences_then_words():
+    sentences = [f"Sentence {n} has a few words." for n in range(6)]
+    run_on = " ".join(f"word{n}" for n in range(60))
+
+    chunks = split_into_chunks(" ".join(sentences) + "\n" + run_on, 20)
+
+    assert chunks[0].startswith(sentences[0])
+    assert all(count_tokens(chunk) <= 20 for chunk in chunks)
+    joined = " ".join(chunk.replace("\n", " ") for chunk in chunks)
+    assert joined.split() == (" ".join(sentences) + " " + run_on).split()
+
+
+def test_merge_combines_repeated_titles_in_first_seen_order():
+    merged = generate_json.merge_summaries([
+        {"מבוא": "a", "פרק 1": "b"},
+        {"פרק 2": ["c"], "מבוא": "d"},
+        {"פרק 2": "e", "פרק 1": {"הגדרה": "f"}},
+    ])
+
+    assert list(merged) == ["מבוא", "פרק 1", "פרק 2"]
+    assert merged["מבוא"] == "a\n\nd"
+    assert merged["פרק 1"] == ["b", {"הגדרה": "f"}]
+    assert merged["פרק 2"] == ["c", "e"]
+
+
+@pytest.fixture
+def client(client):
+    """Answers each chunk with its own section and a shared one; later parts answer sooner."""
+    in_flight = []
+    client.max_in_flight = 0
+    lock = threading.Lock()
+
+    def reply(content):
+        part, parts = map(int, re.search(r"part (\d+) of (\d+)", content).groups())
+        with lock:
+            in_flight.append(part)
+            client.max_in_flight = max(client.max_in_flight, len(in_flight))
+        time.sleep(0.02 * (parts - part))
+        with lock:
+            in_flight.remove(part)
+        return json.dumps({f"חלק {part}": f"תקציר {part}", "סיכום": f"הערה {part}"})
+
+    client.reply = reply
+    return client
+
+
+def map_reduce(workspace, text, concurrency=3, cache=None):
+    output_file = workspace / "response.json"
+    assert generate_json.generate_summary_map_reduce(
+        "Summarize", STRUCTURE, text, max_chunk_tokens=30, concurrency=concurrency, cache=cache,
+        output_file=str(output_file),
+    ) == 0
+    return json.loads(output_file.read_text(encoding="utf-8"))
+
+
+def test_chunks_are_summarized_concurrently_and_merged_in_order(workspace, client):
+    text = "\n".join(f"Paragraph {n} explains one idea about trees." for n in range(15))
+    num_chunks = len(split_into_chunks(text, 30))
+
+    summary = map_reduce(workspace, text)
+
+    assert len(client.runs) == num_chunks >= 4
+    assert 1 < client.max_in_flight <= 3
+    assert list(summary) == ["חלק 1", "סיכום"] + [f"חלק {part}" for part in range(2, num_chunks + 1)]
+    assert summary["סיכום"] == "\n\n".join(f"הערה {part}" for part in range(1, num_chunks + 1))
+
+
+def test_merged_summary_is_cached(workspace, client):
+    text = "\n".join(f"Paragraph {n} explains one idea about graphs." for n in range(8))
+    cache = DiskCache(str(workspace / "generation"), 10 ** 6)
+
+    first = map_reduce(workspace, text, cache=cache)
+    runs = len(client.runs)
+    second = map_reduce(workspace, text, cache=cache)
+
+    assert second == first
+    assert len(client.runs) == runs
@@ -0,0 +1,68 @@
+import fitz
+import pytest
+
+from salience import split_budget
+
+import generate_json
+
+
+def build_pdf(path, lines):
+    doc = fitz.open()
+    page = doc.new_page()
+    for index, line in enumerate(lines):
+        page.insert_text((72, 100 + 30 * index), line)
+    doc.save(path)
+    doc.close()
+
+
+def test_half_the_budget_is_even_and_half_follows_length():
+    assert split_budget(["a" * 3000, "b" * 1000], 2000) == [1250, 750]
+
+
+def test_short_documents_give_their_leftover_to_the_others():
+    assert split_budget(["a" * 100, "b" * 5000, "c" * 5000], 2100) == [100, 1000, 1000]
+
+
+def test_salience_split_favours_the_common_subject():
+    on_topic = "\n".join(f"Eigenvalues of the matrix {n} and its eigenvectors." for n in range(20))
+    also_on_topic = "\n".join(f"The matrix eigenvalues and eigenvectors, case {n}." for n in range(20))
+    off_topic = "\n".join(f"Office hours move to room {n} on Tuesday afternoon." for n in range(20))
+
+    budgets = split_budget([on_topic, also_on_topic, off_topic], 1200, by="salience")
+
+    assert budgets[2] < budgets[0]
+    assert budgets[2] < budgets[1]
+
+
+def test_sections_are_labeled_and_fit_the_budget(tmp_path):
+    first, second = str(tmp_path / "week1.pdf"), str(tmp_path / "week2.pdf")
+    build_pdf(first, [f"Week one covers vector spaces, part {n}." for n in range(20)])
+    build_pdf(second, ["Week two covers linear maps."])
+
+    text = generate_json.extract_sources_text([first, second], None, max_chars=400)
+
+    assert len(text) <= 400
+    sections = text.split("\n\n")
+    assert sections[0].startswith("--- Source: week1.pdf ---\nWeek one covers vector spaces")
+    assert sections[1] == "--- Source: week2.pdf ---\nWeek two covers linear maps."
+
+
+def test_several_inputs_make_one_model_call(workspace, client):
+    inputs = []
+    for name in ("week1.pdf", "week2.pdf", "week3.pdf"):
+        inputs.append(str(workspace / name))
+        build_pdf(inputs[-1], [f"Lecture notes of {name}."])
+
+    assert generate_json.main(["-g", "summary", "-f", "pdf", "-i", *inputs, "--no-cache", "--job-id", "job-a"]) == 0
+
+    assert len(client.runs) == 1
+    source = (workspace / "output" / "jobs" / "job-a" / "input_debug.txt").read_text(encoding="utf-8")
+    assert [line for line in source.split("\n") if line.startswith("--- Source:")] == [
+        "--- Source: week1.pdf ---", "--- Source: week2.pdf ---", "--- Source: week3.pdf ---",
+    ]
+
+
+def test_stdin_cannot_be_combined_with_files(client):
+    with pytest.raises(SystemExit) as error:
+        generate_json.main(["-g", "summary", "-f", "pdf", "-i", "-", "week1.pdf", "--no-cache"])
+    assert error.value.code == 2
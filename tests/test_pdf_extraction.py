@@ -0,0 +1,148 @@
+import io
+import re
+import sys
+
+import fitz
+import pytest
+
+from benchmark_extraction import build_synthetic_pdf, two_pass_reference
+
+import generate_json
+
+
+def build_pdf(path, num_pages=30):
+    """Five body lines per page under a running title, with 'Page n' at the bottom."""
+    doc = fitz.open()
+    for number in range(num_pages):
+        page = doc.new_page()  # A4 portrait, 842pt high
+        page.insert_text((72, 30), "Data Structures - Lecture Notes")
+        for line in range(5):
+            page.insert_text((72, 160 + 48 * line),
+                             f"Page {number + 1} line {line} explains one more idea about trees.")
+        page.insert_text((72, 820), f"Page {number + 1}")
+    doc.save(path)
+    doc.close()
+
+
+def test_parallel_walk_matches_the_single_process_walk(tmp_path):
+    path = tmp_path / "notes.pdf"
+    build_pdf(str(path))
+
+    single = list(generate_json.iter_pdf_text(str(path)))
+    parallel = list(generate_json.iter_pdf_text(str(path), workers=3, parallel_min_pages=1))
+
+    assert len(single) == 30
+    assert parallel == single
+    assert "Lecture Notes" not in "\n".join(single)
+
+
+def test_parallel_compression_matches_the_single_process_text(tmp_path):
+    path = tmp_path / "notes.pdf"
+    build_pdf(str(path))
+
+    single = generate_json.compress_pdf_to_text(str(path), dedup=False)
+    parallel = generate_json.compress_pdf_to_text(str(path), workers=2, parallel_min_pages=1, dedup=False)
+
+    assert parallel == single
+
+
+def test_budget_stops_at_max_chars(tmp_path):
+    path = tmp_path / "notes.pdf"
+    build_pdf(str(path))
+
+    full = generate_json.compress_pdf_to_text(str(path), dedup=False)
+
+    for max_chars in (1, 500, len(full) - 1):
+        assert generate_json.compress_pdf_to_text(str(path), max_chars=max_chars) == full[:max_chars]
+    assert generate_json.compress_pdf_to_text(str(path), max_chars=len(full) + 100) == full
+
+
+def test_budget_leaves_the_remaining_pages_unread(tmp_path, monkeypatch):
+    path = tmp_path / "notes.pdf"
+    build_pdf(str(path), num_pages=200)
+    reads = []
+    sorted_page_blocks = generate_json._sorted_page_blocks
+    monkeypatch.setattr(generate_json, "_sorted_page_blocks",
+                        lambda page: reads.append(page.number) or sorted_page_blocks(page))
+
+    text = generate_json.compress_pdf_to_text(str(path), max_chars=1000)
+
+    assert len(text) == 1000
+    # The header/footer sample plus the few pages that fill the budget
+    assert len(set(reads)) < generate_json.HEADER_FOOTER_SAMPLE_PAGES + 10
+    assert len(reads) == len(set(reads))
+
+
+def test_in_memory_sources_match_the_path(tmp_path):
+    path = tmp_path / "notes.pdf"
+    build_pdf(str(path), num_pages=5)
+    data = path.read_bytes()
+
+    expected = generate_json.compress_pdf_to_text(str(path))
+
+    for source in (path, data, bytearray(data), memoryview(data), io.BytesIO(data)):
+        assert generate_json.compress_pdf_to_text(source) == expected
+    assert generate_json.compress_pdf_to_text(memoryview(data), workers=2, parallel_min_pages=1) == expected
+
+
+def test_missing_file_is_reported_with_its_absolute_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(FileNotFoundError, match=re.escape(str(tmp_path / "missing.pdf"))):
+        generate_json.compress_pdf_to_text("missing.pdf")
+
+
+def test_stdin_input_is_extracted_like_the_file(workspace, client, monkeypatch):
+    path = workspace / "notes.pdf"
+    build_pdf(str(path), num_pages=5)
+
+    assert generate_json.main(["-g", "summary", "-f", "pdf", "-i", str(path), "--no-cache", "--job-id", "file"]) == 0
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(path.read_bytes())))
+    assert generate_json.main(["-g", "summary", "-f", "pdf", "-i", "-", "--no-cache", "--job-id", "stdin"]) == 0
+
+    jobs_dir = workspace / "output" / "jobs"
+    from_stdin = (jobs_dir / "stdin" / "input_debug.txt").read_text(encoding="utf-8")
+    assert from_stdin == (jobs_dir / "file" / "input_debug.txt").read_text(encoding="utf-8")
+    assert "Page 3 line 0" in from_stdin
+
+
+def test_single_walk_matches_the_two_pass_reference_and_reads_each_page_once(tmp_path, monkeypatch):
+    path = tmp_path / "course.pdf"
+    build_synthetic_pdf(str(path), 12)
+    reads = []
+    sorted_page_blocks = generate_json._sorted_page_blocks
+    monkeypatch.setattr(generate_json, "_sorted_page_blocks",
+                        lambda page: reads.append(page.number) or sorted_page_blocks(page))
+
+    text = generate_json.compress_pdf_to_text(str(path), dedup=False)
+
+    assert sorted(reads) == list(range(12))
+    assert text == two_pass_reference(str(path))
+    assert "Course pack" not in text
+
+
+def test_sampled_pages_are_read_as_the_generator_is_consumed(tmp_path, monkeypatch):
+    path = tmp_path / "notes.pdf"
+    build_pdf(str(path), num_pages=200)
+    reads = []
+    sorted_page_blocks = generate_json._sorted_page_blocks
+    monkeypatch.setattr(generate_json, "_sorted_page_blocks",
+                        lambda page: reads.append(page.number) or sorted_page_blocks(page))
+
+    pages = generate_json.iter_pdf_text(str(path), sample_header_footer=True)
+    first = next(pages)
+    sampled = len(reads)
+    second = next(pages)
+    pages.close()
+
+    assert first.startswith("Page 1 line 0") and second.startswith("Page 2 line 0")
+    assert sampled <= generate_json.HEADER_FOOTER_SAMPLE_PAGES + 1
+    assert len(reads) <= sampled + 1
+    assert "Lecture Notes" not in first
+
+
+def test_compression_joins_the_yielded_pages(tmp_path):
+    path = tmp_path / "notes.pdf"
+    build_pdf(str(path))
+
+    assert generate_json.compress_pdf_to_text(str(path), dedup=False) == "\n".join(generate_json.iter_pdf_text(str(path)))
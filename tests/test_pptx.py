@@ -0,0 +1,125 @@
+from pptx import Presentation
+from pptx.util import Emu, Pt
+
+from disk_cache import DiskCache
+
+import generate_json
+
+TOPICS = ["Vector spaces", "Linear maps", "Eigenvalues", "Determinants", "Inner products", "Duality"]
+
+
+def build_pptx(path, num_slides=6):
+    """A deck with a title, a body, a table, a group, notes and a running footer on every slide."""
+    prs = Presentation()
+    width, height = prs.slide_width, prs.slide_height
+    blank = prs.slide_layouts[6]
+    for number in range(num_slides):
+        slide = prs.slides.add_slide(blank)
+        topic = TOPICS[number % len(TOPICS)]
+        slide.shapes.add_textbox(Emu(width // 10), Emu(height // 5), Emu(width // 2), Pt(30)).text_frame.text = (
+            f"{topic}."
+        )
+        body = slide.shapes.add_textbox(Emu(width // 10), Emu(height // 3), Emu(width // 2), Pt(80))
+        body.text_frame.text = f"Slide {number + 1} explains {topic.lower()} in detail."
+        body.text_frame.add_paragraph().text = f"A second point about {topic.lower()}."
+
+        table = slide.shapes.add_table(2, 2, Emu(width // 10), Emu(height // 2), Emu(width // 2), Pt(60)).table
+        for row, cells in enumerate([("Term", "Meaning"), (topic, f"definition {number + 1}")]):
+            for column, text in enumerate(cells):
+                table.cell(row, column).text = text
+
+        group = slide.shapes.add_group_shape()
+        group.shapes.add_textbox(Emu(width // 2), Emu(height * 2 // 3), Emu(width // 4), Pt(30)).text_frame.text = (
+            f"Grouped remark {number + 1}."
+        )
+
+        slide.notes_slide.notes_text_frame.text = f"Speaker notes for slide {number + 1}."
+        footer = slide.shapes.add_textbox(Emu(width // 10), Emu(height - Pt(40)), Emu(width // 2), Pt(30))
+        footer.text_frame.text = f"Linear Algebra - slide {number + 1}"
+    prs.save(path)
+
+
+def test_slides_include_tables_groups_and_notes_without_the_footer(tmp_path):
+    path = tmp_path / "deck.pptx"
+    build_pptx(str(path))
+
+    slides = list(generate_json.iter_pptx_text(str(path), merge_lines=False))
+
+    assert len(slides) == 6
+    lines = slides[2].split("\n")
+    assert lines == [
+        "Eigenvalues.",
+        "Slide 3 explains eigenvalues in detail.",
+        "A second point about eigenvalues.",
+        "Term | Meaning",
+        "Eigenvalues | definition 3",
+        "Grouped remark 3.",
+        "Speaker notes for slide 3.",
+    ]
+    assert "Linear Algebra" not in "\n".join(slides)
+
+
+def test_footer_is_kept_without_header_footer_removal(tmp_path):
+    path = tmp_path / "deck.pptx"
+    build_pptx(str(path))
+
+    text = generate_json.compress_pptx_to_text(str(path), skip_header_footer=False, dedup=False)
+
+    assert text.count("Linear Algebra - slide") == 6
+
+
+def test_sampled_and_parallel_walks_match_the_full_walk(tmp_path):
+    path = tmp_path / "deck.pptx"
+    build_pptx(str(path), num_slides=30)
+
+    full = list(generate_json.iter_pptx_text(str(path)))
+    sampled = list(generate_json.iter_pptx_text(str(path), sample_header_footer=True))
+    parallel = list(generate_json.iter_pptx_text(str(path), workers=2, parallel_min_pages=1))
+
+    assert sampled == full
+    assert parallel == full
+
+
+def test_budget_stops_at_max_chars(tmp_path):
+    path = tmp_path / "deck.pptx"
+    build_pptx(str(path), num_slides=30)
+
+    full = generate_json.compress_pptx_to_text(str(path), dedup=False)
+    budgeted = generate_json.compress_pptx_to_text(str(path), max_chars=500)
+
+    assert budgeted == full[:500]
+
+
+def test_source_text_is_cached_by_content(tmp_path, capsys):
+    path = tmp_path / "deck.pptx"
+    build_pptx(str(path))
+    cache = DiskCache(str(tmp_path / "cache"), 1024 * 1024)
+
+    first = generate_json.extract_source_text(str(path), cache, file_type="pptx")
+    capsys.readouterr()
+    with open(path, "rb") as stream:
+        second = generate_json.extract_source_text(stream, cache, file_type="pptx")
+
+    assert second == first
+    assert "Extraction cache hit." in capsys.readouterr().out
+
+
+def test_repeated_slide_titles_are_kept(tmp_path):
+    """Titles in the layout's title placeholder sit in the top edge zone and repeat per section."""
+    prs = Presentation()
+    width, height = prs.slide_width, prs.slide_height
+    sections = ["Binary search trees"] * 4 + ["Hash tables"] * 4
+    for number, title in enumerate(sections):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])  # Title and Content
+        slide.shapes.title.text = title
+        slide.placeholders[1].text_frame.text = f"Point {number + 1} about {title.lower()}."
+        footer = slide.shapes.add_textbox(Emu(width // 10), Emu(height - Pt(40)), Emu(width // 2), Pt(30))
+        footer.text_frame.text = f"Data Structures - slide {number + 1}"
+    path = tmp_path / "deck.pptx"
+    prs.save(str(path))
+    assert slide.shapes.title.top / height < generate_json.HEADER_FOOTER_EDGE_ZONE
+
+    slides = list(generate_json.iter_pptx_text(str(path), merge_lines=False))
+
+    assert [text.split("\n")[0] for text in slides] == sections
+    assert "Data Structures" not in "\n".join(slides)
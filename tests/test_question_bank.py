@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fake_openai import numbered_exam_reply
+from question_bank import QuestionBank, is_near_duplicate, question_signature
+
+import generate_json
+
+INPUT_PDF = os.path.join(os.path.dirname(os.path.abspath(generate_json.__file__)), "input.pdf")
+STRUCTURE = {"exam": {
+    "multiple_choice": [{"question": "q", "options": ["a", "b", "c", "d"], "answer": "a"}],
+    "open_questions": [{"question": "q", "answer": "a"}],
+}}
+
+
+@pytest.fixture
+def client(client):
+    client.reply = numbered_exam_reply()
+    return client
+
+
+def make_exam(bank, tmp_path, num_american=4, num_open=2, source="source", prompt="", prefetch_exams=0,
+              name="response.json"):
+    output_file = tmp_path / name
+    generate_json.generate_exam_from_bank(num_american, num_open, prompt, STRUCTURE, source, bank,
+                                          output_file=str(output_file), prefetch_exams=prefetch_exams)
+    return json.loads(output_file.read_text(encoding="utf-8"))["exam"]
+
+
+def served_questions(*exams):
+    return [q["question"] for exam in exams for q in exam["multiple_choice"] + exam["open_questions"]]
+
+
+def test_near_duplicates_ignore_direction_marks_punctuation_and_case():
+    question = {"question": "\u202bמהו תפקיד המיטוכונדריה בתא?\u202c", "options": ["אנרגיה", "חלבון"]}
+    reworded = {"question": "מהו תפקיד המיטוכונדריה בתא", "options": ["אנרגיה", "חלבון"]}
+    different = {"question": "מהו תפקיד הגרעין בתא?", "options": ["אחסון מידע", "חלבון"]}
+
+    assert is_near_duplicate(question_signature(question), question_signature(reworded))
+    assert not is_near_duplicate(question_signature(question), question_signature(different))
+
+
+def test_first_exam_asks_for_exactly_its_questions(client, tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank"))
+
+    exam = make_exam(bank, tmp_path, num_american=8, num_open=3)
+
+    prompt = client.threads[client.runs[-1].thread_id][0].content
+    assert "with 8 multiple choice questions and 3 open questions" in prompt
+    assert len(served_questions(exam)) == 11
+    assert all("uses" not in q for q in exam["multiple_choice"])
+
+
+def test_prefetched_questions_serve_later_requests(client, tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank"))
+
+    exams = [make_exam(bank, tmp_path, prefetch_exams=2) for _ in range(3)]
+
+    assert len(client.runs) == 1
+    served = served_questions(*exams)
+    assert len(served) == len(set(served)) == 6 * len(exams)
+
+    make_exam(bank, tmp_path)
+    assert len(client.runs) == 2
+
+
+def test_model_is_asked_only_for_the_shortfall(client, tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank"))
+    key = generate_json.question_bank_key("source", "")
+    with bank.locked(key) as questions:
+        bank.add(questions, {
+            "multiple_choice": [{"question": f"banked {n}", "options": ["a", "b"], "answer": "a"} for n in range(4)],
+            "open_questions": [{"question": f"banked open {n}", "answer": "a"} for n in range(2)],
+        })
+
+    exam = make_exam(bank, tmp_path, num_american=7, num_open=2)
+
+    prompt = client.threads[client.runs[-1].thread_id][0].content
+    # 4 + 2 unused are short of 7 + 2 by 3 + 0
+    assert "with 3 multiple choice questions and 0 open questions" in prompt
+    assert len(exam["multiple_choice"]) == 7 and len(exam["open_questions"]) == 2
+
+
+def test_concurrent_requests_share_the_bank_without_losing_questions(client, tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank"))
+    reply = client.reply
+    both_generating = threading.Barrier(2)
+
+    def slow_reply(content):
+        # Both requests find the bank empty and generate before either saves
+        both_generating.wait(timeout=5)
+        return reply(content)
+    client.reply = slow_reply
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        exams = list(executor.map(lambda name: make_exam(bank, tmp_path, name=name), ["a.json", "b.json"]))
+
+    served = served_questions(*exams)
+    assert len(served) == len(set(served)) == 12
+    questions = bank.load(generate_json.question_bank_key("source", ""))
+    assert [len(questions[kind]) for kind in ("multiple_choice", "open_questions")] == [8, 4]
+    assert all(entry["uses"] == 1 for kind in ("multiple_choice", "open_questions") for entry in questions[kind])
+
+
+def test_banks_are_per_document_and_prompt(client, tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank"))
+
+    make_exam(bank, tmp_path, source="document one")
+    make_exam(bank, tmp_path, source="document two")
+    make_exam(bank, tmp_path, source="document one", prompt="Hard difficulty.")
+
+    assert len(client.runs) == 3
+
+
+def test_duplicate_questions_from_the_model_are_not_banked(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank"))
+    questions = bank.load("key")
+    question = {"question": "What is a cell?", "options": ["a", "b", "c", "d"], "answer": "a"}
+
+    added = bank.add(questions, {"multiple_choice": [question, dict(question, question="what is a cell")]})
+
+    assert added == {"multiple_choice": 1, "open_questions": 0}
+
+
+def test_bank_exams_bypass_the_generation_cache(client, workspace):
+    output_file = workspace / "response.json"
+
+    def exam(*flags):
+        assert generate_json.main(["-g", "test", "-f", "pdf", "-i", INPUT_PDF, "-ma", "2", "-mo", "1",
+                                   "--prefetch-exams", "0", "-o", str(output_file), *flags]) == 0
+        return json.loads(output_file.read_text(encoding="utf-8"))["exam"]
+
+    first, second = exam(), exam()
+    assert not set(served_questions(first)) & set(served_questions(second))
+
+    cached = exam("--no-question-bank")
+    runs = len(client.runs)
+    assert exam("--no-question-bank") == cached
+    assert len(client.runs) == runs
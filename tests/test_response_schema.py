@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from fake_openai import structured_reply
+from response_schema import (
+    SchemaValidationError, compile_validator, get_validator, response_format_for, schema_from_example,
+)
+
+import generate_json
+
+API_DIR = os.path.dirname(os.path.abspath(generate_json.__file__))
+
+
+def load_structure(name):
+    with open(os.path.join(API_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+TEST_STRUCTURE = load_structure("test_json_structure.json")
+SUMMARY_STRUCTURE = load_structure("summary_json_structure.json")
+
+
+def test_exam_schema_accepts_valid_exam_and_locates_errors():
+    validate = get_validator("test", TEST_STRUCTURE)
+    exam = json.loads(structured_reply("Generate a test"))
+
+    assert validate(exam) == exam
+
+    del exam["exam"]["multiple_choice"][0]["answer"]
+    with pytest.raises(SchemaValidationError) as error:
+        validate(exam)
+    assert error.value.path == "$.exam.multiple_choice[0]"
+
+
+def test_summary_schema_allows_any_titles_with_text_list_or_object_sections():
+    validate = get_validator("summary", SUMMARY_STRUCTURE)
+
+    validate({"מבוא": "תוכן", "הערות": ["a", "b"], "מושגים": {"תא": "יחידת החיים", "רשימה": [1]}})
+    with pytest.raises(SchemaValidationError):
+        validate({})
+    with pytest.raises(SchemaValidationError) as error:
+        validate({"מבוא": "תוכן", "עמוד": 3})
+    assert error.value.path == "$.עמוד"
+
+
+def test_response_formats():
+    exam_format = response_format_for("test", TEST_STRUCTURE)
+    assert exam_format["type"] == "json_schema"
+    assert exam_format["json_schema"]["strict"] is True
+    assert exam_format["json_schema"]["schema"] == schema_from_example(TEST_STRUCTURE)
+
+    assert response_format_for("summary", SUMMARY_STRUCTURE) == {"type": "json_object"}
+
+
+def test_compiled_validator_checks_types():
+    validate = compile_validator(schema_from_example({"n": 1, "flags": [True]}))
+
+    validate({"n": 2, "flags": [False, True]})
+    for bad in ({"n": "2", "flags": []}, {"n": 2, "flags": [1]}, {"n": 2, "flags": [], "x": 0}):
+        with pytest.raises(SchemaValidationError):
+            validate(bad)
+
+
+def test_generate_content_requests_and_enforces_the_schema(client):
+    generate_json.generate_content("test", "Generate a test", TEST_STRUCTURE, "source")
+    assert client.runs[-1].kwargs["response_format"] == response_format_for("test", TEST_STRUCTURE)
+
+    client.reply = lambda content: json.dumps({"exam": {"multiple_choice": []}})
+    with pytest.raises(SchemaValidationError):
+        generate_json.generate_content("test", "Generate a test", TEST_STRUCTURE, "other source")
+
+
+def test_summary_with_list_sections_is_saved(client, tmp_path):
+    client.reply = lambda content: json.dumps({"מבוא": "תוכן", "הערות": ["a", "b"]})
+
+    assert generate_json.generate_content("summary", "Summarize", SUMMARY_STRUCTURE, "source") == 0
+
+    saved = json.loads((tmp_path / "output" / "response.json").read_text(encoding="utf-8"))
+    assert saved == {"מבוא": "תוכן", "הערות": ["a", "b"]}
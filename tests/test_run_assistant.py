@@ -0,0 +1,76 @@
+import pytest
+
+from fake_openai import FakeOpenAI
+
+import generate_json
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr(generate_json.time, "sleep", delays.append)
+    return delays
+
+
+def make_client(**kwargs):
+    client = FakeOpenAI(reply=lambda content: '{"exam": {"multiple_choice": []}}', **kwargs)
+    assistant = client.beta.assistants.create(name="n", instructions="i", model="m")
+    return client, assistant.id
+
+
+def test_streams_reply_without_polling(no_sleep):
+    client, assistant_id = make_client()
+
+    result = generate_json.run_assistant(client, assistant_id, "content")
+
+    assert result.text == '{"exam": {"multiple_choice": []}}'
+    assert result.streamed
+    assert 0 <= result.time_to_first_token <= result.total_latency
+    assert client.retrieve_calls == 0
+    assert no_sleep == []
+
+
+def test_falls_back_to_polling_with_backoff(no_sleep):
+    client, assistant_id = make_client(streaming=False, statuses=["queued"] * 4 + ["completed"])
+
+    result = generate_json.run_assistant(client, assistant_id, "content")
+
+    assert result.text == '{"exam": {"multiple_choice": []}}'
+    assert not result.streamed
+    assert result.time_to_first_token == result.total_latency
+    assert client.retrieve_calls == 5
+    assert no_sleep == sorted(no_sleep) and no_sleep[0] < no_sleep[-1]
+    assert max(no_sleep) <= generate_json.POLL_MAX_DELAY
+
+
+def test_polling_gives_up_after_timeout_and_cancels_run(no_sleep):
+    client, assistant_id = make_client(streaming=False, statuses=["in_progress"])
+
+    with pytest.raises(TimeoutError):
+        generate_json.run_assistant(client, assistant_id, "content", timeout=0)
+
+    assert client.cancelled_runs == [client.runs[-1].id]
+
+
+def test_failed_run_raises(no_sleep):
+    client, assistant_id = make_client(streaming=False, statuses=["failed"])
+
+    with pytest.raises(RuntimeError):
+        generate_json.run_assistant(client, assistant_id, "content")
+
+
+def test_other_errors_while_streaming_are_not_swallowed(no_sleep):
+    client, assistant_id = make_client()
+
+    errors = [AttributeError("'NoneType' object has no attribute 'value'")]
+
+    def reply(content):
+        # Fails the streamed run only, so a fallback to polling would succeed
+        if errors:
+            raise errors.pop()
+        return "{}"
+    client.reply = reply
+
+    with pytest.raises(AttributeError):
+        generate_json.run_assistant(client, assistant_id, "content")
+    assert client.retrieve_calls == 0
@@ -0,0 +1,72 @@
+import random
+import time
+
+from salience import normalize, paragraph_scores, select_salient_paragraphs, stem
+
+TOPIC = [
+    "מטריצה הפיכה אם ורק אם הדטרמיננטה שלה שונה מאפס",
+    "הדטרמיננטה של מטריצה משולשית היא מכפלת האיברים שעל האלכסון",
+    "והמטריצה המייצגת של טרנספורמציה ליניארית תלויה בבחירת הבסיס",
+    "ערך עצמי של מטריצה הוא שורש של הפולינום האופייני שלה",
+]
+BOILERPLATE = [
+    "המכללה למינהל - כל הזכויות שמורות",
+    "נא לכבות טלפונים ניידים במהלך ההרצאה",
+    "קפטריה פתוחה בין השעות שמונה לשש",
+]
+
+
+def test_stem_strips_attached_prefixes_but_keeps_short_words():
+    assert stem("והמטריצה") == "מטריצה"
+    assert stem("בבסיס") == "בסיס"
+    assert stem("מדע") == "מדע"
+    assert stem("matrix") == "matrix"
+
+
+def test_normalize_removes_niqqud_and_direction_marks():
+    assert normalize("מַטְרִיצָה‏ Matrix") == "מטריצה matrix"
+
+
+def test_central_paragraphs_score_higher_than_boilerplate():
+    lines = TOPIC + BOILERPLATE
+    scores = paragraph_scores("\n".join(lines))
+
+    assert min(scores[:len(TOPIC)]) > max(scores[len(TOPIC):])
+
+
+def test_paragraphs_without_words_score_zero():
+    assert list(paragraph_scores("12 + 34\n\nמטריצה הפיכה")[:2]) == [0, 0]
+
+
+def test_text_within_budget_is_unchanged():
+    text = "\n".join(TOPIC)
+    assert select_salient_paragraphs(text, len(text)) == text
+
+
+def test_selection_fits_the_budget_in_document_order_and_covers_the_whole_document():
+    rng = random.Random(7)
+    lines = [rng.choice(TOPIC if n % 3 else BOILERPLATE) + f" {n}" for n in range(3000)]
+    text = "\n".join(lines)
+
+    selected = select_salient_paragraphs(text, 5000)
+
+    kept = selected.split("\n")
+    positions = [lines.index(line) for line in kept]
+    assert len(selected) <= 5000
+    assert positions == sorted(positions)
+    assert positions[-1] > len(lines) * 0.9
+    assert sum(line.rsplit(" ", 1)[0] in TOPIC for line in kept) > len(kept) * 0.9
+
+
+def test_a_thousand_pages_take_well_under_a_second():
+    rng = random.Random(1)
+    vocabulary = " ".join(TOPIC + BOILERPLATE).split() + [f"מונח{n}" for n in range(5000)]
+    page = lambda: "\n".join(" ".join(rng.choices(vocabulary, k=40)) for _ in range(10))
+    text = "\n".join(page() for _ in range(1000))
+
+    started = time.perf_counter()
+    selected = select_salient_paragraphs(text, 25000)
+    elapsed = time.perf_counter() - started
+
+    assert len(selected) <= 25000
+    assert elapsed < 1.0
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+import benchmark_startup
+
+
+@pytest.fixture(scope="module")
+def startup():
+    return benchmark_startup.measure(os.path.join(benchmark_startup.script_dir, "input.pdf"), repeat=1)
+
+
+@pytest.mark.parametrize("path", benchmark_startup.PATHS)
+def test_path_runs_without_its_forbidden_modules(startup, path):
+    _, _, forbidden, error = startup[path]
+
+    assert error is None
+    assert forbidden == []
+
+
+@pytest.mark.parametrize("path", benchmark_startup.PATHS)
+def test_path_imports_within_its_cold_start_budget(startup, path):
+    import_ms, _, _, _ = startup[path]
+
+    assert import_ms <= benchmark_startup.STARTUP_BUDGETS_MS[path]
@@ -0,0 +1,106 @@
+import json
+import os
+
+import pytest
+
+from fake_openai import numbered_exam_reply
+from question_bank import QuestionBank
+
+import generate_json
+
+INPUT_PDF = os.path.join(os.path.dirname(os.path.abspath(generate_json.__file__)), "input.pdf")
+STRUCTURE = {"exam": {
+    "multiple_choice": [{"question": "q", "options": ["a", "b", "c", "d"], "answer": "a"}],
+    "open_questions": [{"question": "q", "answer": "a"}],
+}}
+EXISTING = {
+    "multiple_choice": [
+        {"question": f"existing question {n}", "options": ["a", "b", "c", "d"], "answer": "a"} for n in range(8)
+    ],
+    "open_questions": [{"question": f"existing open {n}", "answer": "a"} for n in range(3)],
+}
+
+
+@pytest.fixture
+def client(client):
+    client.reply = numbered_exam_reply()
+    return client
+
+
+def top_up(tmp_path, num_american, num_open):
+    output_file = tmp_path / "response.json"
+    generate_json.top_up_exam(EXISTING, num_american, num_open, "", STRUCTURE, "source",
+                              output_file=str(output_file))
+    return json.loads(output_file.read_text(encoding="utf-8"))["exam"]
+
+
+def test_asks_only_for_missing_questions_and_keeps_existing_ones(client, tmp_path):
+    exam = top_up(tmp_path, 12, 3)
+
+    prompt = client.threads[client.runs[-1].thread_id][0].content
+    assert "with 4 multiple choice questions and 0 open questions" in prompt
+    assert "existing question 7" in prompt and "existing open 2" in prompt
+    assert exam["multiple_choice"][:8] == EXISTING["multiple_choice"]
+    assert len(exam["multiple_choice"]) == 12
+    assert exam["open_questions"] == EXISTING["open_questions"]
+
+
+def test_lower_counts_trim_without_a_model_call(client, tmp_path):
+    exam = top_up(tmp_path, 5, 1)
+
+    assert client.runs == []
+    assert exam["multiple_choice"] == EXISTING["multiple_choice"][:5]
+    assert exam["open_questions"] == EXISTING["open_questions"][:1]
+
+
+def test_duplicates_of_existing_questions_are_dropped(client, tmp_path):
+    client.reply = lambda content: json.dumps({"exam": {
+        "multiple_choice": [
+            dict(EXISTING["multiple_choice"][0]),
+            {"question": "a new question", "options": ["a", "b", "c", "d"], "answer": "b"},
+        ],
+        "open_questions": [],
+    }})
+
+    exam = top_up(tmp_path, 10, 3)
+
+    assert [q["question"] for q in exam["multiple_choice"][8:]] == ["a new question"]
+
+
+def test_top_up_from_the_command_line(client, tmp_path):
+    existing_file = tmp_path / "earlier.json"
+    existing_file.write_text(json.dumps({"exam": EXISTING}), encoding="utf-8")
+    output_file = tmp_path / "topped-up.json"
+
+    generate_json.main([
+        "-g", "test", "-f", "pdf", "-i", INPUT_PDF, "--no-cache",
+        "--no-question-bank", "--top-up", str(existing_file), "-ma", "9", "-mo", "4", "-o", str(output_file),
+    ])
+
+    exam = json.loads(output_file.read_text(encoding="utf-8"))["exam"]
+    assert len(exam["multiple_choice"]) == 9 and len(exam["open_questions"]) == 4
+    assert len(client.runs) == 1
+
+    with pytest.raises(SystemExit):
+        generate_json.main(["-g", "summary", "-f", "pdf", "-i", INPUT_PDF,
+                            "--top-up", str(existing_file)])
+
+
+def test_bank_top_up_never_draws_questions_the_exam_has(client, tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank"))
+    key = generate_json.question_bank_key("source", "")
+    questions = bank.load(key)
+    bank.add(questions, {"multiple_choice": EXISTING["multiple_choice"][:2] + [
+        {"question": "banked question", "options": ["a", "b", "c", "d"], "answer": "c"}
+    ]})
+    bank.save(key, questions)
+    output_file = tmp_path / "response.json"
+
+    generate_json.generate_exam_from_bank(3, 0, "", STRUCTURE, "source", bank, output_file=str(output_file),
+                                          existing={"multiple_choice": EXISTING["multiple_choice"][:2]})
+
+    exam = json.loads(output_file.read_text(encoding="utf-8"))["exam"]
+    assert [q["question"] for q in exam["multiple_choice"]] == [
+        "existing question 0", "existing question 1", "banked question"
+    ]
+    assert client.runs == []
@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+from fake_openai import USAGE
+
+import generate_json
+import generate_summary_html_from_json
+import tracing
+
+API_DIR = os.path.dirname(os.path.abspath(generate_json.__file__))
+
+
+@pytest.fixture(autouse=True)
+def reset_tracing(monkeypatch):
+    monkeypatch.delenv(tracing.TRACE_FILE_ENV, raising=False)
+    yield
+    tracing.configure(None)
+
+
+def read_spans(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_disabled_tracing_is_a_no_op(tmp_path):
+    assert not tracing.configure(None)
+
+    with tracing.span("extract", chars=10) as stage:
+        stage.set(pages=1)
+        tracing.annotate(cache_hit=True)
+
+    assert not stage.recording
+    assert stage is tracing.span("other")
+
+
+def test_spans_nest_and_record_errors(tmp_path):
+    trace_file = tmp_path / "trace.jsonl"
+    tracing.configure(str(trace_file), trace_id="t1")
+
+    with tracing.span("outer"):
+        with tracing.span("inner", n=1):
+            tracing.annotate(extra=True)
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("boom")
+
+    inner, failing, outer = read_spans(trace_file)
+    assert {span["trace_id"] for span in (inner, failing, outer)} == {"t1"}
+    assert inner["parent_id"] == failing["parent_id"] == outer["span_id"]
+    assert outer["parent_id"] is None
+    assert inner["attrs"] == {"n": 1, "extra": True}
+    assert failing["status"] == "error" and "boom" in failing["error"]
+    assert outer["duration_ms"] >= inner["duration_ms"] >= 0
+
+
+def test_generation_emits_a_span_per_stage(client, tmp_path):
+    trace_file = tmp_path / "trace.jsonl"
+
+    generate_json.main([
+        "-g", "test", "-f", "pdf", "-i", os.path.join(API_DIR, "input.pdf"), "--no-cache",
+        "--job-id", "job-1", "--trace-file", str(trace_file),
+    ])
+
+    spans = {span["name"]: span for span in read_spans(trace_file)}
+    assert {"generate_json", "extract", "assistant", "run", "parse", "save"} <= set(spans)
+    root = spans["generate_json"]
+    assert root["trace_id"] == "job-1"
+    assert spans["extract"]["parent_id"] == root["span_id"]
+    assert spans["extract"]["attrs"]["pages"] >= 1
+    assert spans["extract"]["attrs"]["chars"] > 0 and spans["extract"]["attrs"]["tokens"] > 0
+    run = spans["run"]["attrs"]
+    assert run["prompt_tokens"] == USAGE.prompt_tokens
+    assert run["completion_tokens"] == USAGE.completion_tokens
+    assert run["streamed"] and "queue_ms" in run
+    assert spans["parse"]["attrs"]["dropped"] == 0
+
+
+def test_renderer_emits_a_render_span(tmp_path):
+    input_file = tmp_path / "response.json"
+    input_file.write_text(json.dumps({"מבוא": "תוכן", "סיכום": "עוד"}), encoding="utf-8")
+    trace_file = tmp_path / "trace.jsonl"
+
+    generate_summary_html_from_json.main([
+        "-i", str(input_file), "-o", str(tmp_path / "summary.html"), "--trace-file", str(trace_file),
+    ])
+
+    (span,) = read_spans(trace_file)
+    assert span["name"] == "render"
+    assert span["attrs"]["sections"] == 2 and span["attrs"]["html_bytes"] > 0
@@ -0,0 +1,81 @@
+import base64
+import io
+import json
+import os
+import sys
+import types
+
+import generate_json
+import worker
+
+API_DIR = os.path.dirname(os.path.abspath(generate_json.__file__))
+
+
+def test_runs_renderer_job_in_process(tmp_path):
+    input_file = tmp_path / "response.json"
+    input_file.write_text(json.dumps({"נושא": "תוכן"}), encoding="utf-8")
+    output_file = tmp_path / "summary.html"
+
+    response = worker.run_job({
+        "id": "job-1",
+        "script": "generate_summary_html_from_json.py",
+        "args": ["--input-file", str(input_file), "--output-file", str(output_file)],
+    })
+
+    assert response["ok"], response
+    assert response["id"] == "job-1"
+    assert "generated successfully" in response["output"]
+    assert "תוכן" in output_file.read_text(encoding="utf-8")
+
+
+def test_failed_jobs_do_not_stop_the_worker(tmp_path):
+    output_file = tmp_path / "summary.html"
+    jobs = [
+        {"id": "bad-args", "script": "generate_json.py", "args": ["--no-such-flag"]},
+        {"id": "unknown", "script": "rm.py", "args": []},
+        {"id": "missing", "script": "generate_summary_html_from_json.py",
+         "args": ["-i", str(tmp_path / "missing.json"), "-o", str(output_file)]},
+    ]
+    input_stream = io.StringIO("".join(json.dumps(job) + "\n" for job in jobs) + "not json\n")
+    output_stream = io.StringIO()
+
+    worker.serve(input_stream, output_stream)
+
+    responses = [json.loads(line) for line in output_stream.getvalue().splitlines()]
+    assert [r["id"] for r in responses] == ["bad-args", "unknown", "missing", None]
+    assert [r["exit_code"] for r in responses] == [2, 2, 1, 2]
+    assert not any(r["ok"] for r in responses)
+    # argparse wrote its usage error to stderr, so it is both the log and the error
+    assert "error: the following arguments are required" in responses[0]["log"]
+    assert responses[0]["error"] == responses[0]["log"]
+
+
+def test_job_stdin_is_passed_to_the_script(monkeypatch):
+    seen = []
+    echo_script = types.SimpleNamespace(main=lambda argv: seen.append(sys.stdin.buffer.read()))
+    monkeypatch.setitem(sys.modules, "echo_script", echo_script)
+    monkeypatch.setitem(worker.SCRIPT_MODULES, "echo.py", "echo_script")
+
+    response = worker.run_job({"id": 1, "script": "echo.py", "stdin": base64.b64encode(b"%PDF-1.7").decode()})
+
+    assert response["ok"]
+    assert seen == [b"%PDF-1.7"]
+
+
+def test_generate_json_job_reads_the_pdf_from_stdin(client, workspace):
+    """The Node pool's Buffer path: the upload arrives as base64 stdin for '--input-file -'."""
+    with open(os.path.join(API_DIR, "input.pdf"), "rb") as f:
+        pdf_bytes = f.read()
+
+    response = worker.run_job({
+        "id": "upload",
+        "script": "generate_json.py",
+        "args": ["-g", "summary", "-f", "pdf", "-i", "-", "--no-cache", "--stdout-json"],
+        "stdin": base64.b64encode(pdf_bytes).decode(),
+    })
+
+    assert response["ok"], response
+    assert json.loads(response["output"]) == {"subject": "summary"}
+    assert len(client.runs) == 1
+    assert "Input file: -" in response["log"]
+    assert response["error"] is None